@@ -0,0 +1,5 @@
+# -*- coding: utf-8 -*-
+"""
+空投爬虫公共模块
+供 爬取空投数据.py 与 爬取真实空投_完整版.py 共用
+"""
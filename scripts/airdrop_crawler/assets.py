@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+空投链接与图片处理（写入之前的可选阶段，命令行 --assets）
+- project_url / twitter_url / image_url 并发 HEAD 检查，结果按 TTL 缓存
+- image_url 下载一次，生成 WebP 缩略图，按图片内容哈希命名（内容寻址，同图只存一份）
+- image_url 改写为缩略图地址，前端列表不再加载原图；已失效的图片链接置空
+
+缩略图默认写到 public/airdrop-thumbs（随前端一起部署，地址 /airdrop-thumbs/...）
+需要 Pillow 生成缩略图（pip install pillow）；未安装时只做链接检查
+"""
+
+import hashlib
+import io
+import json
+import os
+import time
+
+from . import metrics
+
+DEFAULT_LINK_CACHE = os.path.join('.cache', 'airdrop_crawler', 'links.json')
+# 链接检查结果缓存时间（秒）；失效链接缓存时间更短，以便尽快发现恢复
+DEFAULT_LINK_TTL = 24 * 3600
+DEFAULT_BROKEN_TTL = 3600
+DEFAULT_THUMB_DIR = os.path.join('public', 'airdrop-thumbs')
+DEFAULT_THUMB_URL = '/airdrop-thumbs'
+# 缩略图最长边（像素）与 WebP 质量
+DEFAULT_THUMB_SIZE = 400
+DEFAULT_WEBP_QUALITY = 80
+# 原图大小上限
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+# 部分站点不支持 HEAD，这些状态码改用 GET 再试一次
+HEAD_FALLBACK_STATUSES = frozenset({403, 405, 501})
+LINK_FIELDS = ('project_url', 'twitter_url', 'image_url')
+# 本阶段会改写（失效时置空）的列：写库时为 None 也要显式写出 null，
+# 否则同一分块中有的行带该列、有的行不带，PostgREST 会拒绝（All object keys must match）
+MANAGED_FIELDS = ('image_url',)
+
+
+class LinkCache:
+    """URL -> {status, ok, checked_at, error, thumb}，存为 JSON"""
+
+    def __init__(self, path=DEFAULT_LINK_CACHE, ttl=DEFAULT_LINK_TTL, broken_ttl=DEFAULT_BROKEN_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.broken_ttl = broken_ttl
+        self.entries = {}
+
+    @classmethod
+    def load(cls, path=DEFAULT_LINK_CACHE, **options):
+        cache = cls(path, **options)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                cache.entries = json.load(f)
+        except (OSError, ValueError):
+            cache.entries = {}
+        return cache
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def get(self, url, now=None):
+        """未过期的检查结果，没有时返回 None"""
+        entry = self.entries.get(url)
+        if not entry:
+            return None
+        ttl = self.ttl if entry.get('ok') else self.broken_ttl
+        return entry if (now or time.time()) - entry['checked_at'] < ttl else None
+
+    def put(self, url, status, error='', now=None):
+        entry = self.entries.setdefault(url, {})
+        entry.update(status=status, ok=bool(status) and status < 400, error=error,
+                     checked_at=now or time.time())
+        return entry
+
+
+def thumbnail_name(data, size=DEFAULT_THUMB_SIZE):
+    """按原图内容命名：同一张图无论来自哪个URL都只生成一份"""
+    return f'{hashlib.sha256(data).hexdigest()[:32]}-{size}.webp'
+
+
+def make_thumbnail(data, size=DEFAULT_THUMB_SIZE, quality=DEFAULT_WEBP_QUALITY):
+    """原图 bytes -> WebP 缩略图 bytes（等比缩放到最长边 size）"""
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as image:
+        image.thumbnail((size, size))
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+        output = io.BytesIO()
+        image.save(output, 'WEBP', quality=quality, method=4)
+    return output.getvalue()
+
+
+def _thumbnails_available():
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class AssetProcessor:
+    """在一个 FetchEngine 上并发检查链接、生成缩略图"""
+
+    def __init__(self, engine, cache, thumb_dir=DEFAULT_THUMB_DIR, thumb_url=DEFAULT_THUMB_URL,
+                 size=DEFAULT_THUMB_SIZE, quality=DEFAULT_WEBP_QUALITY):
+        self.engine = engine
+        self.cache = cache
+        self.thumb_dir = thumb_dir
+        self.thumb_url = thumb_url.rstrip('/')
+        self.size = size
+        self.quality = quality
+        self.thumbnails = _thumbnails_available()
+
+    def _thumb_path(self, name):
+        return os.path.join(self.thumb_dir, name)
+
+    def _has_thumb(self, url):
+        # 缩略图按内容命名，检查结果过期不影响继续使用，只需重新 HEAD 确认原图仍有效
+        entry = self.cache.entries.get(url)
+        return bool(entry and entry.get('thumb') and os.path.exists(self._thumb_path(entry['thumb'])))
+
+    async def check(self, url):
+        """HEAD 检查（必要时退回 GET），结果写入缓存"""
+        try:
+            status, _, _ = await self.engine.request('HEAD', url)
+            if status in HEAD_FALLBACK_STATUSES:
+                status, _, _ = await self.engine.request('GET', url, max_bytes=1)
+            entry = self.cache.put(url, status)
+        except Exception as e:
+            entry = self.cache.put(url, 0, str(e) or type(e).__name__)
+        metrics.incr('links_checked')
+        return entry
+
+    async def thumbnail(self, url):
+        """下载原图并生成缩略图，返回缩略图文件名；失败返回 None"""
+        import asyncio
+
+        try:
+            status, headers, data = await self.engine.request('GET', url, max_bytes=MAX_IMAGE_BYTES)
+        except Exception as e:
+            self.cache.put(url, 0, str(e) or type(e).__name__)
+            return None
+        entry = self.cache.put(url, status)
+        if not entry['ok'] or len(data) > MAX_IMAGE_BYTES:
+            return None
+        name = thumbnail_name(data, self.size)
+        path = self._thumb_path(name)
+        if not os.path.exists(path):
+            try:
+                # Pillow 解码/编码会释放 GIL，放到线程里不阻塞事件循环
+                thumb = await asyncio.to_thread(make_thumbnail, data, self.size, self.quality)
+            except Exception as e:
+                entry['error'] = f'缩略图生成失败: {e}'
+                return None
+            os.makedirs(self.thumb_dir, exist_ok=True)
+            tmp_path = f'{path}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(thumb)
+            os.replace(tmp_path, path)
+            metrics.incr('thumbnails_created')
+            metrics.incr('image_bytes_saved', max(len(data) - len(thumb), 0))
+        entry['thumb'] = name
+        return name
+
+    async def process(self, airdrops):
+        """检查所有链接、生成缩略图并改写 image_url，返回失效链接 [(标题, 字段, URL, 状态)]"""
+        import asyncio
+
+        image_urls = {a.image_url for a in airdrops if a.image_url and not a.image_url.startswith(self.thumb_url)}
+        other_urls = {getattr(a, field) for a in airdrops for field in LINK_FIELDS if field != 'image_url'} - {None}
+
+        # 图片直接 GET（顺带完成检查），其余链接只 HEAD；缓存未过期的跳过
+        thumb_jobs = [url for url in image_urls if self.thumbnails and not self._has_thumb(url)]
+        check_jobs = [url for url in other_urls | (image_urls - set(thumb_jobs)) if self.cache.get(url) is None]
+        await asyncio.gather(*(self.thumbnail(url) for url in thumb_jobs),
+                             *(self.check(url) for url in check_jobs))
+
+        broken = []
+        for airdrop in airdrops:
+            for field in LINK_FIELDS:
+                url = getattr(airdrop, field)
+                entry = self.cache.entries.get(url) if url else None
+                if entry and entry['status'] and not entry['ok']:
+                    broken.append((airdrop.title, field, url, entry['status']))
+            url = airdrop.image_url
+            entry = self.cache.entries.get(url) if url else None
+            if not entry:
+                continue
+            if entry['status'] and not entry['ok']:
+                # 明确失效（4xx/5xx）的图片置空，前端显示默认占位；网络错误时保留原链接
+                airdrop.image_url = None
+            elif self._has_thumb(url):
+                airdrop.image_url = f"{self.thumb_url}/{entry['thumb']}"
+                metrics.incr('images_rewritten')
+        metrics.incr('links_broken', len(broken))
+        return broken
+
+
+def process_assets(airdrops, thumb_dir=DEFAULT_THUMB_DIR, thumb_url=DEFAULT_THUMB_URL,
+                   cache_path=DEFAULT_LINK_CACHE, **engine_options):
+    """同步入口：处理一批空投（原地改写 image_url），返回失效链接列表"""
+    import asyncio
+
+    from .fetcher import FetchEngine
+
+    cache = LinkCache.load(cache_path)
+
+    async def run():
+        async with FetchEngine(**engine_options) as engine:
+            return await AssetProcessor(engine, cache, thumb_dir, thumb_url).process(airdrops)
+
+    try:
+        return asyncio.run(run())
+    finally:
+        cache.save()
+
+
+def add_arguments(parser):
+    """给命令行加上 --assets / --thumb-dir / --thumb-url"""
+    parser.add_argument('--assets', action='store_true', help='检查链接并生成图片缩略图（改写 image_url）')
+    parser.add_argument('--thumb-dir', default=DEFAULT_THUMB_DIR, help='缩略图目录')
+    parser.add_argument('--thumb-url', default=DEFAULT_THUMB_URL, help='缩略图对外访问的URL前缀')
+
+
+def run_from_args(airdrops, args):
+    """按命令行参数处理链接和图片，并打印失效链接"""
+    if not args.assets:
+        return []
+    with metrics.stage('assets'):
+        broken = process_assets(airdrops, args.thumb_dir, args.thumb_url)
+    if not _thumbnails_available():
+        print("ℹ️ 未安装 Pillow，跳过缩略图生成（pip install pillow）")
+    for title, field, url, status in broken:
+        print(f"🔗 失效链接 [{status}] {title} {field}: {url}")
+    return broken
@@ -0,0 +1,359 @@
+# -*- coding: utf-8 -*-
+"""
+爬虫与SQL生成热点路径的微基准
+- generate_sql / generate_sql_from_airdrops：10 / 1k / 100k 条
+- BeautifulSoup（及 lxml、selectolax）解析 fixtures 中录制的页面
+- generate_web3_airdrops 构造记录
+- save_to_supabase 写入本地的 PostgREST 桩服务
+- 只生成SQL的子命令的启动耗时（python -X importtime），并检查没有导入 NumPy、supabase 等重依赖
+
+结果保存为 JSON（每项记录中位数/最小值/标准差），可与基线逐项对比
+
+命令行（在 scripts 目录下执行）：
+    python -m airdrop_crawler.bench                     # 运行全部，保存结果并与基线对比
+    python -m airdrop_crawler.bench --save-baseline     # 把本次结果设为基线
+    python -m airdrop_crawler.bench -k sql --sizes 10,1000
+    python -m airdrop_crawler.bench -k startup           # 只检查导入耗时与重依赖
+"""
+
+import argparse
+import gc
+import glob
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import redirect_stdout
+from dataclasses import replace
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .cli import SCRIPTS_DIR, load_script
+
+DEFAULT_RESULTS_DIR = '.cache/airdrop_crawler/bench'
+BASELINE_FILE = 'baseline.json'
+DEFAULT_SIZES = (10, 1000, 100000)
+# 每组计时的最短时间（秒），不足时自动增加循环次数
+MIN_SAMPLE_TIME = 0.2
+DEFAULT_REPEAT = 5
+# 单次就超过该时间的基准（如 100k 条SQL生成）最多重复 SLOW_REPEAT 次
+SLOW_THRESHOLD = 2.0
+SLOW_REPEAT = 3
+# 中位数比基线慢超过该比例视为退化
+DEFAULT_REGRESSION_THRESHOLD = 0.2
+
+CRAWLER_MODULE = '爬取空投数据'
+GENERATOR_MODULE = '爬取真实空投_完整版'
+
+# 只生成SQL的子命令（不联网、不写库）：启动时不应导入的重依赖
+STARTUP_COMMANDS = {
+    'generate-sql': ['generate-sql'],
+    'crawl': ['crawl', '--no-snapshot'],
+}
+HEAVY_MODULES = ('numpy', 'supabase', 'postgrest', 'httpx', 'aiohttp', 'psycopg2', 'lxml', 'bs4', 'selectolax', 'yaml')
+
+# 基准注册表：名称 -> setup()，setup 返回被计时的无参函数
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def decorator(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return decorator
+
+
+def _replicate(airdrops, count):
+    """把样例空投复制到 count 条（project_url 各不相同，避免被同步模式去重）"""
+    return [
+        replace(airdrops[i % len(airdrops)], project_url=f'{airdrops[i % len(airdrops)].project_url}/{i}')
+        for i in range(count)
+    ]
+
+
+# ---- 基准定义 ----
+
+def _register_sql_benchmarks(sizes):
+    for size in sizes:
+        @benchmark(f'sql.generate_sql[{size}]')
+        def generate_sql(size=size):
+            crawler = load_script(CRAWLER_MODULE)
+            airdrops = _replicate(crawler.fetch_manual_airdrops(), size)
+            return lambda: crawler.generate_sql(airdrops)
+
+        @benchmark(f'sql.generate_sql_from_airdrops[{size}]')
+        def generate_sql_from_airdrops(size=size):
+            generator = load_script(GENERATOR_MODULE)
+            web3 = _replicate(generator.generate_web3_airdrops(), size * 9 // 10)
+            cex = _replicate(generator.generate_cex_airdrops(), size - len(web3))
+            return lambda: generator.generate_sql_from_airdrops(web3, cex)
+
+
+def _register_parse_benchmarks():
+    from .parsers import FIXTURE_DIR, comparable_backends, get_parser
+
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, '*.html'))):
+        page = os.path.splitext(os.path.basename(path))[0]
+        for backend in comparable_backends():
+            @benchmark(f'parse.{backend}[{page}]')
+            def parse(path=path, backend=backend):
+                with open(path, 'r', encoding='utf-8') as f:
+                    html = f.read()
+                parser = get_parser({'name': path, 'url': 'https://example.com/'}, backend)
+                return lambda: list(parser.parse(html))
+
+
+@benchmark('records.generate_web3_airdrops')
+def generate_web3_airdrops():
+    return load_script(GENERATOR_MODULE).generate_web3_airdrops
+
+
+class _StubPostgREST(BaseHTTPRequestHandler):
+    """本地 PostgREST 桩：upsert 丢弃请求体，查询一律返回空表（每行都要写入）"""
+
+    def do_GET(self):
+        self._empty(200)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self._empty(201)
+
+    def _empty(self, status):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'[]')
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer:
+    """在后台线程运行的本地桩服务"""
+
+    def __init__(self):
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), _StubPostgREST)
+        self.url = f'http://127.0.0.1:{self.httpd.server_address[1]}'
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+# 桩服务在整个基准进程中复用
+_stub = None
+
+
+@benchmark('supabase.save_to_supabase[1000]')
+def save_to_supabase():
+    global _stub
+    from supabase import create_client
+
+    crawler = load_script(CRAWLER_MODULE)
+    if _stub is None:
+        _stub = StubServer().start()
+    # 桩服务不校验密钥，只需满足客户端的 JWT 格式检查
+    crawler._supabase = create_client(_stub.url, 'bench.stub.key')
+    airdrops = _replicate(crawler.fetch_manual_airdrops(), 1000)
+
+    def run():
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            crawler.save_to_supabase(airdrops)
+    return run
+
+
+def import_times(command_args):
+    """
+    用 python -X importtime 执行一条子命令（SQL写到临时文件）
+    返回 {模块名: (含子模块的导入耗时 µs, 是否由其他模块嵌套导入)}
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        argv = [command_args[0], os.path.join(tmp, 'out.sql'), *command_args[1:]]
+        completed = subprocess.run([sys.executable, '-X', 'importtime', '-m', 'airdrop_crawler', *argv],
+                                   cwd=SCRIPTS_DIR, capture_output=True, text=True, check=True)
+    times = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line.split('|')
+        if cumulative.strip().isdigit():
+            times[name.strip()] = (int(cumulative), name.startswith('  '))
+    return times
+
+
+def _register_startup_benchmarks():
+    for command, command_args in STARTUP_COMMANDS.items():
+        @benchmark(f'startup.{command}')
+        def startup(command_args=command_args):
+            return lambda: import_times(command_args)
+
+
+def check_startup_imports():
+    """只生成SQL的子命令不应导入重依赖；打印各命令的导入耗时，返回违规的命令数"""
+    violations = 0
+    for command, command_args in STARTUP_COMMANDS.items():
+        times = import_times(command_args)
+        heavy = [name for name in HEAVY_MODULES if name in times]
+        # 本项目的模块（airdrop_crawler 包与脚本）在顶层导入的累计耗时
+        own = sum(cumulative for name, (cumulative, nested) in times.items()
+                  if not nested and name.split('.')[0] in ('airdrop_crawler', CRAWLER_MODULE, GENERATOR_MODULE))
+        if heavy:
+            violations += 1
+            print(f"❌ {command} 导入了 {', '.join(f'{name}（{times[name][0] / 1000:.1f} ms）' for name in heavy)}")
+        else:
+            print(f"✅ {command} 没有导入重依赖（本项目模块导入 {own / 1000:.1f} ms）")
+    return violations
+
+
+# ---- 计时与结果 ----
+
+def _time(func, number):
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        return (time.perf_counter() - started) / number
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def measure(func, repeat=DEFAULT_REPEAT, min_time=MIN_SAMPLE_TIME):
+    """自动确定循环次数后重复计时，返回单次耗时的统计（秒）"""
+    first = _time(func, 1)
+    number = max(1, int(min_time / first)) if first > 0 else 1
+    if first > SLOW_THRESHOLD:
+        repeat = min(repeat, SLOW_REPEAT)
+    samples = [_time(func, number) for _ in range(repeat)]
+    return {
+        'median': statistics.median(samples),
+        'min': min(samples),
+        'stdev': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        'number': number,
+        'repeat': repeat,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(pattern=None, repeat=DEFAULT_REPEAT, min_time=MIN_SAMPLE_TIME):
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if pattern and pattern not in name:
+            continue
+        stats = results[name] = measure(setup(), repeat, min_time)
+        print(f"{name:<48} {_format_seconds(stats['median']):>10}  ±{_format_seconds(stats['stdev'])}")
+    return {
+        'meta': {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'machine': platform.platform(),
+        },
+        'results': results,
+    }
+
+
+def compare(current, baseline):
+    """逐项对比中位数，返回 [(名称, 基线, 本次, 比值)]，比值 = 本次 / 基线"""
+    rows = []
+    for name, stats in current['results'].items():
+        base = baseline['results'].get(name)
+        if base and base['median'] > 0:
+            rows.append((name, base['median'], stats['median'], stats['median'] / base['median']))
+    return rows
+
+
+def _format_seconds(seconds):
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('µs', 1e-6)):
+        if seconds >= scale:
+            return f'{seconds / scale:.2f} {unit}'
+    return f'{seconds / 1e-9:.0f} ns'
+
+
+def save_results(results, path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+def load_results(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='爬虫与SQL生成微基准')
+    parser.add_argument('-k', dest='pattern', help='只运行名称包含该字符串的基准')
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help='SQL生成基准的记录数，逗号分隔')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='每项重复计时次数')
+    parser.add_argument('--results-dir', default=DEFAULT_RESULTS_DIR, help='结果保存目录')
+    parser.add_argument('--baseline', help=f'基线文件，默认 <results-dir>/{BASELINE_FILE}')
+    parser.add_argument('--save-baseline', action='store_true', help='把本次结果保存为基线')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_REGRESSION_THRESHOLD,
+                        help='中位数变慢超过该比例视为退化（默认0.2即20%%）')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    _register_sql_benchmarks([int(size) for size in args.sizes.split(',') if size])
+    _register_parse_benchmarks()
+    _register_startup_benchmarks()
+
+    try:
+        current = run_benchmarks(args.pattern, args.repeat)
+    finally:
+        if _stub is not None:
+            _stub.stop()
+
+    heavy_imports = 0
+    if not args.pattern or args.pattern in 'startup':
+        print("\n📦 只生成SQL的命令的导入检查（python -X importtime）")
+        heavy_imports = check_startup_imports()
+
+    path = os.path.join(args.results_dir, datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+    save_results(current, path)
+    print(f"\n💾 结果已保存：{path}")
+
+    baseline_path = args.baseline or os.path.join(args.results_dir, BASELINE_FILE)
+    if args.save_baseline:
+        save_results(current, baseline_path)
+        print(f"📌 已设为基线：{baseline_path}")
+        return 1 if heavy_imports else 0
+    if not os.path.exists(baseline_path):
+        print("ℹ️ 还没有基线，使用 --save-baseline 保存")
+        return 1 if heavy_imports else 0
+
+    regressions = 0
+    print(f"\n📊 与基线对比（{baseline_path}）")
+    for name, base, now, ratio in compare(current, load_results(baseline_path)):
+        regressed = ratio > 1 + args.threshold
+        regressions += regressed
+        mark = '❌' if regressed else ('🚀' if ratio < 1 - args.threshold else '  ')
+        print(f"{mark} {name:<48} {_format_seconds(base):>10} -> {_format_seconds(now):>10}  x{ratio:.2f}")
+    return 1 if regressions or heavy_imports else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
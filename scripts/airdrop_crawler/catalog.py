@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+人工整理的空投目录（scripts/catalog/*.yaml 或 *.json）
+每个文件是一个空投列表，字段与 Airdrop 同名，另有：
+- end_in_days：结束时间 = 加载时刻 + N 天（start_time 为加载时刻）
+
+加载过程：
+    目录文件 --校验--> 编译结果（pickle，按文件内容哈希命名，存在 .cache/airdrop_crawler/catalog）
+文件内容不变时直接读取编译结果，不再解析 YAML、不再校验，启动耗时与目录大小基本无关
+编译结果只由本模块写入本地缓存目录，不从其他来源读取
+
+YAML 需要 PyYAML（pip install pyyaml）；JSON 目录不需要额外依赖
+
+    python -m airdrop_crawler catalog            # 校验并编译所有目录文件
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+from datetime import datetime, timedelta
+
+from .record import FIELD_NAMES, STRICT_ENUM_FIELDS, Airdrop
+
+DEFAULT_CATALOG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'catalog')
+DEFAULT_CACHE_DIR = os.path.join('.cache', 'airdrop_crawler', 'catalog')
+CATALOG_SUFFIXES = ('.yaml', '.yml', '.json')
+# 校验规则或编译格式变化时加一，旧的编译结果自动失效
+COMPILE_VERSION = 1
+
+# 字段 -> 允许的类型（枚举字段另按取值校验）
+FIELD_TYPES = {
+    'title': str,
+    'description': str,
+    'project_url': str,
+    'type': str,
+    'category': str,
+    'status': str,
+    'reward_amount': (int, float),
+    'image_url': str,
+    'twitter_url': str,
+    'requirements': list,
+    'ai_score': (int, float),
+    'risk_level': str,
+    'estimated_value': (int, float),
+    'difficulty': str,
+    'time_required': str,
+    'participation_cost': str,
+    'tags': list,
+    'source': str,
+    'source_type': str,
+    'verified': bool,
+    'sort_order': int,
+    'total_participants': int,
+    'max_participants': int,
+    'push_count': int,
+    'end_in_days': (int, float),
+}
+REQUIRED_FIELDS = ('title', 'description', 'project_url', 'type')
+# 时间由 end_in_days 在加载时计算，目录中不写绝对时间
+COMPUTED_FIELDS = ('start_time', 'end_time')
+
+
+class CatalogError(ValueError):
+    """目录文件不符合格式，errors 为 [(序号, 字段, 原因)]"""
+
+    def __init__(self, path, errors):
+        self.path = path
+        self.errors = errors
+        details = '\n'.join(f'  #{index} {title}: {reason}' for index, title, reason in errors)
+        super().__init__(f'{path} 校验失败（{len(errors)} 处）：\n{details}')
+
+
+def _type_name(expected):
+    return '/'.join(t.__name__ for t in expected) if isinstance(expected, tuple) else expected.__name__
+
+
+def validate_entry(entry):
+    """校验一条目录记录，返回错误原因列表"""
+    if not isinstance(entry, dict):
+        return ['每条记录必须是映射']
+    errors = [f'缺少必填字段 {name}' for name in REQUIRED_FIELDS if not entry.get(name)]
+    for name, value in entry.items():
+        expected = FIELD_TYPES.get(name)
+        if expected is None:
+            reason = '时间由 end_in_days 计算' if name in COMPUTED_FIELDS else '未知字段'
+            errors.append(f'{name}: {reason}')
+        elif value is not None and (not isinstance(value, expected)
+                                    or (isinstance(value, bool) and expected is not bool)):
+            errors.append(f'{name}: 应为 {_type_name(expected)}，实际为 {type(value).__name__}')
+        elif isinstance(value, list) and not all(isinstance(item, str) for item in value):
+            errors.append(f'{name}: 列表元素应为 str')
+        elif name in STRICT_ENUM_FIELDS and value is not None:
+            allowed = [member.value for member in STRICT_ENUM_FIELDS[name]]
+            if value not in allowed:
+                errors.append(f'{name}: 取值 {value!r} 不在 {allowed} 中')
+    return errors
+
+
+def validate_catalog(path, entries):
+    """校验整个目录文件，不合格时抛出 CatalogError"""
+    if not isinstance(entries, list):
+        raise CatalogError(path, [(0, '', '文件内容必须是空投列表')])
+    errors = [(index, entry.get('title', '') if isinstance(entry, dict) else '', reason)
+              for index, entry in enumerate(entries, 1) for reason in validate_entry(entry)]
+    if errors:
+        raise CatalogError(path, errors)
+    return entries
+
+
+def parse_catalog(path, data):
+    """目录文件内容（bytes）-> 记录列表"""
+    if path.endswith('.json'):
+        return json.loads(data)
+    import yaml
+
+    return yaml.safe_load(data)
+
+
+def compile_catalog(path, data):
+    """解析并校验，得到可直接构造 Airdrop 的记录（按字段顺序排好，省略空值）"""
+    try:
+        entries = parse_catalog(path, data)
+    except ImportError:
+        raise
+    except Exception as e:
+        raise CatalogError(path, [(0, '', f'解析失败: {e}')]) from e
+    entries = validate_catalog(path, entries)
+    field_order = FIELD_NAMES + ('end_in_days',)
+    return [{name: entry[name] for name in field_order if entry.get(name) is not None} for entry in entries]
+
+
+def _cache_path(path, digest, cache_dir):
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir, f'{name}-{digest[:16]}-v{COMPILE_VERSION}.pickle')
+
+
+def load_compiled(path, cache_dir=DEFAULT_CACHE_DIR):
+    """读取编译结果（文件内容变化时重新编译），返回记录列表"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+    cache_path = _cache_path(path, digest, cache_dir) if cache_dir else None
+    if cache_path:
+        try:
+            with open(cache_path, 'rb') as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            pass
+    entries = compile_catalog(path, data)
+    if cache_path:
+        os.makedirs(cache_dir, exist_ok=True)
+        # 同一目录文件的旧编译结果不再需要
+        prefix = f'{os.path.splitext(os.path.basename(path))[0]}-'
+        for name in os.listdir(cache_dir):
+            if name.startswith(prefix) and name.endswith('.pickle'):
+                os.remove(os.path.join(cache_dir, name))
+        tmp_path = f'{cache_path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(entries, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    return entries
+
+
+def catalog_path(name, catalog_dir=DEFAULT_CATALOG_DIR):
+    """目录名（如 'web3'）或文件路径 -> 文件路径"""
+    if os.path.splitext(name)[1] in CATALOG_SUFFIXES:
+        return name
+    for suffix in CATALOG_SUFFIXES:
+        path = os.path.join(catalog_dir, name + suffix)
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError(f'找不到空投目录 {name}（{catalog_dir}）')
+
+
+def load_catalog(name, catalog_dir=DEFAULT_CATALOG_DIR, cache_dir=DEFAULT_CACHE_DIR, now=None):
+    """加载目录为 [Airdrop]；start_time 为当前时间，end_time 按 end_in_days 计算"""
+    now = now or datetime.now()
+    airdrops = []
+    for entry in load_compiled(catalog_path(name, catalog_dir), cache_dir):
+        entry = dict(entry)
+        end_in_days = entry.pop('end_in_days', None)
+        airdrop = Airdrop(**entry)
+        airdrop.start_time = now
+        if end_in_days is not None:
+            airdrop.end_time = now + timedelta(days=end_in_days)
+        airdrops.append(airdrop)
+    return airdrops
+
+
+def main(argv=None):
+    """校验并编译目录文件，返回退出码（有文件不合格时为 1）"""
+    parser = argparse.ArgumentParser(prog='python -m airdrop_crawler catalog', description='校验并编译空投目录')
+    parser.add_argument('paths', nargs='*', help=f'目录文件（默认 {DEFAULT_CATALOG_DIR} 下的所有文件）')
+    args = parser.parse_args(argv)
+    paths = args.paths or sorted(
+        os.path.join(DEFAULT_CATALOG_DIR, name) for name in os.listdir(DEFAULT_CATALOG_DIR)
+        if name.endswith(CATALOG_SUFFIXES)
+    )
+    failed = 0
+    for path in paths:
+        try:
+            entries = load_compiled(path)
+        except (CatalogError, ValueError, OSError) as e:
+            failed += 1
+            print(f"❌ {e}")
+            continue
+        print(f"✅ {path}：{len(entries)} 条")
+    return 1 if failed else 0
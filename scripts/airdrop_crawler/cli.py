@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+统一命令行入口（在 scripts 目录下执行）：
+
+    python -m airdrop_crawler generate-sql [输出文件] [--format ...]   # 爬取真实空投_完整版.py
+    python -m airdrop_crawler crawl [输出文件] [--sources]             # 爬取空投数据.py
+    python -m airdrop_crawler sync [--sources]                        # 爬取后直接写入 Supabase
+    python -m airdrop_crawler daemon                                  # 常驻运行，按数据源自适应间隔抓取
+    python -m airdrop_crawler worker [--dsn ...]                      # 分片爬取：按数据源租约多进程/多机并行
+    python -m airdrop_crawler leases                                  # 查看各数据源的租约状态
+    python -m airdrop_crawler push <空投ID> --all-groups               # 把一个空投并发推送到群组
+    python -m airdrop_crawler catalog                                 # 校验并编译 catalog/ 下的空投目录
+    python -m airdrop_crawler feeds [--dsn ...]                       # 从数据库导出前端列表页的静态 JSON 分片
+
+本模块只导入 argparse；各子命令用到的脚本和依赖（supabase、aiohttp、NumPy 等）在执行时才导入，
+只生成SQL的调用接近裸解释器的启动时间
+"""
+
+import argparse
+import importlib
+import os
+import sys
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 子命令 -> (脚本模块, 入口函数, 说明)
+COMMANDS = {
+    'generate-sql': ('爬取真实空投_完整版', 'main', '生成真实空投数据SQL（不联网）'),
+    'crawl': ('爬取空投数据', 'main', '爬取空投数据并生成SQL'),
+    'sync': ('爬取空投数据', 'sync', '爬取空投数据并直接写入Supabase'),
+    'daemon': ('爬取空投数据', 'daemon', '常驻爬取，按数据源自适应间隔并保持连接池/解析进程常驻'),
+    'worker': ('爬取空投数据', 'worker', '分片爬取：领取数据源租约，多个 worker 并行且不重复爬取、写入'),
+    'leases': ('airdrop_crawler.leases', 'main', '查看各数据源的租约状态'),
+    'push': ('airdrop_crawler.push', 'main', '把一个空投并发推送到多个群组，并写一条推送历史'),
+    'catalog': ('airdrop_crawler.catalog', 'main', '校验并编译人工整理的空投目录'),
+    'feeds': ('airdrop_crawler.feeds', 'main', '从数据库读取全部上线中的空投，导出静态 JSON 分片'),
+}
+
+
+def load_script(name):
+    """按需导入 scripts 目录下的脚本模块"""
+    if SCRIPTS_DIR not in sys.path:
+        sys.path.insert(0, SCRIPTS_DIR)
+    return importlib.import_module(name)
+
+
+def build_parser():
+    """只用于顶层帮助和错误提示；子命令参数由各脚本自己的 parse_args 解析"""
+    parser = argparse.ArgumentParser(prog='python -m airdrop_crawler', description='空投爬虫命令行')
+    subparsers = parser.add_subparsers(dest='command', required=True, metavar='命令')
+    for command, (_, _, help_text) in COMMANDS.items():
+        subparsers.add_parser(command, help=help_text)
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in COMMANDS:
+        # 打印帮助或报错退出
+        build_parser().parse_args(argv)
+        return 2
+    module_name, entry, _ = COMMANDS[argv[0]]
+    return getattr(load_script(module_name), entry)(argv[1:])
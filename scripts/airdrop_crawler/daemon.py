@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+常驻爬取守护进程
+与 cron 每次冷启动不同，守护进程在整个生命周期内复用：
+- FetchEngine 的连接池（keep-alive、DNS 缓存）、令牌桶和熔断状态
+- ParsePool 的解析进程（不再每轮重新拉起进程、导入解析库）
+- 各数据源最近一次的解析结果（内存中，启动时从 ResponseCache 预热）
+
+每个数据源按自己的间隔调度，间隔随观察到的变化率自适应：
+内容有变化时缩短（SHRINK_FACTOR），没有变化时拉长（GROW_FACTOR），限制在 [min_interval, max_interval]
+经常更新的数据源更及时，长期不变的数据源请求更少
+调度状态存盘，重启后沿用已学到的间隔
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import signal
+import time
+from dataclasses import asdict, dataclass
+
+from . import metrics
+from .record import Airdrop
+from .sql_writer import content_hash
+
+DEFAULT_SCHEDULE_PATH = os.path.join('.cache', 'airdrop_crawler', 'schedule.json')
+# 初始间隔与原 cron 一致（每2小时），再按变化率自适应（秒）
+DEFAULT_INTERVAL = 2 * 3600
+DEFAULT_MIN_INTERVAL = 10 * 60
+DEFAULT_MAX_INTERVAL = 24 * 3600
+# 有变化时间隔乘以 SHRINK_FACTOR，没有变化时乘以 GROW_FACTOR
+SHRINK_FACTOR = 0.5
+GROW_FACTOR = 1.5
+# 变化率的指数滑动平均系数（只用于日志和调度状态展示）
+CHANGE_RATE_ALPHA = 0.3
+# 下次抓取时间加 ±JITTER 的随机偏移，避免各数据源总在同一时刻到期
+JITTER = 0.1
+# 没有数据源到期时最长睡眠多久再检查一次（秒）
+MAX_SLEEP = 60
+
+
+def items_fingerprint(items):
+    """一批空投的内容指纹（与顺序无关，不含每次解析都会变化的时间字段）"""
+    digest = hashlib.sha256()
+    for item_hash in sorted(content_hash(item) for item in items):
+        digest.update(item_hash.encode('ascii'))
+    return digest.hexdigest()
+
+
+@dataclass
+class SourceSchedule:
+    """单个数据源的调度状态（时间为 Unix 时间戳）"""
+    name: str
+    interval: float = DEFAULT_INTERVAL
+    next_due: float = 0.0
+    change_rate: float = 0.5
+    fingerprint: str = ''
+    checks: int = 0
+    changes: int = 0
+
+    def observe(self, changed, now, min_interval, max_interval):
+        """记录一次成功抓取的结果并调整间隔"""
+        self.checks += 1
+        self.changes += changed
+        self.change_rate += CHANGE_RATE_ALPHA * (changed - self.change_rate)
+        factor = SHRINK_FACTOR if changed else GROW_FACTOR
+        self.interval = min(max(self.interval * factor, min_interval), max_interval)
+        self.reschedule(now, self.interval)
+
+    def reschedule(self, now, delay):
+        self.next_due = now + delay * random.uniform(1 - JITTER, 1 + JITTER)
+
+
+class ScheduleStore:
+    """数据源名称 -> SourceSchedule，存为 JSON"""
+
+    def __init__(self, path=DEFAULT_SCHEDULE_PATH, interval=DEFAULT_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.schedules = {}
+
+    @classmethod
+    def load(cls, path=DEFAULT_SCHEDULE_PATH, interval=DEFAULT_INTERVAL):
+        store = cls(path, interval)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                store.schedules = {name: SourceSchedule(**entry) for name, entry in json.load(f).items()}
+        except (OSError, ValueError, TypeError):
+            store.schedules = {}
+        return store
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({name: asdict(s) for name, s in self.schedules.items()}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def get(self, name):
+        if name not in self.schedules:
+            self.schedules[name] = SourceSchedule(name, interval=self.interval)
+        return self.schedules[name]
+
+    def due(self, sources, now):
+        return [source for source in sources if self.get(source['name']).next_due <= now]
+
+    def next_wakeup(self, sources):
+        return min(self.get(source['name']).next_due for source in sources)
+
+
+class CrawlDaemon:
+    """
+    常驻调度循环
+
+    collect(results, parse_many) -> {数据源名称: [Airdrop]}：处理一批 FetchResult（见 爬取空投数据.py）
+    on_change(latest) -> 是否写入成功：任一数据源内容变化后调用，latest 为所有数据源最近的解析结果
+    写入成功（返回真值）后才提交本轮的指纹和解析结果；失败或抛出异常时保留上一次写入成功时的指纹，
+    下次抓取该数据源仍视为有变化，会再次写入
+    """
+
+    def __init__(self, sources, engine, pool, collect, on_change, cache=None, breaker=None,
+                 schedule=None, min_interval=DEFAULT_MIN_INTERVAL, max_interval=DEFAULT_MAX_INTERVAL,
+                 metrics_json=None, metrics_prom=None):
+        self.sources = sources
+        self.engine = engine
+        self.pool = pool
+        self.collect = collect
+        self.on_change = on_change
+        self.cache = cache
+        self.breaker = breaker
+        self.schedule = schedule or ScheduleStore()
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.metrics_json = metrics_json
+        self.metrics_prom = metrics_prom
+        self.latest = {}
+        self.cycles = 0
+        self._stop = None
+
+    def warm_start(self):
+        """从 ResponseCache 恢复各数据源上次的解析结果，未到期的数据源也能参与合并"""
+        if not self.cache:
+            return
+        for source in self.sources:
+            entry = self.cache.get(source['url'])
+            if entry and entry.get('parsed') is not None:
+                items = [Airdrop.from_dict(item) for item in entry['parsed']]
+                self.latest[source['name']] = items
+                schedule = self.schedule.get(source['name'])
+                schedule.fingerprint = schedule.fingerprint or items_fingerprint(items)
+
+    def stop(self):
+        if self._stop is not None:
+            self._stop.set()
+
+    async def run_cycle(self, now=None):
+        """抓取所有到期的数据源，返回内容有变化的数据源名称"""
+        now = now or time.time()
+        due = self.schedule.due(self.sources, now)
+        if not due:
+            return []
+        self.cycles += 1
+        metrics.start_run('daemon')
+        with metrics.stage('fetch'):
+            results = await self.engine.fetch_many(due)
+        # 解析在进程池中进行，放到线程里等待，不阻塞事件循环
+        parsed = await asyncio.to_thread(self.collect, results, self.pool.parse_many)
+
+        changed = []
+        # 本轮抓取到的 {数据源名称: (指纹, 解析结果)}，写入成功后才提交
+        fetched = {}
+        for result in results:
+            schedule = self.schedule.get(result.name)
+            if result.skipped and self.breaker:
+                schedule.next_due = now + self.breaker.retry_in(result.name)
+                continue
+            if result.name not in parsed:
+                # 抓取或解析失败：间隔不变，交给重试和熔断处理
+                schedule.reschedule(now, schedule.interval)
+                continue
+            items = parsed[result.name]
+            fingerprint = items_fingerprint(items)
+            is_changed = fingerprint != schedule.fingerprint
+            if schedule.fingerprint:
+                schedule.observe(is_changed, now, self.min_interval, self.max_interval)
+            else:
+                # 第一次抓取没有可比较的基准，不调整间隔
+                schedule.reschedule(now, schedule.interval)
+            fetched[result.name] = (fingerprint, items)
+            if is_changed:
+                changed.append(result.name)
+            print(f"🕒 {result.name}: {'有变化' if is_changed else '无变化'}，"
+                  f"下次间隔 {schedule.interval / 60:.1f} 分钟（变化率 {schedule.change_rate:.2f}）")
+
+        metrics.incr('sources_checked', len(due))
+        metrics.incr('sources_changed', len(changed))
+        latest = {**self.latest, **{name: items for name, (_, items) in fetched.items()}}
+        if not changed or await self._write(latest):
+            for name, (fingerprint, items) in fetched.items():
+                self.schedule.get(name).fingerprint = fingerprint
+            self.latest = latest
+        if self.breaker:
+            self.breaker.save()
+        self.schedule.save()
+        metrics.finish_run(self.metrics_json, self.metrics_prom)
+        return changed
+
+    async def _write(self, latest):
+        """在线程中调用 on_change，返回是否写入成功（异常视为失败，守护进程继续运行）"""
+        try:
+            ok = await asyncio.to_thread(self.on_change, latest)
+        except Exception as e:
+            print(f"❌ 写入失败：{e}")
+            ok = False
+        if not ok:
+            metrics.incr('daemon_write_failures')
+            print("⚠️ 本轮变化未写入，不提交指纹，下次抓取时重试")
+        return bool(ok)
+
+    async def run(self, max_cycles=None):
+        """运行直到收到 SIGINT / SIGTERM（或跑满 max_cycles 轮）"""
+        self._stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, self.stop)
+            except (NotImplementedError, RuntimeError):
+                # Windows 事件循环不支持，依赖 KeyboardInterrupt
+                pass
+        self.warm_start()
+        while not self._stop.is_set():
+            await self.run_cycle()
+            if max_cycles is not None and self.cycles >= max_cycles:
+                break
+            delay = min(max(self.schedule.next_wakeup(self.sources) - time.time(), 0), MAX_SLEEP)
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
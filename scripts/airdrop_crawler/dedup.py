@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+跨数据源近似去重（MinHash + LSH）
+- 标题 + 描述归一化后取字符 n-gram（中文同样适用），再加上 project_url
+- 数据源的列表页地址（列表项没有详情链接时 project_url 为列表页加标题片段，比较时忽略片段）不代表具体项目，
+  不参与 project_url 比较，这些记录只按文案相似度判断
+- 单次哈希分桶的 MinHash 签名（one permutation hashing），每个 shingle 只哈希一次
+- LSH 分段建索引，每条记录只和同桶候选比较，数据量增长时单条去重成本基本不变
+"""
+
+import hashlib
+import re
+import unicodedata
+from dataclasses import fields, replace
+from urllib.parse import urlsplit
+
+# 签名长度 = 分段数 × 每段行数（32段×4行：相似度0.5时命中概率约87%）
+DEFAULT_NUM_PERM = 128
+DEFAULT_BANDS = 32
+# 字符 n-gram 长度
+DEFAULT_NGRAM = 3
+# 估计的 Jaccard 相似度达到该值即视为重复
+DEFAULT_THRESHOLD = 0.5
+# project_url 相同时使用更低的阈值（同一项目在不同来源的文案差异较大；列表页地址除外）
+SAME_URL_THRESHOLD = 0.15
+
+_MAX_HASH = (1 << 64) - 1
+_NON_WORD = re.compile(r'[\W_]+')
+
+
+def normalize_text(text):
+    """全角转半角、转小写、去掉空白/标点/emoji"""
+    text = unicodedata.normalize('NFKC', text or '').lower()
+    return _NON_WORD.sub('', text)
+
+
+def normalize_url(url):
+    """host（去掉 www.）+ path，忽略协议、查询参数和末尾斜杠"""
+    if not url:
+        return ''
+    parts = urlsplit(url if '://' in url else f'https://{url}')
+    host = parts.netloc.lower().removeprefix('www.')
+    return host + parts.path.rstrip('/')
+
+
+def project_url_key(airdrop, listing_urls=frozenset()):
+    """参与比较的 project_url（归一化）；列表页地址返回空字符串"""
+    url = normalize_url(airdrop.project_url)
+    return '' if url in listing_urls else url
+
+
+def shingles(airdrop, ngram=DEFAULT_NGRAM, listing_urls=frozenset()):
+    text = normalize_text(f"{airdrop.title or ''} {airdrop.description or ''}")
+    result = {text[i:i + ngram] for i in range(max(len(text) - ngram + 1, 1))}
+    url = project_url_key(airdrop, listing_urls)
+    if url:
+        result.add(f'url:{url}')
+    return result
+
+
+def _hash64(value):
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def minhash_signature(tokens, num_perm=DEFAULT_NUM_PERM):
+    """
+    单次哈希分桶 MinHash：hash % num_perm 决定桶，桶内取最小值
+    空桶从右侧最近的非空桶借值（旋转稠密化），保证签名可比较
+    """
+    bins = [_MAX_HASH] * num_perm
+    for token in tokens:
+        h = _hash64(token)
+        slot = h % num_perm
+        value = h // num_perm
+        if value < bins[slot]:
+            bins[slot] = value
+    filled = [i for i, v in enumerate(bins) if v != _MAX_HASH]
+    if not filled:
+        return tuple(bins)
+    signature = list(bins)
+    for i in range(num_perm):
+        if bins[i] == _MAX_HASH:
+            for step in range(1, num_perm):
+                j = (i + step) % num_perm
+                if bins[j] != _MAX_HASH:
+                    signature[i] = bins[j] + step
+                    break
+    return tuple(signature)
+
+
+def estimate_jaccard(sig_a, sig_b):
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / len(sig_a)
+
+
+class DedupIndex:
+    """
+    LSH 去重索引
+
+    add() 返回已存在的重复记录编号，或 None（新记录已加入索引）
+    listing_urls：数据源列表页地址，project_url 为这些地址的记录不使用 same_url_threshold
+    """
+
+    def __init__(self, num_perm=DEFAULT_NUM_PERM, bands=DEFAULT_BANDS, ngram=DEFAULT_NGRAM,
+                 threshold=DEFAULT_THRESHOLD, same_url_threshold=SAME_URL_THRESHOLD, listing_urls=()):
+        if num_perm % bands:
+            raise ValueError('num_perm 必须能被 bands 整除')
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.ngram = ngram
+        self.threshold = threshold
+        self.same_url_threshold = same_url_threshold
+        self.listing_urls = frozenset(normalize_url(url) for url in listing_urls)
+        self._buckets = [{} for _ in range(bands)]
+        self._url_buckets = {}
+        self._signatures = []
+        self._urls = []
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def _band_keys(self, signature):
+        for band in range(self.bands):
+            start = band * self.rows
+            yield band, signature[start:start + self.rows]
+
+    def query(self, airdrop):
+        """返回 (最相似的已有记录编号, 估计相似度)，没有重复时编号为 None"""
+        signature = minhash_signature(shingles(airdrop, self.ngram, self.listing_urls), self.num_perm)
+        return self._query(signature, project_url_key(airdrop, self.listing_urls))
+
+    def _query(self, signature, url):
+        candidates = set(self._url_buckets.get(url, ())) if url else set()
+        for band, key in self._band_keys(signature):
+            candidates.update(self._buckets[band].get(key, ()))
+
+        best, best_score = None, 0.0
+        for candidate in candidates:
+            score = estimate_jaccard(signature, self._signatures[candidate])
+            same_url = url and url == self._urls[candidate]
+            limit = self.same_url_threshold if same_url else self.threshold
+            if score >= limit and score > best_score:
+                best, best_score = candidate, score
+        return best, best_score
+
+    def add(self, airdrop):
+        url = project_url_key(airdrop, self.listing_urls)
+        signature = minhash_signature(shingles(airdrop, self.ngram, self.listing_urls), self.num_perm)
+        duplicate, _ = self._query(signature, url)
+        if duplicate is not None:
+            return duplicate
+
+        record_id = len(self._signatures)
+        self._signatures.append(signature)
+        self._urls.append(url)
+        for band, key in self._band_keys(signature):
+            self._buckets[band].setdefault(key, []).append(record_id)
+        if url:
+            self._url_buckets.setdefault(url, []).append(record_id)
+        return None
+
+
+def _is_empty(value):
+    return value is None or value in ('', [], {})
+
+
+def _filled_fields(airdrop):
+    return sum(1 for f in fields(airdrop) if not _is_empty(getattr(airdrop, f.name)))
+
+
+def merge_duplicates(primary, duplicate):
+    """保留字段更完整的一条，并用另一条补齐缺失字段"""
+    if _filled_fields(duplicate) > _filled_fields(primary):
+        primary, duplicate = duplicate, primary
+    gaps = {
+        f.name: getattr(duplicate, f.name) for f in fields(primary)
+        if _is_empty(getattr(primary, f.name)) and not _is_empty(getattr(duplicate, f.name))
+    }
+    return replace(primary, **gaps) if gaps else primary
+
+
+def dedupe_airdrops(airdrops, **index_options):
+    """
+    合并近似重复的空投，保持首次出现的顺序
+
+    返回 (去重后的列表, 合并掉的条数)
+    """
+    index = DedupIndex(**index_options)
+    unique = []
+    merged_count = 0
+    for airdrop in airdrops:
+        duplicate = index.add(airdrop)
+        if duplicate is None:
+            unique.append(airdrop)
+        else:
+            unique[duplicate] = merge_duplicates(unique[duplicate], airdrop)
+            merged_count += 1
+    return unique, merged_count
@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+"""
+静态 JSON 分片导出（写入之后的可选阶段，命令行 --feeds）
+列表页直接读取随前端部署的静态文件，不再每次访问都查询 public.airdrops
+
+分片由数据库中全部上线中的空投生成（写入完成后整表读取一次），包括后台手工添加的空投，
+不同脚本、不同运行方式导出的结果一致，互相不会删掉对方的文件
+读取方式：--dsn（或 DATABASE_URL）直连 Postgres，否则通过 Supabase（PostgREST）分页读取
+只生成SQL文件时数据库尚未更新，执行SQL后再单独导出：
+
+    python -m airdrop_crawler feeds [--dsn postgresql://...]
+
+目录结构（默认 public/feeds，部署后地址 /feeds/...）：
+    all/page-1.json                     全部上线中的空投
+    type/web3/page-1.json               按 type 分片
+    category/defi/page-1.json           按 category 分片
+    difficulty/easy/page-1.json         按 difficulty 分片
+    manifest.json                       各分片的条数、页数，以及每个文件的 ETag
+
+每页按 ai_score 从高到低排序，固定 page_size 条
+每个文件旁边写出 .gz / .br 预压缩版本（nginx gzip_static / brotli_static、对象存储 CDN 可直接使用）
+文件内容不含生成时间，内容不变时不重写，ETag 也不变，客户端和 CDN 缓存持续有效
+
+brotli 需要 pip install brotli；未安装时只写 .gz
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+from datetime import datetime
+from decimal import Decimal
+
+from . import metrics
+from .record import Airdrop, Status
+from .sql_writer import AIRDROP_TABLE
+from .supabase_writer import DEFAULT_PAGE_SIZE as DEFAULT_READ_PAGE_SIZE
+from .supabase_writer import DEFAULT_TABLE
+
+DEFAULT_FEED_DIR = os.path.join('public', 'feeds')
+DEFAULT_FEED_URL = '/feeds'
+# 每页条数
+DEFAULT_PAGE_SIZE = 50
+# 按这些字段各自分片（另有一个 all 分片包含全部）
+SHARD_FIELDS = ('type', 'category', 'difficulty')
+MANIFEST_NAME = 'manifest.json'
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+COMPRESSED_SUFFIXES = ('.gz', '.br')
+
+
+def shard_slug(value):
+    """分片取值 -> 目录名（小写，非字母数字替换为 -）"""
+    return re.sub(r'[^\w]+', '-', str(value)).strip('-').lower() or 'other'
+
+
+def sort_key(airdrop):
+    # 评分高的在前；同分按数据源内顺序、标题，保证每次导出顺序稳定
+    return (-(airdrop.ai_score or 0), airdrop.sort_order or 0, airdrop.title or '')
+
+
+def row_to_airdrop(row):
+    """数据库行 -> Airdrop（numeric 列经 psycopg2 读出是 Decimal，转成 float 才能写进 JSON）"""
+    return Airdrop.from_dict({k: float(v) if isinstance(v, Decimal) else v for k, v in row.items()})
+
+
+def load_live_airdrops(dsn, table=AIRDROP_TABLE):
+    """直连 Postgres 读取全部上线中的空投（需要 psycopg2）"""
+    import psycopg2
+    import psycopg2.extras
+
+    conn = psycopg2.connect(dsn)
+    try:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute(f"SELECT * FROM {table} WHERE status = %s", (Status.ACTIVE.value,))
+            return [row_to_airdrop(row) for row in cur]
+    finally:
+        conn.close()
+
+
+def fetch_live_airdrops(client, table=DEFAULT_TABLE, page_size=DEFAULT_READ_PAGE_SIZE):
+    """通过 Supabase（PostgREST）分页读取全部上线中的空投"""
+    airdrops = []
+    start = 0
+    while True:
+        # 按 id 排序，分页时不会漏行或重复
+        result = client.table(table).select('*').eq('status', Status.ACTIVE.value) \
+            .order('id').range(start, start + page_size - 1).execute()
+        airdrops.extend(row_to_airdrop(row) for row in result.data)
+        if len(result.data) < page_size:
+            return airdrops
+        start += page_size
+
+
+def build_shards(airdrops, shard_fields=SHARD_FIELDS):
+    """{分片路径: [Airdrop]}，只包含上线中的空投，每个分片已按 ai_score 排序"""
+    ordered = sorted((a for a in airdrops if a.status == Status.ACTIVE), key=sort_key)
+    shards = {'all': ordered}
+    for field in shard_fields:
+        for airdrop in ordered:
+            value = getattr(airdrop, field)
+            if value is not None:
+                shards.setdefault(f'{field}/{shard_slug(value)}', []).append(airdrop)
+    return shards
+
+
+def page_path(shard, page):
+    return f'{shard}/page-{page}.json'
+
+
+def iter_pages(shard, items, page_size=DEFAULT_PAGE_SIZE, feed_url=DEFAULT_FEED_URL):
+    """逐页产出 (相对路径, JSON bytes)；空分片也产出一页，前端不必处理 404"""
+    pages = max((len(items) + page_size - 1) // page_size, 1)
+    for page in range(1, pages + 1):
+        body = {
+            'shard': shard,
+            'page': page,
+            'pages': pages,
+            'total': len(items),
+            'next': f'{feed_url}/{page_path(shard, page + 1)}' if page < pages else None,
+            'items': [a.to_dict() for a in items[(page - 1) * page_size:page * page_size]],
+        }
+        yield page_path(shard, page), json.dumps(body, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def etag(data):
+    return f'"{hashlib.sha256(data).hexdigest()[:32]}"'
+
+
+def compress_gzip(data):
+    # mtime=0：相同内容压缩结果逐字节一致
+    return gzip.compress(data, GZIP_LEVEL, mtime=0)
+
+
+def compress_brotli(data):
+    """未安装 brotli 时返回 None"""
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli.compress(data, quality=BROTLI_QUALITY)
+
+
+def _write_bytes(path, data):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _write_precompressed(path, data):
+    """写出文件及其 .gz / .br 版本，返回 {'gz': 字节数, 'br': 字节数}"""
+    _write_bytes(path, data)
+    sizes = {}
+    for suffix, compressed in (('.gz', compress_gzip(data)), ('.br', compress_brotli(data))):
+        if compressed is None:
+            _remove(path + suffix)
+            continue
+        _write_bytes(path + suffix, compressed)
+        sizes[suffix[1:]] = len(compressed)
+    return sizes
+
+
+class FeedWriter:
+    """把分片写到 feed_dir，维护 manifest.json（内容未变化的文件跳过）"""
+
+    def __init__(self, feed_dir=DEFAULT_FEED_DIR, feed_url=DEFAULT_FEED_URL, page_size=DEFAULT_PAGE_SIZE):
+        self.feed_dir = feed_dir
+        self.feed_url = feed_url.rstrip('/')
+        self.page_size = page_size
+        self.previous = self._load_manifest()
+
+    def _path(self, name):
+        return os.path.join(self.feed_dir, *name.split('/'))
+
+    def _load_manifest(self):
+        try:
+            with open(self._path(MANIFEST_NAME), 'r', encoding='utf-8') as f:
+                return json.load(f).get('files', {})
+        except (OSError, ValueError, AttributeError):
+            return {}
+
+    def _unchanged(self, name, tag):
+        entry = self.previous.get(name)
+        if not entry or entry.get('etag') != tag:
+            return False
+        path = self._path(name)
+        return os.path.exists(path) and all(
+            os.path.exists(path + suffix) for suffix in COMPRESSED_SUFFIXES if entry.get(suffix[1:])
+        )
+
+    def write_file(self, name, data):
+        """写出一个 JSON 文件及其预压缩版本，返回 manifest 条目"""
+        tag = etag(data)
+        if self._unchanged(name, tag):
+            metrics.incr('feed_files_unchanged')
+            return self.previous[name]
+        entry = {'etag': tag, 'bytes': len(data), **_write_precompressed(self._path(name), data)}
+        metrics.incr('feed_files_written')
+        metrics.incr('feed_bytes', len(data))
+        return entry
+
+    def export(self, airdrops, shard_fields=SHARD_FIELDS):
+        """导出所有分片并写 manifest，删除上次导出而本次不再存在的文件，返回 manifest"""
+        files = {}
+        shards = {}
+        for shard, items in build_shards(airdrops, shard_fields).items():
+            for name, data in iter_pages(shard, items, self.page_size, self.feed_url):
+                files[name] = self.write_file(name, data)
+            shards[shard] = {'total': len(items), 'pages': max((len(items) + self.page_size - 1) // self.page_size, 1)}
+
+        for name in self.previous.keys() - files.keys():
+            for suffix in ('',) + COMPRESSED_SUFFIXES:
+                _remove(self._path(name) + suffix)
+
+        manifest = {
+            'generated_at': datetime.now().isoformat(timespec='seconds'),
+            'page_size': self.page_size,
+            'shards': shards,
+            'files': files,
+        }
+        data = json.dumps(manifest, ensure_ascii=False, indent=2).encode('utf-8')
+        # manifest 每次都重写（生成时间变化），同样附带预压缩版本
+        _write_precompressed(self._path(MANIFEST_NAME), data)
+        self.previous = files
+        return manifest
+
+
+def export_feeds(airdrops, feed_dir=DEFAULT_FEED_DIR, feed_url=DEFAULT_FEED_URL, page_size=DEFAULT_PAGE_SIZE):
+    """同步入口：导出一批空投的静态分片，返回 manifest"""
+    return FeedWriter(feed_dir, feed_url, page_size).export(airdrops)
+
+
+def add_output_arguments(parser):
+    """分片输出目录、URL 前缀和每页条数"""
+    parser.add_argument('--feed-dir', default=DEFAULT_FEED_DIR, help='分片输出目录')
+    parser.add_argument('--feed-url', default=DEFAULT_FEED_URL, help='分片对外访问的URL前缀')
+    parser.add_argument('--feed-page-size', type=int, default=DEFAULT_PAGE_SIZE, help='每页条数')
+
+
+def add_arguments(parser):
+    """给命令行加上 --feeds / --feed-dir / --feed-url / --feed-page-size"""
+    parser.add_argument('--feeds', action='store_true',
+                        help='写入完成后从数据库读取全部上线中的空投，导出静态 JSON 分片（按 ai_score 分页，预压缩）')
+    add_output_arguments(parser)
+
+
+def run_from_args(args, get_client=None):
+    """
+    按命令行参数从数据库读取全部上线中的空投并导出分片，打印概要
+
+    有 args.dsn 时直连 Postgres，否则用 get_client() 返回的 Supabase 客户端；
+    读取失败时不导出（保留上次的分片），返回 None
+    """
+    if not args.feeds:
+        return None
+    dsn = getattr(args, 'dsn', None)
+    if not dsn and get_client is None:
+        print("⚠️ --feeds 需要读取数据库：请提供 --dsn（或 DATABASE_URL），或配置 SUPABASE_URL / SUPABASE_KEY")
+        return None
+    with metrics.stage('feeds'):
+        try:
+            airdrops = load_live_airdrops(dsn) if dsn else fetch_live_airdrops(get_client())
+        except Exception as e:
+            print(f"❌ 读取数据库失败，未导出静态分片: {e}")
+            return None
+        manifest = export_feeds(airdrops, args.feed_dir, args.feed_url, args.feed_page_size)
+    counters = metrics.current_run().counters
+    print(f"🗂️ 静态分片已导出到 {args.feed_dir}：{len(airdrops)} 个上线中的空投，{len(manifest['shards'])} 个分片，"
+          f"{len(manifest['files'])} 个文件（更新 {counters.get('feed_files_written', 0)}，"
+          f"未变 {counters.get('feed_files_unchanged', 0)}）")
+    if compress_brotli(b'') is None:
+        print("ℹ️ 未安装 brotli，只生成 .gz（pip install brotli）")
+    return manifest
+
+
+def run_after_sql(args):
+    """生成SQL的命令使用：--load 时数据库已经写入，直接导出；否则提示执行SQL后再导出"""
+    if not args.feeds:
+        return None
+    if getattr(args, 'load', False):
+        return run_from_args(args)
+    print("ℹ️ 数据库尚未执行本次SQL，暂不导出静态分片；执行后运行 python -m airdrop_crawler feeds")
+    return None
+
+
+def _supabase_client():
+    from supabase import create_client
+
+    return create_client(os.environ['SUPABASE_URL'], os.environ['SUPABASE_KEY'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='从数据库读取全部上线中的空投，导出静态 JSON 分片')
+    parser.add_argument('--dsn', default=os.environ.get('DATABASE_URL'),
+                        help='Postgres 连接串，默认读取 DATABASE_URL；不指定时通过 SUPABASE_URL / SUPABASE_KEY 读取')
+    add_output_arguments(parser)
+    args = parser.parse_args(argv)
+    args.feeds = True
+    metrics.start_run('feeds')
+    has_supabase = 'SUPABASE_URL' in os.environ and 'SUPABASE_KEY' in os.environ
+    manifest = run_from_args(args, _supabase_client if has_supabase else None)
+    return 0 if manifest is not None else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+"""
+并发抓取引擎
+基于 asyncio + aiohttp：长连接复用、按主机限流、全局并发上限
+整轮抓取耗时取决于最慢的数据源，而不是所有数据源耗时之和
+容错（见 resilience）：按主机令牌桶限速、429/5xx/网络错误退避重试、连续失败的数据源熔断跳过
+流式解析（stream，数据源配置开启，默认关闭）：响应体按块读取、解码后直接喂给增量解析器，不保留整页文本
+"""
+
+import asyncio
+import codecs
+import hashlib
+import time
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+
+from .http_cache import body_fingerprint
+from .resilience import (
+    DEFAULT_BACKOFF_BASE, DEFAULT_BACKOFF_CAP, DEFAULT_MAX_RETRIES, RETRY_STATUSES,
+    TokenBucket, backoff_delay, parse_retry_after,
+)
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+# 全局同时在途请求上限
+DEFAULT_MAX_IN_FLIGHT = 16
+# 单个主机同时连接上限（避免被目标站点封禁）
+DEFAULT_PER_HOST = 4
+# 单次请求超时（秒）
+DEFAULT_TIMEOUT = 10
+# 流式解析时每次读取的字节数
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+@dataclass
+class FetchResult:
+    """单个数据源的抓取结果"""
+    name: str
+    url: str
+    status: int = 0
+    text: str = ''
+    # 响应体字节数
+    size: int = 0
+    headers: dict = field(default_factory=dict)
+    error: str = ''
+    elapsed: float = 0.0
+    # 响应体指纹；304 时沿用缓存中的指纹
+    body_hash: str = ''
+    # 与上次抓取相比内容未变化（304 或指纹一致）
+    unchanged: bool = False
+    # 实际请求次数（含重试）；熔断跳过时为 0
+    attempts: int = 0
+    skipped: bool = False
+    # 流式解析时抓取阶段已提取的列表项（此时 text 为空）和下一页链接
+    items: list | None = None
+    next_href: str | None = None
+
+    @property
+    def ok(self):
+        return self.status in (200, 304) and not self.error
+
+    @property
+    def host(self):
+        return urlsplit(self.url).netloc
+
+
+class FetchEngine:
+    """
+    异步抓取引擎（持有共享的 ClientSession）
+
+    用法：
+        async with FetchEngine() as engine:
+            results = await engine.fetch_many(AIRDROP_SOURCES)
+    """
+
+    def __init__(self, max_in_flight=DEFAULT_MAX_IN_FLIGHT, per_host=DEFAULT_PER_HOST,
+                 timeout=DEFAULT_TIMEOUT, headers=None, cache=None, rate_limits=None,
+                 max_retries=DEFAULT_MAX_RETRIES, backoff_base=DEFAULT_BACKOFF_BASE,
+                 backoff_cap=DEFAULT_BACKOFF_CAP, breaker=None, stream=None):
+        self.max_in_flight = max_in_flight
+        self.per_host = per_host
+        self.timeout = timeout
+        self.headers = {**DEFAULT_HEADERS, **(headers or {})}
+        # 可选的 ResponseCache，用于条件请求
+        self.cache = cache
+        # 主机 -> {'rate': 每秒请求数, 'burst': 突发上限}；'*' 为未列出主机的默认值
+        self.rate_limits = rate_limits or {}
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        # 可选的 CircuitBreaker，按数据源名称熔断
+        self.breaker = breaker
+        # 可选的 stream(source) -> 增量解析状态（feed/close/next_href）或 None，见 parse_pool.open_stream_parser
+        self.stream = stream
+        self._session = None
+        self._in_flight = None
+        self._buckets = {}
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def open(self):
+        """创建连接池（keep-alive + 每主机连接上限）"""
+        if self._session is not None:
+            return
+        import aiohttp
+
+        connector = aiohttp.TCPConnector(
+            limit=self.max_in_flight,
+            limit_per_host=self.per_host,
+            ttl_dns_cache=300,
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            headers=self.headers,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+        self._in_flight = asyncio.Semaphore(self.max_in_flight)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _bucket(self, host):
+        """主机对应的令牌桶（www. 前缀与裸域名共用配置）"""
+        if host not in self._buckets:
+            limit = (self.rate_limits.get(host) or self.rate_limits.get(host.removeprefix('www.'))
+                     or self.rate_limits.get('*'))
+            self._buckets[host] = TokenBucket(limit['rate'], limit.get('burst', 1)) if limit else None
+        return self._buckets[host]
+
+    async def _request(self, source, result, headers, cached):
+        """发送一次请求并填充 result，返回服务端要求的 Retry-After（秒）"""
+        async with self._session.get(source['url'], headers=headers) as response:
+            result.status = response.status
+            result.headers = {k.lower(): v for k, v in response.headers.items()}
+            if response.status in RETRY_STATUSES:
+                return parse_retry_after(result.headers.get('retry-after'))
+            if response.status == 304 and cached:
+                result.body_hash = cached.get('body_hash') or ''
+                result.unchanged = True
+            else:
+                # 每次尝试都用新的解析状态，重试时不会混入上一次读到一半的列表项
+                parser = self.stream(source) if self.stream and response.status == 200 else None
+                if parser is not None:
+                    await self._read_streaming(response, result, parser)
+                else:
+                    result.size = len(await response.read())
+                    result.text = await response.text()
+                    result.body_hash = body_fingerprint(result.text)
+                result.unchanged = bool(cached) and cached.get('body_hash') == result.body_hash
+        return None
+
+    @staticmethod
+    async def _read_streaming(response, result, parser):
+        """边读边解析：每块解码后喂给 parser，页面文本不整体保留；指纹与 body_fingerprint 一致"""
+        decoder = codecs.getincrementaldecoder(response.charset or 'utf-8')(errors='replace')
+        digest = hashlib.sha256()
+        items = []
+        size = 0
+        async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+            size += len(chunk)
+            text = decoder.decode(chunk)
+            if text:
+                digest.update(text.encode('utf-8'))
+                items.extend(parser.feed(text))
+        text = decoder.decode(b'', final=True)
+        if text:
+            digest.update(text.encode('utf-8'))
+            items.extend(parser.feed(text))
+        items.extend(parser.close())
+        result.size = size
+        result.body_hash = digest.hexdigest()
+        result.items = items
+        result.next_href = parser.next_href
+
+    async def fetch(self, source, headers=None, conditional=True):
+        """
+        抓取单个数据源（限速、重试、熔断），任何异常都记录在结果里而不是抛出
+
+        conditional：有 ResponseCache 时发送条件请求；校验信息由调用方在解析成功后
+        用 cache.store_parsed 保存
+        """
+        result = FetchResult(name=source['name'], url=source['url'])
+        if self.breaker and not self.breaker.allow(source['name']):
+            result.skipped = True
+            result.error = f'熔断中，{self.breaker.retry_in(source["name"]):.0f}秒后重试'
+            return result
+
+        extra_headers = headers
+        cached = self.cache.get(source['url']) if self.cache and conditional else None
+        if cached:
+            headers = {**self.cache.conditional_headers(source['url']), **(headers or {})}
+        bucket = self._bucket(result.host)
+        started = time.perf_counter()
+        for attempt in range(self.max_retries + 1):
+            result.attempts = attempt + 1
+            result.status, result.error = 0, ''
+            result.items = result.next_href = None
+            retry_after = None
+            if bucket:
+                await bucket.acquire()
+            async with self._in_flight:
+                try:
+                    retry_after = await self._request(source, result, headers, cached)
+                    if result.status in RETRY_STATUSES:
+                        result.error = f'HTTP {result.status}'
+                except asyncio.TimeoutError:
+                    result.error = f'超时（{self.timeout}秒）'
+                except Exception as e:
+                    result.error = str(e) or type(e).__name__
+            if not result.error or attempt == self.max_retries:
+                break
+            delay = backoff_delay(attempt + 1, self.backoff_base, self.backoff_cap, retry_after)
+            if delay > self.backoff_cap:
+                # 服务端要求等待的时间太长，本轮放弃，下次运行再试
+                result.error += f'（Retry-After {delay:.0f}秒，放弃重试）'
+                break
+            await asyncio.sleep(delay)
+        result.elapsed = time.perf_counter() - started
+        if result.status == 304 and cached and self.cache.get_parsed(source['url'], result.body_hash) is None:
+            # 304 没有响应体，缓存中的解析结果又已失效（如被其他进程改写），不带条件请求头重新抓取
+            return await self.fetch(source, extra_headers, conditional=False)
+
+        if self.breaker:
+            if result.ok:
+                self.breaker.record_success(source['name'])
+            else:
+                self.breaker.record_failure(source['name'], result.error or f'HTTP {result.status}')
+        return result
+
+    async def request(self, method, url, max_bytes=None):
+        """
+        单次请求（同样受令牌桶和并发上限约束，但不重试、不做条件请求）
+
+        返回 (状态码, 小写响应头, 响应体bytes)；HEAD 请求响应体为空
+        响应体超过 max_bytes 时停止读取（返回的长度大于 max_bytes，由调用方判断）
+        网络错误、超时直接抛出
+        """
+        bucket = self._bucket(urlsplit(url).netloc)
+        if bucket:
+            await bucket.acquire()
+        async with self._in_flight:
+            async with self._session.request(method, url, allow_redirects=True) as response:
+                headers = {k.lower(): v for k, v in response.headers.items()}
+                if method == 'HEAD':
+                    return response.status, headers, b''
+                if not max_bytes:
+                    return response.status, headers, await response.read()
+                body = bytearray()
+                async for chunk in response.content.iter_chunked(64 * 1024):
+                    body += chunk
+                    if len(body) > max_bytes:
+                        break
+                return response.status, headers, bytes(body)
+
+    async def fetch_many(self, sources):
+        """并发抓取所有数据源，结果顺序与 sources 一致"""
+        return await asyncio.gather(*(self.fetch(source) for source in sources))
+
+
+def fetch_sources(sources, **engine_options):
+    """同步入口：并发抓取 sources 并返回 FetchResult 列表"""
+    async def run():
+        async with FetchEngine(**engine_options) as engine:
+            return await engine.fetch_many(sources)
+
+    return asyncio.run(run())
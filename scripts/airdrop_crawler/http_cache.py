@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+HTTP响应缓存（按URL存盘）
+保存 ETag / Last-Modified 用于条件请求，并记录响应体指纹
+页面未变化（304 或指纹相同）时直接复用上次的解析结果
+校验信息只在解析成功后和解析结果一起保存：解析失败的页面下次不会收到 304
+"""
+
+import hashlib
+import json
+import os
+
+DEFAULT_CACHE_DIR = os.path.join('.cache', 'airdrop_crawler', 'http')
+
+
+def body_fingerprint(text):
+    """响应体内容指纹（sha256）"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """
+    每个URL一个JSON文件：
+    {url, etag, last_modified, body_hash, parsed}
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def _path(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f'{key}.json')
+
+    def get(self, url):
+        try:
+            with open(self._path(url), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, url, entry):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(url)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def conditional_headers(self, url):
+        """生成 If-None-Match / If-Modified-Since 请求头（没有可复用的解析结果时不发条件请求）"""
+        entry = self.get(url)
+        if not entry or entry.get('parsed') is None:
+            return {}
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def get_parsed(self, url, body_hash):
+        """指纹一致时返回上次的解析结果，否则返回 None"""
+        entry = self.get(url)
+        if not entry or entry.get('body_hash') != body_hash:
+            return None
+        return entry.get('parsed')
+
+    def store_parsed(self, url, body_hash, parsed, headers=None):
+        """解析成功后记录解析结果和响应校验信息（headers 键为小写；为 None 时沿用原有校验信息）"""
+        entry = self.get(url) or {'url': url}
+        if headers is not None:
+            entry['etag'] = headers.get('etag')
+            entry['last_modified'] = headers.get('last-modified')
+        entry['body_hash'] = body_hash
+        entry['parsed'] = parsed
+        self._write(url, entry)
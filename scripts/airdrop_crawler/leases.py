@@ -0,0 +1,401 @@
+# -*- coding: utf-8 -*-
+"""
+数据源租约：多个爬虫 worker（多进程或多台机器）分片爬取同一批数据源
+
+每个 worker 循环执行：
+    领取租约（到期、空闲或租约已过期的数据源，每次最多 batch 个）
+    -> 爬取这些数据源（后台线程每 ttl/3 秒心跳续期）
+    -> 写入前再校验一次租约（token 未变才写）
+    -> 释放租约并记下 last_crawled_at，interval 秒内不会再被任何 worker 领取
+同一数据源同一时刻只有一个 worker 持有租约，一轮内只被爬取、写入一次；
+worker 崩溃或卡住时心跳停止，租约过期后由其他 worker 接手
+数据源之间互不依赖，吞吐量随 worker 数近似线性增长（受数据源个数限制）
+
+租约存储：
+- 本机多进程：SQLite 单文件（默认 .cache/airdrop_crawler/leases.sqlite3）
+- 多台机器：Postgres 上的 airdrop_sources 表（--dsn，先执行 添加数据源租约.sql，需要 psycopg2）
+
+    python -m airdrop_crawler worker [--dsn postgresql://...] [--once]
+    python -m airdrop_crawler leases [--dsn ...]          # 查看各数据源的租约状态
+"""
+
+import argparse
+import os
+import signal
+import socket
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+
+from . import metrics
+
+DEFAULT_LEASE_PATH = os.path.join('.cache', 'airdrop_crawler', 'leases.sqlite3')
+# 租约时长（秒）：心跳每 ttl/3 续期一次，连续错过两次心跳仍不会被接手
+DEFAULT_LEASE_TTL = 60
+# 每次领取的数据源个数
+DEFAULT_LEASE_BATCH = 1
+# 同一数据源两次爬取的最短间隔（秒），与原 cron 一致（每2小时）
+DEFAULT_CRAWL_INTERVAL = 2 * 3600
+# 没有可领取的数据源时隔多久再试（秒）
+DEFAULT_POLL_INTERVAL = 30
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS airdrop_sources (
+    name TEXT PRIMARY KEY,
+    type TEXT NOT NULL DEFAULT 'crawler',
+    is_enabled INTEGER NOT NULL DEFAULT 1,
+    last_crawled_at REAL,
+    success_count INTEGER NOT NULL DEFAULT 0,
+    error_count INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires_at REAL,
+    lease_token INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+def default_worker_id():
+    """主机名:进程号，在所有机器的所有 worker 中唯一"""
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+@dataclass(frozen=True)
+class Lease:
+    """一个数据源的租约；token 为领取时的版本号，被其他 worker 接手后不再有效"""
+    source: str
+    token: int
+
+
+class SqliteLeaseStore:
+    """本机多进程共用的租约表（结构与 airdrop_sources 的租约相关列一致）"""
+
+    def __init__(self, path=DEFAULT_LEASE_PATH):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        # 自动提交，事务由 BEGIN IMMEDIATE 显式开启（领取时先拿到写锁，避免两个进程选中同一行）
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SQLITE_SCHEMA)
+
+    def reopen(self):
+        """同一存储的新连接（心跳线程使用，SQLite 连接不跨线程共享）"""
+        return SqliteLeaseStore(self.path)
+
+    def close(self):
+        self.conn.close()
+
+    def register(self, sources):
+        """登记数据源 [(名称, 类型)]，已存在的不变"""
+        self.conn.executemany('INSERT OR IGNORE INTO airdrop_sources (name, type) VALUES (?, ?)', sources)
+
+    def acquire(self, owner, names, limit, ttl, interval):
+        """领取最多 limit 个到期且没有有效租约的数据源，返回 ([Lease], 其中接手他人过期租约的个数)"""
+        now = time.time()
+        placeholders = ', '.join('?' * len(names))
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            rows = self.conn.execute(
+                f"SELECT name, lease_owner FROM airdrop_sources\n"
+                f"WHERE is_enabled AND name IN ({placeholders})\n"
+                f"AND (lease_expires_at IS NULL OR lease_expires_at < ?)\n"
+                f"AND (last_crawled_at IS NULL OR last_crawled_at <= ?)\n"
+                f"ORDER BY last_crawled_at IS NOT NULL, last_crawled_at LIMIT ?",
+                (*names, now, now - interval, limit),
+            ).fetchall()
+            leases = []
+            for name, _ in rows:
+                (token,) = self.conn.execute(
+                    "UPDATE airdrop_sources SET lease_owner = ?, lease_expires_at = ?, lease_token = lease_token + 1\n"
+                    "WHERE name = ? RETURNING lease_token",
+                    (owner, now + ttl, name),
+                ).fetchone()
+                leases.append(Lease(name, token))
+            self.conn.execute('COMMIT')
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            raise
+        return leases, sum(1 for _, previous in rows if previous is not None)
+
+    def renew(self, owner, leases, ttl):
+        """续期，返回仍然持有的租约（token 变化说明已被其他 worker 接手）"""
+        expires_at = time.time() + ttl
+        held = []
+        for lease in leases:
+            cur = self.conn.execute(
+                "UPDATE airdrop_sources SET lease_expires_at = ? WHERE name = ? AND lease_owner = ? AND lease_token = ?",
+                (expires_at, lease.source, owner, lease.token),
+            )
+            if cur.rowcount:
+                held.append(lease)
+        return held
+
+    def release(self, owner, lease, ok=None):
+        """释放租约；ok 为 True/False 时记为完成一次爬取（成功/失败），为 None 时只放弃租约
+
+        返回释放时是否仍持有该租约
+        """
+        if ok is None:
+            sql = "UPDATE airdrop_sources SET lease_owner = NULL, lease_expires_at = NULL\n"
+            params = ()
+        else:
+            counter = 'success_count' if ok else 'error_count'
+            sql = (f"UPDATE airdrop_sources SET lease_owner = NULL, lease_expires_at = NULL,\n"
+                   f"last_crawled_at = ?, {counter} = {counter} + 1\n")
+            params = (time.time(),)
+        cur = self.conn.execute(sql + "WHERE name = ? AND lease_owner = ? AND lease_token = ?",
+                                (*params, lease.source, owner, lease.token))
+        return cur.rowcount == 1
+
+    def status(self):
+        """[(名称, 持有者, 租约剩余秒数, 距上次爬取秒数, 成功次数, 失败次数)]"""
+        now = time.time()
+        rows = self.conn.execute(
+            "SELECT name, lease_owner, lease_expires_at, last_crawled_at, success_count, error_count\n"
+            "FROM airdrop_sources ORDER BY name"
+        ).fetchall()
+        return [(name, owner, None if expires is None else expires - now,
+                 None if crawled is None else now - crawled, success, error)
+                for name, owner, expires, crawled, success, error in rows]
+
+
+class PostgresLeaseStore:
+    """airdrop_sources 表上的租约（多台机器共用，需先执行 添加数据源租约.sql）"""
+
+    def __init__(self, dsn):
+        import psycopg2
+
+        self.dsn = dsn
+        self.conn = psycopg2.connect(dsn)
+        self.conn.autocommit = True
+
+    def reopen(self):
+        return PostgresLeaseStore(self.dsn)
+
+    def close(self):
+        self.conn.close()
+
+    def register(self, sources):
+        with self.conn.cursor() as cur:
+            cur.executemany("INSERT INTO airdrop_sources (name, type) VALUES (%s, %s) ON CONFLICT (name) DO NOTHING",
+                            list(sources))
+
+    def acquire(self, owner, names, limit, ttl, interval):
+        # SKIP LOCKED：并发领取的 worker 跳过彼此正在领取的行，不互相等待
+        # last_crawled_at 是不带时区的时间（默认值为 NOW()），与 LOCALTIMESTAMP 比较
+        with self.conn.cursor() as cur:
+            cur.execute(
+                "WITH due AS (\n"
+                "  SELECT id, lease_owner FROM airdrop_sources\n"
+                "  WHERE is_enabled AND name = ANY(%(names)s)\n"
+                "  AND (lease_expires_at IS NULL OR lease_expires_at < now())\n"
+                "  AND (last_crawled_at IS NULL OR last_crawled_at <= LOCALTIMESTAMP - make_interval(secs => %(interval)s))\n"
+                "  ORDER BY last_crawled_at NULLS FIRST LIMIT %(limit)s\n"
+                "  FOR UPDATE SKIP LOCKED\n"
+                ")\n"
+                "UPDATE airdrop_sources s SET lease_owner = %(owner)s,\n"
+                "lease_expires_at = now() + make_interval(secs => %(ttl)s), lease_token = s.lease_token + 1\n"
+                "FROM due WHERE s.id = due.id\n"
+                "RETURNING s.name, s.lease_token, due.lease_owner",
+                {'names': list(names), 'interval': float(interval), 'limit': limit, 'owner': owner, 'ttl': float(ttl)},
+            )
+            rows = cur.fetchall()
+        return [Lease(name, token) for name, token, _ in rows], sum(1 for *_, previous in rows if previous is not None)
+
+    def renew(self, owner, leases, ttl):
+        if not leases:
+            return []
+        with self.conn.cursor() as cur:
+            cur.execute(
+                "UPDATE airdrop_sources SET lease_expires_at = now() + make_interval(secs => %s)\n"
+                "WHERE lease_owner = %s AND (name, lease_token) IN (SELECT * FROM unnest(%s::text[], %s::bigint[]))\n"
+                "RETURNING name",
+                (float(ttl), owner, [lease.source for lease in leases], [lease.token for lease in leases]),
+            )
+            held = {name for (name,) in cur.fetchall()}
+        return [lease for lease in leases if lease.source in held]
+
+    def release(self, owner, lease, ok=None):
+        if ok is None:
+            sql = "UPDATE airdrop_sources SET lease_owner = NULL, lease_expires_at = NULL\n"
+        else:
+            counter = 'success_count' if ok else 'error_count'
+            sql = (f"UPDATE airdrop_sources SET lease_owner = NULL, lease_expires_at = NULL,\n"
+                   f"last_crawled_at = LOCALTIMESTAMP, {counter} = COALESCE({counter}, 0) + 1\n")
+        with self.conn.cursor() as cur:
+            cur.execute(sql + "WHERE name = %s AND lease_owner = %s AND lease_token = %s",
+                        (lease.source, owner, lease.token))
+            return cur.rowcount == 1
+
+    def status(self):
+        with self.conn.cursor() as cur:
+            cur.execute(
+                "SELECT name, lease_owner, extract(epoch FROM lease_expires_at - now()),\n"
+                "extract(epoch FROM LOCALTIMESTAMP - last_crawled_at), success_count, error_count\n"
+                "FROM airdrop_sources ORDER BY name"
+            )
+            return [(name, owner, None if expires is None else float(expires),
+                     None if crawled is None else float(crawled), success, error)
+                    for name, owner, expires, crawled, success, error in cur.fetchall()]
+
+
+def open_store(dsn=None, path=DEFAULT_LEASE_PATH):
+    """有 dsn 时用 Postgres 的 airdrop_sources，否则用本机 SQLite"""
+    return PostgresLeaseStore(dsn) if dsn else SqliteLeaseStore(path)
+
+
+class LeaseKeeper:
+    """
+    后台心跳：持有租约期间每 ttl/3 秒续期一次（用独立连接，不与主线程抢连接）
+    续期失败（已被接手）的租约从 held 中移除
+
+        with LeaseKeeper(store, owner, leases, ttl) as keeper:
+            ...  # 爬取
+            held = keeper.check()   # 写入前同步校验一次
+    """
+
+    def __init__(self, store, owner, leases, ttl=DEFAULT_LEASE_TTL):
+        self.store = store
+        self.owner = owner
+        self.held = list(leases)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _update(self, held):
+        with self._lock:
+            lost = [lease for lease in self.held if lease not in held]
+            self.held = [lease for lease in self.held if lease in held]
+        for lease in lost:
+            print(f"⚠️ {lease.source}: 租约已失效（已被其他 worker 接手）")
+            metrics.incr('leases_lost')
+        return list(self.held)
+
+    def _run(self):
+        store = self.store.reopen()
+        try:
+            while not self._stop.wait(self.ttl / 3):
+                try:
+                    self._update(store.renew(self.owner, list(self.held), self.ttl))
+                except Exception as e:
+                    # 暂时连不上存储时继续重试；一直失败则租约过期，由其他 worker 接手
+                    print(f"⚠️ 租约心跳失败: {e}")
+        finally:
+            store.close()
+
+    def check(self):
+        """立即续期并返回仍然持有的租约"""
+        return self._update(self.store.renew(self.owner, list(self.held), self.ttl))
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, name='lease-heartbeat', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+class ShardWorker:
+    """
+    领取租约 -> 爬取 -> 校验租约 -> 写入 -> 释放，循环直到没有到期的数据源（once）或收到退出信号
+
+    crawl(names) -> {数据源名称: [空投]}（失败的数据源不在其中）
+    write(airdrops) -> 是否写入成功
+    """
+
+    def __init__(self, store, sources, crawl, write, owner=None, ttl=DEFAULT_LEASE_TTL,
+                 batch=DEFAULT_LEASE_BATCH, interval=DEFAULT_CRAWL_INTERVAL, poll=DEFAULT_POLL_INTERVAL,
+                 metrics_json=None, metrics_prom=None):
+        self.store = store
+        # [(名称, 类型)]
+        self.sources = list(sources)
+        self.crawl = crawl
+        self.write = write
+        self.owner = owner or default_worker_id()
+        self.ttl = ttl
+        self.batch = batch
+        self.interval = interval
+        self.poll = poll
+        self.metrics_json = metrics_json
+        self.metrics_prom = metrics_prom
+        self._stop = threading.Event()
+        self.store.register(self.sources)
+
+    def stop(self, *_):
+        self._stop.set()
+
+    def run_batch(self):
+        """处理一批租约，返回领取到的个数（0 表示当前没有到期的数据源）"""
+        leases, taken_over = self.store.acquire(self.owner, [name for name, _ in self.sources],
+                                                self.batch, self.ttl, self.interval)
+        if not leases:
+            return 0
+        metrics.start_run('worker')
+        metrics.incr('leases_acquired', len(leases))
+        metrics.incr('leases_taken_over', taken_over)
+        print(f"🔑 {self.owner} 领取：{', '.join(lease.source for lease in leases)}")
+        try:
+            with LeaseKeeper(self.store, self.owner, leases, self.ttl) as keeper:
+                results = self.crawl([lease.source for lease in leases])
+                # 写入前同步校验：只写入仍然持有租约的数据源，被接手的数据源由新持有者负责
+                held = [lease for lease in keeper.check() if lease.source in results]
+                airdrops = [item for lease in held for item in results[lease.source]]
+                ok = self.write(airdrops) if airdrops else True
+        except BaseException:
+            # 中断时放弃租约但不记为已爬取，其他 worker 可以立即接手
+            for lease in leases:
+                self.store.release(self.owner, lease)
+            raise
+        for lease in leases:
+            self.store.release(self.owner, lease, ok and lease in held)
+        metrics.finish_run(self.metrics_json, self.metrics_prom)
+        return len(leases)
+
+    def run(self, once=False):
+        """once：没有到期的数据源时退出；否则常驻，每 poll 秒检查一次；返回处理的租约总数"""
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                signal.signal(signum, self.stop)
+            except ValueError:
+                # 不在主线程中（如测试）时不接管信号
+                pass
+        total = 0
+        while not self._stop.is_set():
+            count = self.run_batch()
+            total += count
+            if not count:
+                if once:
+                    break
+                self._stop.wait(self.poll)
+        return total
+
+
+def add_arguments(parser):
+    """给命令行加上租约相关参数"""
+    parser.add_argument('--dsn', help='在 Postgres 的 airdrop_sources 上分配租约（多台机器）；不指定时用本机 SQLite')
+    parser.add_argument('--lease-path', default=DEFAULT_LEASE_PATH, help='本机 SQLite 租约文件')
+    parser.add_argument('--lease-ttl', type=float, default=DEFAULT_LEASE_TTL, help='租约时长（秒）')
+    parser.add_argument('--lease-batch', type=int, default=DEFAULT_LEASE_BATCH, help='每次领取的数据源个数')
+    parser.add_argument('--crawl-interval', type=float, default=DEFAULT_CRAWL_INTERVAL,
+                        help='同一数据源两次爬取的最短间隔（秒）')
+
+
+def main(argv=None):
+    """打印各数据源的租约状态"""
+    parser = argparse.ArgumentParser(prog='python -m airdrop_crawler leases', description='查看数据源租约状态')
+    parser.add_argument('--dsn', help='Postgres 连接串（不指定时读取本机 SQLite）')
+    parser.add_argument('--lease-path', default=DEFAULT_LEASE_PATH, help='本机 SQLite 租约文件')
+    args = parser.parse_args(argv)
+    store = open_store(args.dsn, args.lease_path)
+    try:
+        for name, owner, expires_in, crawled_ago, success, error in store.status():
+            lease = f'{owner}（剩余 {expires_in:.0f} 秒）' if owner and expires_in is not None else '空闲'
+            crawled = f'{crawled_ago:.0f} 秒前' if crawled_ago is not None else '从未'
+            print(f"{name}: 租约 {lease}，上次爬取 {crawled}，成功 {success} 次，失败 {error} 次")
+    finally:
+        store.close()
+    return 0
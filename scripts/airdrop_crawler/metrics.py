@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+爬取运行的分阶段计时与计数
+- stage('fetch')：累计各阶段耗时（可重入、可多次进入）
+- incr('pages_fetched', n)：计数器
+- 可选 tracemalloc 峰值内存
+运行结束后输出 JSON 报告和 Prometheus textfile（供 node_exporter 的 textfile collector 采集）
+
+用法：
+    metrics.start_run('crawl', trace_memory=True)
+    with metrics.stage('fetch'):
+        ...
+    metrics.incr('pages_fetched')
+    metrics.finish_run('report.json', '/var/lib/node_exporter/textfile/airdrop_crawler.prom')
+"""
+
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+METRIC_PREFIX = 'airdrop_crawler'
+
+# 计数器的说明（出现在 Prometheus 的 HELP 行；未列出的计数器同样会导出）
+COUNTER_HELP = {
+    'pages_fetched': '成功抓取的页面数',
+    'pages_unchanged': '内容未变化（304 或指纹一致）的页面数',
+    'fetch_errors': '抓取失败的页面数',
+    'fetch_retries': '抓取重试次数',
+    'circuit_open_skips': '因熔断跳过的数据源数',
+    'bytes_fetched': '抓取的响应体字节数',
+    'sources_checked': '守护进程本轮抓取的数据源数',
+    'sources_changed': '守护进程本轮内容有变化的数据源数',
+    'daemon_write_failures': '守护进程写入失败、未提交指纹的轮数',
+    'leases_acquired': '分片 worker 领取的数据源租约数',
+    'leases_taken_over': '接手其他 worker 过期租约的次数',
+    'leases_lost': '写入前发现已被其他 worker 接手、放弃写入的租约数',
+    'items_parsed': '解析出的空投条数',
+    'parse_failures': '解析失败的页面数',
+    'items_merged': '去重合并掉的空投条数',
+    'items_scored': '完成评分的空投条数',
+    'links_checked': '检查的链接数',
+    'links_broken': '失效链接数',
+    'thumbnails_created': '新生成的缩略图数',
+    'image_bytes_saved': '缩略图比原图节省的字节数',
+    'images_rewritten': '改写为缩略图地址的 image_url 数',
+    'feed_files_written': '内容变化、重新写出的静态分片文件数',
+    'feed_files_unchanged': '内容未变化、跳过写出的静态分片文件数',
+    'feed_bytes': '写出的静态分片字节数（未压缩）',
+    'push_delivered': '推送成功的群组数',
+    'push_failed': '推送失败的群组数',
+    'push_retries': '推送重试次数',
+    'rows_written': '写入数据库的行数',
+    'rows_failed': '写入失败的行数',
+    'rows_unchanged': '内容指纹与线上相同、跳过写入的行数',
+    'rows_expired': '本次数据中已消失、标记为下架的行数',
+    'bytes_copied': '二进制 COPY 发送的字节数',
+    'sql_chars': '生成的SQL字符数',
+}
+
+
+class RunMetrics:
+    """一次运行的计时和计数"""
+
+    def __init__(self, job='crawl', trace_memory=False):
+        self.job = job
+        self.trace_memory = trace_memory
+        self.stages = {}
+        self.counters = {}
+        self.started_at = None
+        self.duration = 0.0
+        self.peak_memory = None
+        self._started = None
+
+    def start(self):
+        self.started_at = datetime.now()
+        self._started = time.perf_counter()
+        if self.trace_memory:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+        return self
+
+    def finish(self):
+        if self._started is not None:
+            self.duration = time.perf_counter() - self._started
+        if self.trace_memory:
+            import tracemalloc
+            if tracemalloc.is_tracing():
+                self.peak_memory = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+        return self
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            stats = self.stages.setdefault(name, {'seconds': 0.0, 'calls': 0})
+            stats['seconds'] += time.perf_counter() - started
+            stats['calls'] += 1
+
+    def incr(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def report(self):
+        return {
+            'job': self.job,
+            'started_at': self.started_at.isoformat(timespec='seconds') if self.started_at else None,
+            'duration_seconds': round(self.duration, 6),
+            'stages': {
+                name: {'seconds': round(stats['seconds'], 6), 'calls': stats['calls']}
+                for name, stats in self.stages.items()
+            },
+            'counters': dict(self.counters),
+            'peak_memory_bytes': self.peak_memory,
+        }
+
+    def prometheus_lines(self):
+        labels = f'job="{self.job}"'
+        lines = [
+            f'# HELP {METRIC_PREFIX}_run_duration_seconds 整次运行耗时',
+            f'# TYPE {METRIC_PREFIX}_run_duration_seconds gauge',
+            f'{METRIC_PREFIX}_run_duration_seconds{{{labels}}} {self.duration:.6f}',
+            f'# HELP {METRIC_PREFIX}_last_run_timestamp_seconds 最近一次运行结束的时间',
+            f'# TYPE {METRIC_PREFIX}_last_run_timestamp_seconds gauge',
+            f'{METRIC_PREFIX}_last_run_timestamp_seconds{{{labels}}} {time.time():.0f}',
+        ]
+        if self.stages:
+            lines += [
+                f'# HELP {METRIC_PREFIX}_stage_seconds 各阶段耗时',
+                f'# TYPE {METRIC_PREFIX}_stage_seconds gauge',
+            ]
+            lines += [
+                f'{METRIC_PREFIX}_stage_seconds{{{labels},stage="{name}"}} {stats["seconds"]:.6f}'
+                for name, stats in self.stages.items()
+            ]
+        for name, value in self.counters.items():
+            metric = f'{METRIC_PREFIX}_{name}'
+            lines += [
+                f'# HELP {metric} {COUNTER_HELP.get(name, name)}',
+                f'# TYPE {metric} gauge',
+                f'{metric}{{{labels}}} {value}',
+            ]
+        if self.peak_memory is not None:
+            lines += [
+                f'# HELP {METRIC_PREFIX}_peak_memory_bytes tracemalloc 记录的峰值内存',
+                f'# TYPE {METRIC_PREFIX}_peak_memory_bytes gauge',
+                f'{METRIC_PREFIX}_peak_memory_bytes{{{labels}}} {self.peak_memory}',
+            ]
+        return lines
+
+    def write_json(self, path):
+        _atomic_write(path, json.dumps(self.report(), ensure_ascii=False, indent=2) + '\n')
+
+    def write_prometheus(self, path):
+        """textfile collector 要求原子替换，否则可能读到写了一半的文件"""
+        _atomic_write(path, '\n'.join(self.prometheus_lines()) + '\n')
+
+
+def _atomic_write(path, content):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+# 当前运行（未调用 start_run 时也可记录，只是不会输出）
+_current = RunMetrics()
+
+
+def start_run(job='crawl', trace_memory=False):
+    global _current
+    _current = RunMetrics(job, trace_memory).start()
+    return _current
+
+
+def current_run():
+    return _current
+
+
+def stage(name):
+    return _current.stage(name)
+
+
+def incr(name, value=1):
+    _current.incr(name, value)
+
+
+def add_arguments(parser):
+    """给命令行加上 --metrics-json / --metrics-prom / --trace-memory"""
+    parser.add_argument('--metrics-json', help='运行报告（各阶段耗时、计数）输出路径')
+    parser.add_argument('--metrics-prom', help='Prometheus textfile 输出路径（node_exporter 采集）')
+    parser.add_argument('--trace-memory', action='store_true', help='用 tracemalloc 记录峰值内存')
+
+
+def finish_run(json_path=None, prometheus_path=None):
+    """结束当前运行，并按需写出 JSON 报告 / Prometheus textfile"""
+    _current.finish()
+    if json_path:
+        _current.write_json(json_path)
+    if prometheus_path:
+        _current.write_prometheus(prometheus_path)
+    return _current
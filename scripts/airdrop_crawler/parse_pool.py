@@ -0,0 +1,355 @@
+# -*- coding: utf-8 -*-
+"""
+多进程解析阶段
+抓取到的页面交给 ProcessPoolExecutor 解析：
+- 解析函数按 AIRDROP_SOURCES 中的 'parser' 名称注册
+- 每个任务有超时（工作进程内用 SIGALRM 中断，父进程再兜底，卡死时只放弃该页面，见 ParsePool）
+- 工作进程处理一定数量任务后自动重建（max_tasks_per_child）
+一个异常页面最多占用一个工作进程，不会拖住整轮爬取
+"""
+
+import os
+import signal
+import time
+from dataclasses import dataclass, field
+from functools import partial
+
+# 单页解析超时（秒）
+DEFAULT_TASK_TIMEOUT = 20
+# 每个工作进程处理多少个任务后重建（释放解析器内存泄漏）
+DEFAULT_MAX_TASKS_PER_CHILD = 50
+# 父进程兜底等待的额外时间（秒）
+HARD_TIMEOUT_GRACE = 5
+# 父进程检查任务是否超过兜底时间的间隔（秒）
+HARD_TIMEOUT_POLL = 0.5
+# 工作进程异常退出导致进程池损坏时，同池页面重新提交的次数
+BROKEN_POOL_RETRIES = 1
+DEFAULT_PARSER = 'listing'
+
+# 解析函数注册表：名称 -> parser(html, source) -> [空投]
+PARSERS = {}
+
+
+def register_parser(name):
+    """注册解析函数（必须是模块级函数，才能被工作进程按引用加载）"""
+    def decorator(func):
+        PARSERS[name] = func
+        return func
+    return decorator
+
+
+# 列表项转换函数注册表：名称 -> items_parser(items, source) -> [空投]
+# 流式抓取时列表项已在下载过程中提取（见 parsers.ListingStream），只需转换，不再经过进程池
+ITEM_PARSERS = {}
+
+
+def register_items_parser(name):
+    """注册列表项转换函数（与同名的 register_parser 对应）"""
+    def decorator(func):
+        ITEM_PARSERS[name] = func
+        return func
+    return decorator
+
+
+# 分页解析函数注册表：名称 -> page_parser(html, source) -> ([空投], 下一页链接)
+# 分页爬取时列表项和下一页链接在同一次解析中取得，不再为找下一页单独解析一遍
+PAGE_PARSERS = {}
+
+
+def register_page_parser(name):
+    """注册分页解析函数（与同名的 register_parser 对应，同样必须是模块级函数）"""
+    def decorator(func):
+        PAGE_PARSERS[name] = func
+        return func
+    return decorator
+
+
+def resolve_items_parser(source):
+    """数据源对应的列表项转换函数，没有注册时返回 None"""
+    return ITEM_PARSERS.get(source.get('parser', DEFAULT_PARSER))
+
+
+def open_stream_parser(source):
+    """
+    数据源配置 'stream': True 且有列表项转换函数时，返回增量解析状态（FetchEngine 的 stream 参数）
+    否则返回 None，整页下载后交给进程池解析
+    """
+    if not source.get('stream') or resolve_items_parser(source) is None:
+        return None
+    from .parsers import open_stream
+
+    return open_stream(source)
+
+
+def resolve_parser(source):
+    name = source.get('parser', DEFAULT_PARSER)
+    if name not in PARSERS:
+        raise KeyError(f"数据源 {source['name']} 的解析函数未注册: {name}")
+    return PARSERS[name]
+
+
+def _parse_then_next_href(parser, html, source):
+    """没有注册分页解析函数时：先按 register_parser 的函数解析，再单独取下一页链接"""
+    from .parsers import extract_next_href
+
+    return parser(html, source), extract_next_href(html, source)
+
+
+def resolve_page_parser(source):
+    name = source.get('parser', DEFAULT_PARSER)
+    if name in PAGE_PARSERS:
+        return PAGE_PARSERS[name]
+    return partial(_parse_then_next_href, resolve_parser(source))
+
+
+@dataclass
+class ParseOutcome:
+    """单个页面的解析结果（next_href 只在分页解析时填写）"""
+    name: str
+    items: list = field(default_factory=list)
+    error: str = ''
+    elapsed: float = 0.0
+    next_href: str = None
+
+    @property
+    def ok(self):
+        return not self.error
+
+
+class ParseTimeout(Exception):
+    pass
+
+
+def _raise_timeout(signum, frame):
+    raise ParseTimeout()
+
+
+def _run_parser(parser, html, source, timeout, paged=False):
+    """在工作进程中执行解析；支持 SIGALRM 的平台上超时即中断；paged 时解析函数返回 (空投, 下一页链接)"""
+    started = time.perf_counter()
+    use_alarm = timeout and hasattr(signal, 'setitimer')
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        items, next_href = parser(html, source) if paged else (parser(html, source), None)
+        return ParseOutcome(source['name'], items, elapsed=time.perf_counter() - started, next_href=next_href)
+    except ParseTimeout:
+        return ParseOutcome(source['name'], error=f'解析超时（{timeout}秒）',
+                            elapsed=time.perf_counter() - started)
+    except Exception as e:
+        return ParseOutcome(source['name'], error=f'{type(e).__name__}: {e}',
+                            elapsed=time.perf_counter() - started)
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def convert_items(source, items):
+    """流式抓取时已提取的列表项 -> ParseOutcome（转换很轻，在当前进程中执行）"""
+    started = time.perf_counter()
+    try:
+        airdrops = resolve_items_parser(source)(items, source)
+    except Exception as e:
+        return ParseOutcome(source['name'], error=f'{type(e).__name__}: {e}',
+                            elapsed=time.perf_counter() - started)
+    return ParseOutcome(source['name'], airdrops, elapsed=time.perf_counter() - started)
+
+
+class ParsePool:
+    """
+    解析进程池
+
+    用法：
+        with ParsePool() as pool:
+            outcomes = pool.parse_many([(source, html), ...])
+
+    某个页面超过兜底时间仍未返回（工作进程卡死）时，只把这个页面记为超时：
+    当前进程池停止接收新任务（之后的页面交给新进程池），其中排队未开始的页面取消后改交新进程池，
+    正在其它工作进程中解析的页面照常完成，之后再结束旧进程池（连同卡死的工作进程）
+    """
+
+    def __init__(self, max_workers=None, timeout=DEFAULT_TASK_TIMEOUT,
+                 max_tasks_per_child=DEFAULT_MAX_TASKS_PER_CHILD):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.max_tasks_per_child = max_tasks_per_child
+        self._executor = None
+        # 已提交、调用方尚未取走结果的任务 -> 所在进程池
+        self._pending = {}
+        # 已判定超时的任务；停用、等待结束的旧进程池
+        self._hung = set()
+        self._retired = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _get_executor(self):
+        # 进程池相关模块较重，只在真正解析时导入
+        from concurrent.futures import ProcessPoolExecutor
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                max_tasks_per_child=self.max_tasks_per_child,
+            )
+        return self._executor
+
+    @staticmethod
+    def _kill(executor):
+        # 超时仍未返回的工作进程（例如卡在C扩展里）直接结束
+        for process in list((executor._processes or {}).values()):
+            process.kill()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def close(self, kill=False):
+        for executor in self._retired:
+            self._kill(executor)
+        self._retired.clear()
+        self._pending.clear()
+        self._hung.clear()
+        if self._executor is None:
+            return
+        if kill:
+            self._kill(self._executor)
+        else:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+        self._executor = None
+
+    def _submit(self, source, html, paged=False):
+        executor = self._get_executor()
+        parser = resolve_page_parser(source) if paged else resolve_parser(source)
+        future = executor.submit(_run_parser, parser, html, source, self.timeout, paged)
+        self._pending[future] = executor
+        return future
+
+    def _retire(self, executor):
+        """进程池停止接收新任务（有任务卡死或进程池已损坏）；排队未开始的任务取消，由调用方重新提交"""
+        if executor is self._executor:
+            self._executor = None
+        self._retired.add(executor)
+        for future, owner in self._pending.items():
+            if owner is executor:
+                future.cancel()
+
+    def _reap(self):
+        """结束已经没有正常任务在运行的旧进程池；所有工作进程都已卡死的进程池直接结束（其余页面按进程池损坏重试）"""
+        busy = {owner for future, owner in self._pending.items() if not future.done() and future not in self._hung}
+        hung = [self._pending[future] for future in self._hung if future in self._pending]
+        stuck = {executor for executor in self._retired if hung.count(executor) >= self.max_workers}
+        for executor in (self._retired - busy) | stuck:
+            self._kill(executor)
+            self._retired.discard(executor)
+            for future in [f for f, owner in self._pending.items() if owner is executor]:
+                del self._pending[future]
+                self._hung.discard(future)
+
+    def _overdue(self, future, started, now):
+        """
+        任务交给工作进程（started）后超过 timeout + HARD_TIMEOUT_GRACE 仍未返回
+        所在进程池的工作进程已全部卡死时不再判定：排在后面的任务其实还没开始，进程池结束后按损坏重新提交
+        """
+        executor = self._pending.get(future)
+        if executor is None or now - started <= self.timeout + HARD_TIMEOUT_GRACE:
+            return False
+        return sum(self._pending.get(hung) is executor for hung in self._hung) < self.max_workers
+
+    def _timed_out(self, future, source):
+        """父进程兜底：工作进程内的超时失效（C扩展不响应信号），只放弃这一个页面"""
+        self._hung.add(future)
+        self._retire(self._pending[future])
+        return ParseOutcome(source['name'], error=f'解析超时（{self.timeout}秒）')
+
+    def _collect(self, future, source, retries):
+        """
+        取走已结束任务的结果，返回 (ParseOutcome, 是否需要重新提交)
+
+        所在进程池停用时被取消的任务需要重新提交；进程池因某个页面异常退出而损坏时，
+        同池的其它页面也一起失败，重新提交 BROKEN_POOL_RETRIES 次
+        """
+        from concurrent.futures.process import BrokenProcessPool
+
+        executor = self._pending.pop(future, None)
+        if future.cancelled():
+            return None, True
+        try:
+            return future.result(), False
+        except BrokenProcessPool:
+            if executor is not None:
+                self._retire(executor)
+            if retries < BROKEN_POOL_RETRIES:
+                return None, True
+            return ParseOutcome(source['name'], error='解析进程异常退出'), False
+
+    def parse_many(self, jobs):
+        """
+        并行解析 [(source, html)]，返回与 jobs 顺序一致的 ParseOutcome 列表
+        """
+        if not jobs:
+            return []
+        from concurrent.futures import FIRST_COMPLETED, wait
+
+        futures = {self._submit(source, html): idx for idx, (source, html) in enumerate(jobs)}
+        outcomes = [None] * len(jobs)
+        retries = [0] * len(jobs)
+        # 任务交给工作进程（running）的时间，兜底超时从这里开始计算
+        started = {}
+
+        while futures:
+            done, _ = wait(futures, timeout=HARD_TIMEOUT_POLL if self.timeout else None,
+                           return_when=FIRST_COMPLETED)
+            resubmit = []
+            for future in done:
+                idx = futures.pop(future)
+                outcome, again = self._collect(future, jobs[idx][0], retries[idx])
+                if again:
+                    retries[idx] += not future.cancelled()
+                    resubmit.append(idx)
+                else:
+                    outcomes[idx] = outcome
+            now = time.monotonic()
+            for future, idx in list(futures.items()):
+                if future.running():
+                    started.setdefault(future, now)
+                if self.timeout and future in started and self._overdue(future, started[future], now):
+                    del futures[future]
+                    outcomes[idx] = self._timed_out(future, jobs[idx][0])
+            for idx in resubmit:
+                futures[self._submit(*jobs[idx])] = idx
+            self._reap()
+        return outcomes
+
+    async def parse_async(self, source, html, paged=False):
+        """在事件循环中解析单个页面（分页流水线使用），返回 ParseOutcome；paged 时同时取得下一页链接"""
+        import asyncio
+
+        retries = 0
+        while True:
+            future = self._submit(source, html, paged)
+            waiter = asyncio.wrap_future(future)
+            started = None
+            while not future.done():
+                await asyncio.wait([waiter], timeout=HARD_TIMEOUT_POLL if self.timeout else None)
+                now = time.monotonic()
+                if started is None and future.running():
+                    started = now
+                if self.timeout and started is not None and self._overdue(future, started, now):
+                    waiter.cancel()
+                    outcome = self._timed_out(future, source)
+                    self._reap()
+                    return outcome
+                self._reap()
+            outcome, again = self._collect(future, source, retries)
+            self._reap()
+            if not again:
+                return outcome
+            retries += not future.cancelled()
+
+
+def parse_pages(jobs, **pool_options):
+    """一次性解析入口：创建进程池、解析并关闭"""
+    with ParsePool(**pool_options) as pool:
+        return pool.parse_many(jobs)
@@ -0,0 +1,475 @@
+# -*- coding: utf-8 -*-
+"""
+可插拔的空投列表页解析器
+后端：html.parser（BeautifulSoup 内置，最慢）、lxml、selectolax
+- 每个数据源的CSS选择器只编译一次
+- BeautifulSoup 后端可用 SoupStrainer 只构建空投节点，跳过整页DOM
+- 分页：HTML 页面取 rel="next" 链接；JSON 接口（数据源 type 为 json）按 'api' 配置取列表和下一页
+- 流式（lxml-stream）：响应体边下载边增量解析（lxml HTMLPullParser），每个空投节点闭合时立即提取，
+  已提取的节点随即从树中删除，不构建整页DOM（数据源配置 'stream': True 时在抓取阶段使用）
+
+命令行：python -m airdrop_crawler.parsers [页面.html]
+对比各后端的解析结果是否一致，并输出每页解析耗时（一致性测试见 tests/test_parsers.py）
+"""
+
+import json
+import os
+import re
+import sys
+import time
+from functools import lru_cache
+
+# 选择器默认值，数据源可在 AIRDROP_SOURCES 中用 'selectors' 覆盖
+DEFAULT_SELECTORS = {
+    'item': '.airdrop-item',
+    'title': '.title',
+    'description': '.description',
+    'link': 'a[href]',
+    # 下一页链接（分页爬取）
+    'next': 'a[rel~="next"], link[rel~="next"]',
+    # SoupStrainer 过滤条件（标签属性），只解析匹配的节点
+    'strainer': {'class': 'airdrop-item'},
+    'next_strainer': {'rel': 'next'},
+}
+
+# JSON 接口的默认配置，数据源可在 'api' 中覆盖
+# items / next 为点号分隔的路径；fields 为 标题/描述/链接 对应的字段名
+DEFAULT_API = {
+    'items': 'data',
+    'next': None,
+    'fields': {'title': 'title', 'description': 'description', 'href': 'url'},
+}
+
+# 按速度从快到慢
+BACKENDS = ('selectolax', 'lxml', 'html.parser')
+# 增量解析后端（抓取阶段使用，不参与默认后端选择）
+STREAM_BACKEND = 'lxml-stream'
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+DEFAULT_FIXTURE = os.path.join(FIXTURE_DIR, 'airdrop_listing.html')
+
+
+def source_selectors(source):
+    return {**DEFAULT_SELECTORS, **source.get('selectors', {})}
+
+
+def _token_pattern(value):
+    """属性值按空白分词匹配（解析阶段 class 仍是整串，如 "airdrop-item card"）"""
+    return re.compile(rf'(^|\s){re.escape(value)}(\s|$)')
+
+
+class SoupParser:
+    """BeautifulSoup 后端（html.parser 或 lxml 构建器）"""
+
+    def __init__(self, selectors, features='html.parser'):
+        import soupsieve
+        from bs4 import SoupStrainer
+
+        self.features = features
+        self.strainer = self._strainer(SoupStrainer, selectors.get('strainer'))
+        self.next_strainer = self._strainer(SoupStrainer, selectors.get('next_strainer'))
+        self.item = soupsieve.compile(selectors['item'])
+        self.title = soupsieve.compile(selectors['title'])
+        self.description = soupsieve.compile(selectors['description'])
+        self.link = soupsieve.compile(selectors['link'])
+        self.next = soupsieve.compile(selectors['next'])
+
+    @staticmethod
+    def _strainer(strainer_cls, attrs):
+        if not attrs:
+            return None
+        return strainer_cls(attrs={
+            name: _token_pattern(value) if isinstance(value, str) else value
+            for name, value in attrs.items()
+        })
+
+    def parse(self, html):
+        from bs4 import BeautifulSoup
+
+        return self._items(BeautifulSoup(html, self.features, parse_only=self.strainer))
+
+    def _items(self, soup):
+        for item in self.item.select(soup):
+            title = self.title.select_one(item)
+            description = self.description.select_one(item)
+            link = self.link.select_one(item)
+            yield {
+                'title': title.get_text().strip() if title else None,
+                'description': description.get_text().strip() if description else None,
+                'href': link.get('href') if link else None,
+            }
+
+    def next_href(self, html):
+        from bs4 import BeautifulSoup
+
+        return self._next_href(BeautifulSoup(html, self.features, parse_only=self.next_strainer))
+
+    def _next_href(self, soup):
+        link = self.next.select_one(soup)
+        return link.get('href') if link else None
+
+    def parse_page(self, html):
+        """列表项和下一页链接（两者的 strainer 不同，不过滤，整页只构建一次）"""
+        from bs4 import BeautifulSoup
+
+        soup = BeautifulSoup(html, self.features)
+        return list(self._items(soup)), self._next_href(soup)
+
+
+class LxmlParser:
+    """lxml.html + 预编译的 cssselect 选择器"""
+
+    def __init__(self, selectors):
+        from lxml.cssselect import CSSSelector
+
+        self.item = CSSSelector(selectors['item'])
+        self.title = CSSSelector(selectors['title'])
+        self.description = CSSSelector(selectors['description'])
+        self.link = CSSSelector(selectors['link'])
+        self.next = CSSSelector(selectors['next'])
+
+    @staticmethod
+    def _first(selector, node):
+        found = selector(node)
+        return found[0] if found else None
+
+    def parse(self, html):
+        import lxml.html
+
+        root = lxml.html.fromstring(html)
+        for item in self.item(root):
+            yield self.extract(item)
+
+    def extract(self, item):
+        """单个空投节点 -> 列表项"""
+        title = self._first(self.title, item)
+        description = self._first(self.description, item)
+        link = self._first(self.link, item)
+        return {
+            'title': title.text_content().strip() if title is not None else None,
+            'description': description.text_content().strip() if description is not None else None,
+            'href': link.get('href') if link is not None else None,
+        }
+
+    def next_href(self, html):
+        import lxml.html
+
+        link = self._first(self.next, lxml.html.fromstring(html))
+        return link.get('href') if link is not None else None
+
+    def parse_page(self, html):
+        """列表项和下一页链接，整页只解析一次"""
+        import lxml.html
+
+        root = lxml.html.fromstring(html)
+        link = self._first(self.next, root)
+        return [self.extract(item) for item in self.item(root)], (link.get('href') if link is not None else None)
+
+
+class SelectolaxParser:
+    """selectolax（Lexbor 引擎），不支持预编译，选择器字符串直接复用"""
+
+    def __init__(self, selectors):
+        from selectolax.lexbor import LexborHTMLParser
+
+        self.html_parser = LexborHTMLParser
+        self.selectors = selectors
+
+    def parse(self, html):
+        return self._items(self.html_parser(html))
+
+    def _items(self, tree):
+        for item in tree.css(self.selectors['item']):
+            title = item.css_first(self.selectors['title'])
+            description = item.css_first(self.selectors['description'])
+            link = item.css_first(self.selectors['link'])
+            yield {
+                'title': title.text().strip() if title else None,
+                'description': description.text().strip() if description else None,
+                'href': link.attributes.get('href') if link else None,
+            }
+
+    def next_href(self, html):
+        return self._next_href(self.html_parser(html))
+
+    def _next_href(self, tree):
+        link = tree.css_first(self.selectors['next'])
+        return link.attributes.get('href') if link else None
+
+    def parse_page(self, html):
+        """列表项和下一页链接，整页只解析一次"""
+        tree = self.html_parser(html)
+        return list(self._items(tree)), self._next_href(tree)
+
+
+def _attrs_match(attrs, wanted):
+    """同 SoupStrainer 的属性过滤：字符串按空白分词匹配，True 表示属性存在"""
+    for name, value in wanted.items():
+        actual = attrs.get(name)
+        if actual is None:
+            return False
+        if isinstance(value, str) and value not in actual.split():
+            return False
+    return True
+
+
+class StreamingParser:
+    """
+    流式解析（lxml-stream）：lxml 的 HTMLPullParser 按块增量解析（与 lxml 后端同一个 libxml2 解析器），
+    strainer 匹配的空投节点闭合时按 LxmlParser 的选择器提取，提取完和其他已闭合的节点一起从树中删除，
+    内存中不保留整页 DOM，也不保留整页解码后的文本
+    （libxml2 增量解析时仍会保留已读入的原始字节，约为页面大小）
+
+    与 SoupStrainer 一样只看空投节点本身：依赖祖先或兄弟节点的 item 选择器不适用
+    （这类数据源不要开启 stream，或用 strainer 覆盖）
+    """
+
+    def __init__(self, selectors):
+        self.fragment = LxmlParser(selectors)
+        self.item_attrs = selectors.get('strainer') or {}
+        self.next_attrs = selectors.get('next_strainer') or {}
+        if not self.item_attrs:
+            raise ValueError('流式解析需要 strainer 过滤条件')
+
+    def stream(self):
+        return ListingStream(self)
+
+    def parse(self, html):
+        stream = self.stream()
+        yield from stream.feed(html)
+        yield from stream.close()
+
+    def next_href(self, html):
+        return self.parse_page(html)[1]
+
+    def parse_page(self, html):
+        stream = self.stream()
+        items = stream.feed(html) + stream.close()
+        return items, stream.next_href
+
+
+class ListingStream:
+    """
+    一个页面的增量解析状态：
+
+        stream = parser.stream()
+        for chunk in chunks:            # str，按块解码后的响应体
+            items.extend(stream.feed(chunk))
+        items.extend(stream.close())
+        stream.next_href
+
+    feed 返回本块中闭合的空投列表项（格式同 extract_items）
+    """
+
+    def __init__(self, parser):
+        from lxml import etree
+        from lxml.html import HtmlElementClassLookup
+
+        self.parser = parser
+        self.pull = etree.HTMLPullParser(events=('start', 'end'))
+        # 元素类型与 lxml.html 一致（text_content 等）
+        self.pull.set_element_class_lookup(HtmlElementClassLookup())
+        # 当前未闭合的最外层空投节点（空投节点内的元素闭合时不能删除）
+        self.item = None
+        self.next_href = None
+
+    def feed(self, data):
+        self.pull.feed(data)
+        return self._read_events()
+
+    def close(self):
+        self.pull.close()
+        return self._read_events()
+
+    def _read_events(self):
+        parser = self.parser
+        items = []
+        for event, element in self.pull.read_events():
+            if event == 'start':
+                if self.item is None and _attrs_match(element, parser.item_attrs):
+                    self.item = element
+                continue
+            if (self.next_href is None and parser.next_attrs
+                    and _attrs_match(element, parser.next_attrs)):
+                link = LxmlParser._first(parser.fragment.next, element)
+                if link is not None:
+                    self.next_href = link.get('href')
+            if element is self.item:
+                items.extend(parser.fragment.extract(item) for item in parser.fragment.item(element))
+                self.item = None
+            elif self.item is not None:
+                continue
+            # 已闭合、已提取过的节点：清空并删除前面的兄弟节点，树只保留当前路径上的元素
+            element.clear()
+            parent = element.getparent()
+            if parent is not None:
+                while element.getprevious() is not None:
+                    del parent[0]
+        return items
+
+
+def _build_parser(selectors, backend):
+    if backend == STREAM_BACKEND:
+        return StreamingParser(selectors)
+    if backend == 'html.parser':
+        return SoupParser(selectors, 'html.parser')
+    if backend == 'lxml':
+        return LxmlParser(selectors)
+    if backend == 'selectolax':
+        return SelectolaxParser(selectors)
+    raise ValueError(f"未知的解析后端: {backend}（可选: {', '.join(BACKENDS)}）")
+
+
+@lru_cache(maxsize=None)
+def available_backends():
+    """当前环境已安装依赖的后端"""
+    available = []
+    for backend in BACKENDS:
+        try:
+            _build_parser(DEFAULT_SELECTORS, backend)
+        except ImportError:
+            continue
+        available.append(backend)
+    return tuple(available)
+
+
+def comparable_backends():
+    """参与对比和基准测试的后端：已安装的整页后端 + 流式后端（依赖 lxml）"""
+    backends = available_backends()
+    return backends + (STREAM_BACKEND,) if 'lxml' in backends else backends
+
+
+def default_backend():
+    """已安装的最快后端"""
+    return available_backends()[0]
+
+
+# (数据源名称, 后端) -> 已编译的解析器
+_parser_cache = {}
+
+
+def get_parser(source, backend=None):
+    """获取数据源对应的解析器（每个数据源每种后端只编译一次）"""
+    backend = backend or source.get('parser_backend') or default_backend()
+    cache_key = (source['name'], backend)
+    if cache_key not in _parser_cache:
+        _parser_cache[cache_key] = _build_parser(source_selectors(source), backend)
+    return _parser_cache[cache_key]
+
+
+def open_stream(source):
+    """数据源的增量解析状态（ListingStream）；JSON 接口、没有 strainer 或未安装 lxml 时返回 None（整页下载后解析）"""
+    if source.get('type') == 'json' or not source_selectors(source).get('strainer'):
+        return None
+    try:
+        return get_parser(source, STREAM_BACKEND).stream()
+    except ImportError:
+        return None
+
+
+def extract_items(html, source, backend=None):
+    """
+    提取空投列表项（JSON 接口见 extract_json_items）
+
+    返回 [{'title', 'description', 'href'}]，缺失字段为 None
+    """
+    if source.get('type') == 'json':
+        return extract_json_items(html, source)
+    return list(get_parser(source, backend).parse(html))
+
+
+def extract_next_href(html, source, backend=None):
+    """下一页链接（可能是相对地址），没有下一页时返回 None"""
+    if source.get('type') == 'json':
+        api = source_api(source)
+        return _json_path(json.loads(html), api['next']) if api['next'] else None
+    return get_parser(source, backend).next_href(html)
+
+
+def extract_page(html, source, backend=None):
+    """
+    分页爬取：一次解析同时取得列表项和下一页链接
+
+    返回 (列表项, 下一页链接)，格式同 extract_items / extract_next_href
+    """
+    if source.get('type') == 'json':
+        api = source_api(source)
+        data = json.loads(html)
+        return _json_items(data, api), (_json_path(data, api['next']) if api['next'] else None)
+    return get_parser(source, backend).parse_page(html)
+
+
+def source_api(source):
+    api = {**DEFAULT_API, **source.get('api', {})}
+    api['fields'] = {**DEFAULT_API['fields'], **api['fields']}
+    return api
+
+
+def _json_path(data, path):
+    for key in path.split('.') if path else ():
+        if isinstance(data, list) and key.isdigit():
+            data = data[int(key)] if int(key) < len(data) else None
+        elif isinstance(data, dict):
+            data = data.get(key)
+        else:
+            return None
+    return data
+
+
+def extract_json_items(text, source):
+    """从 JSON 接口响应中提取空投列表项，格式同 extract_items"""
+    return _json_items(json.loads(text), source_api(source))
+
+
+def _json_items(data, api):
+    fields = api['fields']
+    items = _json_path(data, api['items']) or []
+    return [
+        {
+            'title': str(item.get(fields['title']) or '').strip() or None,
+            'description': str(item.get(fields['description']) or '').strip() or None,
+            'href': item.get(fields['href']),
+        }
+        for item in items if isinstance(item, dict)
+    ]
+
+
+def compare_backends(html, source, rounds=20):
+    """
+    各后端解析同一页面：返回 {后端: (结果, 平均每页耗时秒)}
+    """
+    results = {}
+    for backend in comparable_backends():
+        parser = get_parser(source, backend)
+        items = list(parser.parse(html))
+        started = time.perf_counter()
+        for _ in range(rounds):
+            list(parser.parse(html))
+        results[backend] = (items, (time.perf_counter() - started) / rounds)
+    return results
+
+
+def main(argv=None):
+    """对比各后端：结果一致性 + 解析耗时"""
+    argv = sys.argv[1:] if argv is None else argv
+    path = argv[0] if argv else DEFAULT_FIXTURE
+    with open(path, 'r', encoding='utf-8') as f:
+        html = f.read()
+
+    source = {'name': os.path.basename(path), 'url': 'https://example.com/'}
+    results = compare_backends(html, source)
+    baseline_backend = 'html.parser'
+    baseline = results[baseline_backend][0]
+
+    print(f"📄 {path}（{len(html) / 1024:.1f} KB，{len(baseline)} 个空投）")
+    consistent = True
+    for backend, (items, seconds) in results.items():
+        same = items == baseline
+        consistent = consistent and same
+        speedup = results[baseline_backend][1] / seconds if seconds else 0
+        print(f"{'✅' if same else '❌'} {backend:<12} {seconds * 1000:8.2f} ms/页  x{speedup:.1f}")
+    return 0 if consistent else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
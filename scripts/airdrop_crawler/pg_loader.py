@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+直连 Postgres 批量写入（命令行 --load，不再生成SQL文件、不再手工执行）
+一个事务内完成：
+    CREATE TEMP TABLE airdrops_staging ... ON COMMIT DROP
+    COPY airdrops_staging FROM STDIN (FORMAT binary)      -- 行数据流式编码，边生成边发送
+    INSERT INTO public.airdrops SELECT ... FROM airdrops_staging ON CONFLICT ...   -- 合并
+    UPDATE public.airdrops SET status = 'expired' ...     -- 本次消失的空投下架（sync 模式且调用方确认是完整爬取）
+任何一步失败整体回滚，线上表不会出现写了一半的数据
+
+二进制 COPY 按列类型直接编码，不拼接SQL文本，也就不存在引号转义问题
+合并语句与 sql_writer 的 COPY 同步模式一致：content_hash 未变化的行不改写
+
+需要 psycopg2（pip install psycopg2-binary）；连接串默认读取 DATABASE_URL
+本地测试：python -m airdrop_crawler crawl --load --dsn postgresql://localhost/postgres
+"""
+
+import io
+import json
+import os
+import struct
+from datetime import datetime, timezone
+from functools import lru_cache
+
+from . import metrics
+from .sql_writer import AIRDROP_TABLE, STAGING_TABLE, VANISHED_STATUS, _iter_hashed_rows, should_expire, upsert_clause
+from .supabase_writer import NATURAL_KEY
+
+# 暂存表各列的类型（决定二进制编码方式）；合并时按赋值转换写入正式表的列类型
+# （float8 -> numeric、text -> varchar 等）
+COLUMN_TYPES = {
+    'title': 'text',
+    'description': 'text',
+    'reward_amount': 'float8',
+    'image_url': 'text',
+    'project_url': 'text',
+    'twitter_url': 'text',
+    'requirements': 'jsonb',
+    'category': 'text',
+    'type': 'text',
+    'status': 'text',
+    'ai_score': 'float8',
+    'risk_level': 'text',
+    'estimated_value': 'float8',
+    'difficulty': 'text',
+    'time_required': 'text',
+    'participation_cost': 'text',
+    'tags': 'jsonb',
+    'source': 'text',
+    'source_type': 'text',
+    'verified': 'bool',
+    'sort_order': 'int4',
+    'start_time': 'timestamptz',
+    'end_time': 'timestamptz',
+    'total_participants': 'int4',
+    'max_participants': 'int4',
+    'push_count': 'int4',
+    'content_hash': 'text',
+}
+
+COPY_SIGNATURE = b'PGCOPY\n\xff\r\n\x00'
+# Postgres 时间戳的起点
+PG_EPOCH = datetime(2000, 1, 1, tzinfo=timezone.utc)
+# 每次发送给服务器的数据块大小
+COPY_CHUNK_SIZE = 64 * 1024
+
+
+def _encode_text(value):
+    return str(value).encode('utf-8')
+
+
+def _encode_jsonb(value):
+    # jsonb 二进制格式：版本号 1 + JSON 文本
+    return b'\x01' + json.dumps(value, ensure_ascii=False).encode('utf-8')
+
+
+# 同一批数据的时间大多相同（如 start_time 都是本次运行的时刻），缓存编码结果
+@lru_cache(maxsize=1024)
+def _encode_timestamptz(value):
+    # 不带时区的时间按本机时区处理（与 datetime.now() 一致）
+    if value.tzinfo is None:
+        value = value.astimezone()
+    delta = value - PG_EPOCH
+    return struct.pack('!q', (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds)
+
+
+ENCODERS = {
+    'text': _encode_text,
+    'float8': lambda value: struct.pack('!d', value),
+    'int4': lambda value: struct.pack('!i', value),
+    'bool': lambda value: b'\x01' if value else b'\x00',
+    'jsonb': _encode_jsonb,
+    'timestamptz': _encode_timestamptz,
+}
+
+
+def iter_copy_binary(rows_values, types):
+    """COPY BINARY 数据流：文件头 + 每行（列数 + 每列长度与内容，NULL 长度为 -1）+ 结束标记"""
+    encoders = [ENCODERS[t] for t in types]
+    row_header = struct.pack('!h', len(types))
+    null = struct.pack('!i', -1)
+    pack_length = struct.Struct('!i').pack
+    yield COPY_SIGNATURE + struct.pack('!ii', 0, 0)
+    for values in rows_values:
+        parts = [row_header]
+        append = parts.append
+        for encode, value in zip(encoders, values):
+            if value is None:
+                append(null)
+            else:
+                data = encode(value)
+                append(pack_length(len(data)))
+                append(data)
+        yield b''.join(parts)
+    yield struct.pack('!h', -1)
+
+
+class IterReader(io.RawIOBase):
+    """把 bytes 生成器包装成可 read() 的文件对象（psycopg2 copy_expert 按块读取）"""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.buffer = bytearray()
+        self.size = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, target):
+        while len(self.buffer) < len(target):
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                break
+            self.buffer += chunk
+        n = min(len(target), len(self.buffer))
+        target[:n] = self.buffer[:n]
+        del self.buffer[:n]
+        self.size += n
+        return n
+
+
+def staging_sql(columns):
+    definitions = ', '.join(f'{column} {COLUMN_TYPES[column]}' for column in columns)
+    return f"CREATE TEMP TABLE {STAGING_TABLE} ({definitions}) ON COMMIT DROP"
+
+
+def merge_sql(columns, table=AIRDROP_TABLE, mode='sync'):
+    """暂存表 -> 正式表，返回 (新增行数, 更新行数)"""
+    column_sql = ', '.join(columns)
+    on_conflict = upsert_clause(columns, table) if mode == 'sync' else ''
+    return (
+        f"WITH merged AS (\n"
+        f"INSERT INTO {table} ({column_sql})\nSELECT {column_sql} FROM {STAGING_TABLE}{on_conflict}\n"
+        f"RETURNING (xmax = 0) AS inserted\n)\n"
+        f"SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted) FROM merged"
+    )
+
+
+def expire_sql(table=AIRDROP_TABLE, key=NATURAL_KEY):
+    """不在本次数据中的爬虫空投下架（同 sql_writer 的 COPY 同步模式）"""
+    return (
+        f"UPDATE {table} SET status = '{VANISHED_STATUS}'\n"
+        f"WHERE status = 'active' AND content_hash IS NOT NULL\n"
+        f"AND NOT EXISTS (\n"
+        f"  SELECT 1 FROM {STAGING_TABLE} s WHERE ({', '.join('s.' + c for c in key)}) = "
+        f"({', '.join(table + '.' + c for c in key)})\n"
+        f")"
+    )
+
+
+def load_rows(conn, rows, columns, mode='sync', table=AIRDROP_TABLE, expire=False):
+    """
+    在一个事务里 COPY + 合并
+
+    rows: 可迭代的 (airdrop, 各列值列表)，可以是生成器（流式发送，不在内存中攒齐）
+    columns: 各列名（会追加 content_hash 列）；同一自然键只写入第一条
+    expire: 完整爬取（所有数据源都成功）时才下架本次消失的空投，可以是全部行发送后才求值的无参函数
+            （同 sql_writer.iter_sync_statements）；手动整理的空投、目录数据、有数据源失败时不下架
+    返回 {'staged', 'inserted', 'updated', 'expired'}
+    """
+    columns = list(columns) + ['content_hash']
+    seen = {}
+    rows_values = (values for _, _, values in _iter_hashed_rows(rows, seen))
+    stats = {'staged': 0, 'inserted': 0, 'updated': 0, 'expired': 0}
+    with conn, conn.cursor() as cur:
+        cur.execute(staging_sql(columns))
+        reader = IterReader(iter_copy_binary(rows_values, [COLUMN_TYPES[c] for c in columns]))
+        with metrics.stage('copy'):
+            cur.copy_expert(
+                f"COPY {STAGING_TABLE} ({', '.join(columns)}) FROM STDIN WITH (FORMAT binary)",
+                io.BufferedReader(reader, COPY_CHUNK_SIZE), COPY_CHUNK_SIZE,
+            )
+        stats['staged'] = len(seen)
+        if not seen:
+            # 没有抓到任何数据时不做任何修改，避免一次失败的爬取清空线上列表
+            print("⚠️ 本次没有空投数据，跳过写入")
+            return stats
+        with metrics.stage('merge'):
+            if mode == 'replace':
+                cur.execute(f"TRUNCATE TABLE {table} CASCADE")
+            cur.execute(merge_sql(columns, table, mode))
+            stats['inserted'], stats['updated'] = cur.fetchone()
+            if mode == 'sync' and should_expire(expire):
+                cur.execute(expire_sql(table))
+                stats['expired'] = cur.rowcount
+    metrics.incr('bytes_copied', reader.size)
+    return stats
+
+
+def load(dsn, rows, columns, mode='sync', table=AIRDROP_TABLE, expire=False):
+    """连接数据库并写入，返回统计（见 load_rows）"""
+    import psycopg2
+
+    conn = psycopg2.connect(dsn)
+    try:
+        with metrics.stage('db_write'):
+            stats = load_rows(conn, rows, columns, mode, table, expire)
+    finally:
+        conn.close()
+    metrics.incr('rows_written', stats['inserted'] + stats['updated'])
+    metrics.incr('rows_expired', stats['expired'])
+    return stats
+
+
+def add_arguments(parser):
+    """给命令行加上 --load / --dsn"""
+    parser.add_argument('--load', action='store_true',
+                        help='直连 Postgres，用二进制 COPY 写入（不生成SQL文件）')
+    parser.add_argument('--dsn', default=os.environ.get('DATABASE_URL'),
+                        help='Postgres 连接串（--load 时使用），默认读取 DATABASE_URL')
+
+
+def run_from_args(rows, columns, args, expire=False):
+    """按命令行参数写入并打印统计，返回统计；expire 见 load_rows"""
+    if not args.dsn:
+        raise SystemExit('--load 需要 --dsn 或环境变量 DATABASE_URL')
+    stats = load(args.dsn, rows, columns, args.mode, expire=expire)
+    print(f"🐘 已写入 Postgres：暂存 {stats['staged']} 行，新增 {stats['inserted']}，"
+          f"更新 {stats['updated']}，下架 {stats['expired']}")
+    return stats
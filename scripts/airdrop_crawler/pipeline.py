@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+分页流式爬取
+抓取 → 解析 → 写入 三个阶段用有界队列连接：
+
+    每个数据源一个抓取协程（按 rel="next" / 接口的 next 逐页翻页）
+        → pages 队列（最多 page_queue 页）
+        → parse_workers 个解析协程（进程池中解析，列表项和下一页链接在同一次解析中取得）
+        → batches 队列（最多 batch_queue 批）
+        → 调用方逐批消费（去重、评分、写库）
+
+下游变慢时队列写满，上游自动等待（背压），内存占用与数据源的总页数无关
+数据源开启流式解析（'stream': True，默认关闭）时，列表项和下一页链接在下载过程中已提取，
+队列里只有列表项，解析协程只做转换，不再把整页文本发给进程池
+"""
+
+import asyncio
+import os
+import queue
+import threading
+from urllib.parse import urljoin
+
+from .parse_pool import convert_items
+
+# 每个数据源最多翻多少页（数据源可用 'max_pages' 覆盖）
+DEFAULT_MAX_PAGES = 50
+# 等待解析的页面数上限
+DEFAULT_PAGE_QUEUE = 8
+# 等待写入的批次数上限（一批 = 一页的解析结果）
+DEFAULT_BATCH_QUEUE = 8
+
+# 队列结束标记
+_DONE = object()
+
+
+def page_source(source, url, page):
+    """某一页对应的数据源配置（解析时按页面地址补全相对链接；listing_url 保留数据源本身的列表页地址）"""
+    return {**source, 'url': url, 'page': page, 'listing_url': source.get('listing_url', source['url'])}
+
+
+class CrawlPipeline:
+    """
+    用法（同步代码中见 iter_pipeline）：
+        async with FetchEngine() as engine:
+            with ParsePool() as pool:
+                async for name, items in CrawlPipeline(sources, engine, pool).stream():
+                    ...
+    """
+
+    def __init__(self, sources, engine, pool, max_pages=DEFAULT_MAX_PAGES, page_queue=DEFAULT_PAGE_QUEUE,
+                 batch_queue=DEFAULT_BATCH_QUEUE, parse_workers=None):
+        self.sources = sources
+        self.engine = engine
+        self.pool = pool
+        self.max_pages = max_pages
+        self.page_queue = page_queue
+        self.batch_queue = batch_queue
+        self.parse_workers = parse_workers or pool.max_workers or os.cpu_count() or 1
+        # 数据源名称 -> 抓取的页数 / 失败原因
+        self.pages_fetched = {}
+        self.errors = {}
+
+    async def _produce(self, source, pages):
+        """
+        逐页抓取一个数据源：下一页地址要从本页取得，所以同一数据源内部是串行的
+
+        整页解析时下一页链接由解析协程解析本页时一并交回，不再单独解析一遍
+        """
+        url = source['url']
+        seen = set()
+        max_pages = source.get('max_pages', self.max_pages)
+        page = 0
+        while url and url not in seen and page < max_pages:
+            seen.add(url)
+            page += 1
+            current = page_source(source, url, page)
+            result = await self.engine.fetch(current)
+            streamed = result.items is not None
+            if not result.ok or not (result.text or streamed):
+                self.errors[source['name']] = result.error or f'HTTP {result.status}'
+                print(f"获取{source['name']}第{page}页失败: {self.errors[source['name']]}")
+                break
+            self.pages_fetched[source['name']] = page
+            next_page = None if streamed else asyncio.get_running_loop().create_future()
+            # 队列已满时在这里等待解析跟上
+            await pages.put((current, result, next_page))
+            next_href = result.next_href if streamed else await next_page
+            url = urljoin(url, next_href) if next_href else None
+
+    async def _parse(self, pages, batches):
+        while True:
+            job = await pages.get()
+            if job is _DONE:
+                return
+            source, result, next_page = job
+            if result.items is not None:
+                outcome = convert_items(source, result.items)
+            else:
+                outcome = None
+                try:
+                    outcome = await self.pool.parse_async(source, result.text, paged=True)
+                finally:
+                    # 解析失败时不再翻页；出现异常时也要交回，抓取协程才不会一直等待
+                    next_page.set_result(outcome.next_href if outcome is not None and outcome.ok else None)
+            if not outcome.ok:
+                self.errors[source['name']] = outcome.error
+                print(f"{source['name']}第{source['page']}页解析错误: {outcome.error}")
+                continue
+            await batches.put((source['name'], outcome.items))
+
+    async def stream(self):
+        """异步生成器：逐页产出 (数据源名称, [Airdrop])，同一数据源按页码顺序"""
+        pages = asyncio.Queue(self.page_queue)
+        batches = asyncio.Queue(self.batch_queue)
+
+        async def produce_all():
+            await asyncio.gather(*(self._produce(source, pages) for source in self.sources))
+            for _ in range(self.parse_workers):
+                await pages.put(_DONE)
+
+        async def parse_all():
+            await asyncio.gather(*(self._parse(pages, batches) for _ in range(self.parse_workers)))
+            await batches.put(_DONE)
+
+        tasks = [asyncio.create_task(produce_all()), asyncio.create_task(parse_all())]
+        try:
+            while True:
+                batch = await batches.get()
+                if batch is _DONE:
+                    break
+                yield batch
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+def iter_pipeline(sources, engine_options=None, pool_options=None, max_queue=DEFAULT_BATCH_QUEUE,
+                  errors=None, **pipeline_options):
+    """
+    同步入口：在后台线程运行事件循环，逐批产出 (数据源名称, [Airdrop])
+
+    线程之间同样用有界队列交接，调用方处理慢时抓取和解析会随之暂停
+    errors：可选 dict，爬取结束后填入 {数据源名称: 抓取或解析失败的原因}
+    """
+    from .fetcher import FetchEngine
+    from .parse_pool import ParsePool
+
+    handoff = queue.Queue(max_queue)
+    stop = threading.Event()
+
+    async def run():
+        async with FetchEngine(**(engine_options or {})) as engine:
+            with ParsePool(**(pool_options or {})) as pool:
+                pipeline = CrawlPipeline(sources, engine, pool, **pipeline_options)
+                async for batch in pipeline.stream():
+                    while not stop.is_set():
+                        try:
+                            # 不能在事件循环里阻塞等待，满了就让出一下再试
+                            handoff.put_nowait(batch)
+                            break
+                        except queue.Full:
+                            await asyncio.sleep(0.05)
+                    if stop.is_set():
+                        return
+                if errors is not None:
+                    errors.update(pipeline.errors)
+
+    def worker():
+        try:
+            asyncio.run(run())
+        except BaseException as e:
+            handoff.put(e)
+        else:
+            handoff.put(_DONE)
+
+    thread = threading.Thread(target=worker, name='crawl-pipeline', daemon=True)
+    thread.start()
+    try:
+        while True:
+            batch = handoff.get()
+            if batch is _DONE:
+                break
+            if isinstance(batch, BaseException):
+                raise batch
+            yield batch
+    finally:
+        stop.set()
+        # 调用方提前结束时清空队列，让后台线程能退出
+        while thread.is_alive():
+            try:
+                handoff.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        thread.join()
@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""
+空投推送引擎：一个空投并发推送到 N 个群组
+- 每个群组写一条 messages（系统消息，与后台“推送到群聊”一致），同时在途请求不超过 concurrency
+- 429/5xx/网络错误按 resilience.backoff_delay 退避重试
+- 各群组的结果先在内存中汇总，全部完成后调用一次 record_airdrop_push：
+  写一条 airdrop_push_history 并更新 airdrops.push_count / last_pushed_at
+  （函数见 supabase/migrations/创建空投推送记录函数.sql；未创建时退回只写推送历史）
+
+直接调用 Supabase REST 接口（PostgREST），需配置 SUPABASE_URL / SUPABASE_KEY
+
+    python -m airdrop_crawler push <空投ID> --groups <群组ID> ... [--concurrency 50]
+    python -m airdrop_crawler push <空投ID> --all-groups
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import time
+from dataclasses import dataclass, field
+
+from . import metrics
+from .resilience import DEFAULT_MAX_RETRIES, RETRY_STATUSES, backoff_delay, parse_retry_after
+
+# 同时在途的推送请求上限
+DEFAULT_CONCURRENCY = 50
+# 单次请求超时（秒）
+DEFAULT_TIMEOUT = 10
+MESSAGES_TABLE = 'messages'
+HISTORY_TABLE = 'airdrop_push_history'
+RECORD_FUNCTION = 'record_airdrop_push'
+
+DIFFICULTY_LABELS = {
+    'very_easy': '非常简单 ✅',
+    'easy': '简单 ✅',
+    'medium': '中等 ⚡',
+    'hard': '困难 🔥',
+    'very_hard': '非常困难 🔥',
+}
+
+
+def format_message(airdrop):
+    """空投（数据库行 dict）-> 群消息内容"""
+    score = airdrop.get('ai_score') or 0
+    lines = [f"🚀 {airdrop['title']}", '']
+    value = airdrop.get('estimated_value') or airdrop.get('reward_amount')
+    if value:
+        lines.append(f'💎 预计奖励：{value:g} USDT')
+    lines.append(f"🎯 AI评分：{score:g}/10 {'⭐' * math.ceil(score / 2)}")
+    if airdrop.get('category'):
+        lines.append(f"📂 分类：{airdrop['category']}")
+    if airdrop.get('difficulty'):
+        lines.append(f"📊 难度：{DIFFICULTY_LABELS.get(airdrop['difficulty'], airdrop['difficulty'])}")
+    if airdrop.get('description'):
+        lines += ['', f"📝 {airdrop['description'][:200]}"]
+    requirements = airdrop.get('requirements') or []
+    if requirements:
+        lines += ['', '✅ 参与步骤：']
+        lines += [f'{index}. {step}' for index, step in enumerate(requirements[:5], 1)]
+    if airdrop.get('project_url'):
+        lines += ['', f"🔗 {airdrop['project_url']}"]
+    return '\n'.join(lines)
+
+
+@dataclass
+class PushResult:
+    """一次推送的汇总结果"""
+    airdrop_id: str
+    group_ids: list
+    # 群组ID -> 失败原因
+    failures: dict = field(default_factory=dict)
+    retries: int = 0
+    elapsed: float = 0.0
+    history_id: str | None = None
+
+    @property
+    def success_count(self):
+        return len(self.group_ids) - len(self.failures)
+
+    @property
+    def fail_count(self):
+        return len(self.failures)
+
+
+class RestClient:
+    """Supabase REST（PostgREST）的最小异步封装，复用同一个 aiohttp 会话"""
+
+    def __init__(self, session, url, key):
+        self.session = session
+        self.base_url = f"{url.rstrip('/')}/rest/v1"
+        self.headers = {'apikey': key, 'Authorization': f'Bearer {key}', 'Content-Type': 'application/json'}
+
+    async def request(self, method, path, json=None, params=None, prefer=None):
+        """返回 (状态码, 响应头, 响应体文本)"""
+        headers = dict(self.headers, Prefer=prefer) if prefer else self.headers
+        async with self.session.request(method, f'{self.base_url}/{path}', json=json, params=params,
+                                        headers=headers) as response:
+            return response.status, response.headers, await response.text()
+
+    async def select(self, table, params):
+        status, _, body = await self.request('GET', table, params=params)
+        if status != 200:
+            raise RuntimeError(f'查询 {table} 失败: HTTP {status} {body[:200]}')
+        return json.loads(body)
+
+
+class PushEngine:
+    """
+    用法：
+        async with aiohttp.ClientSession() as session:
+            engine = PushEngine(RestClient(session, url, key))
+            result = await engine.push(airdrop, group_ids)
+    """
+
+    def __init__(self, client, concurrency=DEFAULT_CONCURRENCY, max_retries=DEFAULT_MAX_RETRIES):
+        self.client = client
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+
+    async def deliver(self, group_id, content, result):
+        """推送到一个群组，失败时返回原因（成功返回空字符串）"""
+        row = {'group_id': group_id, 'user_id': None, 'content': content,
+               'message_type': 'system', 'is_bot': True}
+        error = ''
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                status, headers, body = await self.client.request('POST', MESSAGES_TABLE, json=row,
+                                                                  prefer='return=minimal')
+            except asyncio.TimeoutError:
+                error = '超时'
+            except Exception as e:
+                error = str(e) or type(e).__name__
+            else:
+                if status < 300:
+                    return ''
+                error = f'HTTP {status} {body[:200]}'.strip()
+                if status not in RETRY_STATUSES:
+                    return error
+                retry_after = parse_retry_after(headers.get('Retry-After'))
+            if attempt < self.max_retries:
+                result.retries += 1
+                metrics.incr('push_retries')
+                await asyncio.sleep(backoff_delay(attempt + 1, retry_after=retry_after))
+        return error
+
+    async def push(self, airdrop, group_ids, content=None):
+        """把 airdrop（数据库行 dict）推送到所有群组，最后写一次推送记录，返回 PushResult"""
+        started = time.perf_counter()
+        # 去重并保持顺序
+        group_ids = list(dict.fromkeys(group_ids))
+        content = content or format_message(airdrop)
+        result = PushResult(airdrop['id'], group_ids)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def deliver_one(group_id):
+            async with semaphore:
+                error = await self.deliver(group_id, content, result)
+            if error:
+                result.failures[group_id] = error
+
+        with metrics.stage('push'):
+            await asyncio.gather(*(deliver_one(group_id) for group_id in group_ids))
+        metrics.incr('push_delivered', result.success_count)
+        metrics.incr('push_failed', result.fail_count)
+        with metrics.stage('db_write'):
+            result.history_id = await self.record(result)
+        result.elapsed = time.perf_counter() - started
+        return result
+
+    async def record(self, result):
+        """写一条推送历史并更新推送计数，返回历史记录ID"""
+        params = {'p_airdrop_id': result.airdrop_id, 'p_group_ids': result.group_ids,
+                  'p_success_count': result.success_count, 'p_fail_count': result.fail_count}
+        status, _, body = await self.client.request('POST', f'rpc/{RECORD_FUNCTION}', json=params)
+        if status < 300:
+            return body.strip().strip('"') or None
+        if status != 404:
+            raise RuntimeError(f'写入推送记录失败: HTTP {status} {body[:200]}')
+        # 数据库中还没有 record_airdrop_push：只写推送历史，不更新推送计数
+        print(f"⚠️ 未找到 {RECORD_FUNCTION}，只写入推送历史（请执行 创建空投推送记录函数.sql）")
+        row = {'airdrop_id': result.airdrop_id, 'group_ids': result.group_ids,
+               'success_count': result.success_count, 'fail_count': result.fail_count}
+        status, _, body = await self.client.request('POST', HISTORY_TABLE, json=row, prefer='return=minimal')
+        if status >= 300:
+            raise RuntimeError(f'写入推送历史失败: HTTP {status} {body[:200]}')
+        return None
+
+
+async def push_airdrop(airdrop_id, group_ids=None, url=None, key=None,
+                       concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT):
+    """读取空投（group_ids 为 None 时推送到所有启用的群组）并推送，返回 PushResult"""
+    import aiohttp
+
+    url = url or os.environ['SUPABASE_URL']
+    key = key or os.environ['SUPABASE_KEY']
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector,
+                                     timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        client = RestClient(session, url, key)
+        rows = await client.select('airdrops', {'id': f'eq.{airdrop_id}', 'select': '*'})
+        if not rows:
+            raise LookupError(f'空投不存在: {airdrop_id}')
+        if group_ids is None:
+            groups = await client.select('chat_groups', {'is_active': 'eq.true', 'select': 'id'})
+            group_ids = [group['id'] for group in groups]
+        return await PushEngine(client, concurrency).push(rows[0], group_ids)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m airdrop_crawler push', description='把一个空投并发推送到多个群组')
+    parser.add_argument('airdrop_id', help='空投ID（public.airdrops.id）')
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--groups', nargs='+', help='群组ID列表')
+    target.add_argument('--all-groups', action='store_true', help='推送到所有启用的群组（chat_groups.is_active）')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help='同时在途的推送请求上限')
+    metrics.add_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """命令行入口，返回退出码（有群组推送失败时为 1）"""
+    args = parse_args(argv)
+    metrics.start_run('push', trace_memory=args.trace_memory)
+    result = asyncio.run(push_airdrop(args.airdrop_id, None if args.all_groups else args.groups,
+                                      concurrency=args.concurrency))
+    print(f"📤 推送完成：{len(result.group_ids)} 个群组，成功 {result.success_count}，失败 {result.fail_count}，"
+          f"重试 {result.retries} 次，耗时 {result.elapsed:.2f} 秒")
+    for group_id, error in result.failures.items():
+        print(f"❌ {group_id}: {error}")
+    metrics.finish_run(args.metrics_json, args.metrics_prom)
+    return 1 if result.fail_count else 0
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+空投记录类型
+- Airdrop 使用 __slots__，不为每条记录分配 __dict__
+- type / status / risk_level / difficulty 等取值固定的字段存为枚举成员（全局唯一实例）
+- 时间字段存为 datetime，只在写入 Supabase / JSON 缓存时才转成字符串
+
+与 dict 之间的转换只发生在序列化边界：to_dict() / Airdrop.from_dict()
+"""
+
+import sys
+from dataclasses import dataclass, fields
+from datetime import datetime
+from enum import StrEnum
+
+
+class AirdropType(StrEnum):
+    AIRDROP = 'airdrop'
+    WEB3 = 'web3'
+    CEX = 'cex'
+
+
+class Status(StrEnum):
+    ACTIVE = 'active'
+    EXPIRED = 'expired'
+    COMPLETED = 'completed'
+    VERIFIED = 'verified'
+
+
+class RiskLevel(StrEnum):
+    NONE = 'none'
+    LOW = 'low'
+    MEDIUM = 'medium'
+    HIGH = 'high'
+
+
+class Difficulty(StrEnum):
+    VERY_EASY = 'very_easy'
+    EASY = 'easy'
+    MEDIUM = 'medium'
+    HARD = 'hard'
+    VERY_HARD = 'very_hard'
+
+
+class Category(StrEnum):
+    DEFI = 'DeFi'
+    NFT = 'NFT'
+    GAMEFI = 'GameFi'
+    LAYER2 = 'Layer2'
+    INFRASTRUCTURE = 'Infrastructure'
+    CEX = 'CEX'
+
+
+class SourceType(StrEnum):
+    OFFICIAL = 'official'
+    CEX_ANNOUNCEMENT = 'cex_announcement'
+
+
+# 数据库有 CHECK 约束的字段：取值不合法直接报错
+STRICT_ENUM_FIELDS = {
+    'type': AirdropType,
+    'status': Status,
+    'risk_level': RiskLevel,
+    'difficulty': Difficulty,
+}
+# 数据库中是自由文本的字段：未知取值保留为驻留字符串
+OPEN_ENUM_FIELDS = {
+    'category': Category,
+    'source_type': SourceType,
+}
+DATETIME_FIELDS = ('start_time', 'end_time')
+
+
+def _open_enum(enum_cls, value):
+    try:
+        return enum_cls(value)
+    except ValueError:
+        return sys.intern(str(value))
+
+
+@dataclass(slots=True)
+class Airdrop:
+    """一条空投（字段与 public.airdrops 的列同名，None 表示不写该列）"""
+    title: str
+    description: str
+    project_url: str
+    type: AirdropType
+    category: Category | str | None = None
+    status: Status = Status.ACTIVE
+    reward_amount: float | None = None
+    image_url: str | None = None
+    twitter_url: str | None = None
+    requirements: list | None = None
+    ai_score: float | None = None
+    risk_level: RiskLevel | None = None
+    estimated_value: float | None = None
+    difficulty: Difficulty | None = None
+    time_required: str | None = None
+    participation_cost: str | None = None
+    tags: list | None = None
+    source: str | None = None
+    source_type: SourceType | str | None = None
+    verified: bool | None = None
+    sort_order: int | None = None
+    start_time: datetime | None = None
+    end_time: datetime | None = None
+    total_participants: int | None = None
+    max_participants: int | None = None
+    push_count: int | None = None
+
+    def __post_init__(self):
+        for name, enum_cls in STRICT_ENUM_FIELDS.items():
+            value = getattr(self, name)
+            if value is not None and type(value) is not enum_cls:
+                setattr(self, name, enum_cls(value))
+        for name, enum_cls in OPEN_ENUM_FIELDS.items():
+            value = getattr(self, name)
+            if value is not None and type(value) is not enum_cls:
+                setattr(self, name, _open_enum(enum_cls, value))
+        for name in DATETIME_FIELDS:
+            value = getattr(self, name)
+            if isinstance(value, str):
+                setattr(self, name, datetime.fromisoformat(value))
+
+    @classmethod
+    def from_dict(cls, data):
+        """从 dict（JSON 缓存、数据库行）构造，忽略 id 等非空投字段"""
+        return cls(**{name: value for name, value in data.items() if name in FIELD_NAMES})
+
+    def to_dict(self):
+        """转成可 JSON 序列化的 dict（枚举转字符串、时间转 ISO 格式，省略 None 字段）"""
+        result = {}
+        for name in FIELD_NAMES:
+            value = getattr(self, name)
+            if value is None:
+                continue
+            if isinstance(value, StrEnum):
+                value = value.value
+            elif isinstance(value, datetime):
+                value = value.isoformat()
+            result[name] = value
+        return result
+
+
+FIELD_NAMES = tuple(f.name for f in fields(Airdrop))
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+抓取容错
+- TokenBucket：按主机限速（令牌桶，允许短时突发）
+- backoff_delay：带抖动的指数退避，优先使用服务端的 Retry-After
+- CircuitBreaker：连续失败的数据源在冷却期内直接跳过，状态存盘，跨多次运行生效
+"""
+
+import asyncio
+import json
+import os
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+DEFAULT_BREAKER_PATH = os.path.join('.cache', 'airdrop_crawler', 'circuit_breaker.json')
+
+# 需要重试的状态码（限流、网关/服务端临时故障）
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+DEFAULT_MAX_RETRIES = 3
+# 退避基数与上限（秒）
+DEFAULT_BACKOFF_BASE = 0.5
+DEFAULT_BACKOFF_CAP = 30.0
+# 连续失败多少次后熔断，熔断后冷却多久（秒）再放行一次试探请求
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_COOLDOWN = 30 * 60
+
+
+class TokenBucket:
+    """令牌桶：rate 为每秒补充的令牌数，burst 为桶容量"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        """取一个令牌，不足时等待（同一主机的请求按顺序排队）"""
+        async with self._lock:
+            self._refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+
+def parse_retry_after(value):
+    """Retry-After 头：秒数或 HTTP 日期，无法解析时返回 None"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def backoff_delay(attempt, base=DEFAULT_BACKOFF_BASE, cap=DEFAULT_BACKOFF_CAP, retry_after=None):
+    """
+    第 attempt 次重试前的等待时间（attempt 从1开始）
+
+    有 Retry-After 时照办；否则 full jitter：random(0, min(cap, base * 2^attempt))
+    """
+    if retry_after is not None:
+        return retry_after
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """
+    按数据源熔断：连续失败 failure_threshold 次后打开，
+    cooldown 秒后放行一次试探请求（半开），成功则关闭，失败则重新计时
+    """
+
+    def __init__(self, path=DEFAULT_BREAKER_PATH, failure_threshold=DEFAULT_FAILURE_THRESHOLD,
+                 cooldown=DEFAULT_COOLDOWN):
+        self.path = path
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = {}
+
+    @classmethod
+    def load(cls, path=DEFAULT_BREAKER_PATH, **options):
+        breaker = cls(path, **options)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                breaker.state = json.load(f)
+        except (OSError, ValueError):
+            breaker.state = {}
+        return breaker
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def allow(self, key, now=None):
+        """是否允许请求（关闭状态，或打开但已过冷却期）"""
+        entry = self.state.get(key)
+        if not entry or entry['failures'] < self.failure_threshold:
+            return True
+        return (now or time.time()) - entry['opened_at'] >= self.cooldown
+
+    def retry_in(self, key, now=None):
+        """距离下次试探还有多少秒"""
+        entry = self.state.get(key) or {}
+        return max(entry.get('opened_at', 0) + self.cooldown - (now or time.time()), 0.0)
+
+    def record_success(self, key):
+        self.state.pop(key, None)
+
+    def record_failure(self, key, error='', now=None):
+        entry = self.state.setdefault(key, {'failures': 0, 'opened_at': 0})
+        entry['failures'] += 1
+        entry['last_error'] = error
+        if entry['failures'] >= self.failure_threshold:
+            # 打开，或半开试探失败后重新开始冷却
+            entry['opened_at'] = now or time.time()
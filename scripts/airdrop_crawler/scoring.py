@@ -0,0 +1,361 @@
+# -*- coding: utf-8 -*-
+"""
+本地 AI 评分（NumPy 向量化，整批计算）
+- sql_scores()：与数据库函数 calculate_ai_score（创建空投爬虫系统.sql）逐项一致
+- score_airdrops()：在其基础上加入参与人数上限、来源类型、截止时间，并推导 risk_level
+写入数据库之前先在本地打分，不再需要每行一次数据库往返
+NumPy 按需导入：少量记录（< VECTORIZE_MIN）逐条计算，只生成SQL时不必付出导入 NumPy 的启动开销
+
+命令行：python -m airdrop_crawler.scoring [--dsn postgresql://...] [--count 100000]
+检查向量化实现与 SQL 函数是否一致（需要 dsn），并输出批量耗时；自动化测试见 tests/test_scoring.py
+"""
+
+import argparse
+import itertools
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+from .record import AirdropType, Difficulty, RiskLevel, SourceType
+
+BASE_SCORE = 5.0
+MIN_SCORE = 0.0
+MAX_SCORE = 10.0
+
+# 奖励金额阈值（USDT） -> 加分，从高到低判断
+REWARD_BONUS = ((5000, 3.0), (1000, 2.0), (500, 1.0))
+# SQL 函数只认识 easy / medium
+SQL_DIFFICULTY_BONUS = {'easy': 2.0, 'medium': 1.0}
+PLATFORM_BONUS = {
+    'Layer3': 1.5, 'Galxe': 1.5, 'DeFiLlama': 1.5,
+    'TaskOn': 1.0, 'Foresight': 1.0,
+}
+VERIFIED_BONUS = 0.5
+
+# ---- 以下为本地扩展特征（SQL 函数中没有） ----
+# 新增的难度等级：very_easy 与 easy 同分，very_hard 扣分
+EXTRA_DIFFICULTY_BONUS = {Difficulty.VERY_EASY: 2.0, Difficulty.VERY_HARD: -1.0}
+# 来源类型可信度，与平台加分取较高者
+SOURCE_TYPE_BONUS = {SourceType.OFFICIAL: 1.5, SourceType.CEX_ANNOUNCEMENT: 1.5}
+# 参与人数上限：名额少的人均奖励更高，名额过多则稀释
+SMALL_CAP, SMALL_CAP_BONUS = 10000, 0.5
+LARGE_CAP, LARGE_CAP_PENALTY = 100000, -0.5
+# 距离截止不足该天数时扣分（来不及完成任务）
+CLOSING_DAYS, CLOSING_PENALTY = 3, -1.0
+# 记录数达到该值才使用 NumPy 向量化
+VECTORIZE_MIN = 256
+
+
+# 类别特征编码为整数（0 表示 NULL 或未知取值），加分用查表数组完成
+DIFFICULTIES = tuple(Difficulty)
+PLATFORMS = tuple(PLATFORM_BONUS)
+SOURCE_TYPES = tuple(SourceType)
+AIRDROP_TYPES = tuple(AirdropType)
+
+
+DIFFICULTY_BONUS = {**SQL_DIFFICULTY_BONUS, **EXTRA_DIFFICULTY_BONUS}
+CEX_CODE = AIRDROP_TYPES.index(AirdropType.CEX) + 1
+
+
+def encode(values, vocabulary):
+    """类别取值 -> 编码数组（StrEnum 与同值字符串编码相同）"""
+    import numpy as np
+
+    index = {value: code for code, value in enumerate(vocabulary, 1)}
+    return np.fromiter((index.get(value, 0) for value in values), dtype=np.int8, count=len(values))
+
+
+@lru_cache(maxsize=None)
+def _bonus_tables():
+    """编码 -> 加分的查表数组（首次向量化评分时构建）"""
+    import numpy as np
+
+    def table(vocabulary, bonus):
+        return np.array([0.0] + [bonus.get(value, 0.0) for value in vocabulary])
+
+    return {
+        'sql_difficulty': table(DIFFICULTIES, SQL_DIFFICULTY_BONUS),
+        'difficulty': table(DIFFICULTIES, DIFFICULTY_BONUS),
+        'platform': table(PLATFORMS, PLATFORM_BONUS),
+        'source_type': table(SOURCE_TYPES, SOURCE_TYPE_BONUS),
+    }
+
+
+def _reward_bonus(reward_max):
+    """reward_max 为 float 数组，NaN 表示 NULL（比较结果为 False，与 SQL 一致）"""
+    import numpy as np
+
+    conditions = [reward_max > threshold for threshold, _ in REWARD_BONUS]
+    return np.select(conditions, [bonus for _, bonus in REWARD_BONUS], 0.0)
+
+
+def _finish(score):
+    """限制在 0-10 并保留一位小数（对应 DECIMAL(3,1)）"""
+    import numpy as np
+
+    return np.round(np.clip(score, MIN_SCORE, MAX_SCORE), 1)
+
+
+def sql_scores(reward_max, difficulty, platform, verified):
+    """
+    向量化的 calculate_ai_score
+
+    reward_max：float 数组（NaN 表示 NULL）；difficulty / platform：编码数组（见 encode）；
+    verified：bool 数组。返回 float64 数组
+    """
+    import numpy as np
+
+    tables = _bonus_tables()
+    score = BASE_SCORE + _reward_bonus(reward_max)
+    score += tables['sql_difficulty'][difficulty]
+    score += tables['platform'][platform]
+    score += np.where(verified, VERIFIED_BONUS, 0.0)
+    return _finish(score)
+
+
+def _platform(source):
+    """'Galxe @xxx' 之类的来源取第一个词作为平台名"""
+    return source.split(None, 1)[0] if source else None
+
+
+def extract_features(airdrops, now=None):
+    """
+    从空投记录中提取特征数组（每个特征一次遍历，之后的计算全部在 NumPy 中完成）
+
+    reward 取 estimated_value，缺失时用 reward_amount；缺失的数值为 NaN
+    """
+    import numpy as np
+
+    now = now or datetime.now()
+    count = len(airdrops)
+
+    def numbers(values):
+        return np.fromiter((np.nan if value is None else value for value in values),
+                           dtype=np.float64, count=count)
+
+    day = timedelta(days=1)
+    return {
+        'reward': numbers(a.reward_amount if a.estimated_value is None else a.estimated_value
+                          for a in airdrops),
+        'max_participants': numbers(a.max_participants for a in airdrops),
+        'days_left': numbers((a.end_time - now) / day if a.end_time else None for a in airdrops),
+        'difficulty': encode([a.difficulty for a in airdrops], DIFFICULTIES),
+        'platform': encode([_platform(a.source) for a in airdrops], PLATFORMS),
+        'source_type': encode([a.source_type for a in airdrops], SOURCE_TYPES),
+        'type': encode([a.type for a in airdrops], AIRDROP_TYPES),
+        'verified': np.fromiter((bool(a.verified) for a in airdrops), dtype=bool, count=count),
+    }
+
+
+def score_features(features):
+    """
+    扩展评分：SQL 函数的各项 + 本地特征，返回 (ai_score 数组, risk_level 数组)
+
+    - 来源类型与平台加分取较高者（不叠加）
+    - 已过截止时间的空投直接为 0 分
+    """
+    import numpy as np
+
+    tables = _bonus_tables()
+    verified = features['verified']
+    source_bonus = tables['source_type'][features['source_type']]
+    with np.errstate(invalid='ignore'):
+        score = BASE_SCORE + _reward_bonus(features['reward'])
+        score += tables['difficulty'][features['difficulty']]
+        score += np.maximum(tables['platform'][features['platform']], source_bonus)
+        score += np.where(verified, VERIFIED_BONUS, 0.0)
+
+        cap = features['max_participants']
+        score += np.select([cap <= SMALL_CAP, cap > LARGE_CAP], [SMALL_CAP_BONUS, LARGE_CAP_PENALTY], 0.0)
+
+        days_left = features['days_left']
+        score += np.where(days_left < CLOSING_DAYS, CLOSING_PENALTY, 0.0)
+        score = np.where(days_left < 0, MIN_SCORE, score)
+
+    trusted = source_bonus > 0
+    is_cex = features['type'] == CEX_CODE
+    risk_level = np.select(
+        [is_cex & verified, verified & trusted, verified | trusted],
+        [RiskLevel.NONE.value, RiskLevel.LOW.value, RiskLevel.MEDIUM.value],
+        RiskLevel.HIGH.value,
+    )
+    return _finish(score), risk_level
+
+
+def score_airdrop(airdrop, now=None):
+    """逐条版本的扩展评分（规则与 score_features 相同），返回 (ai_score, RiskLevel)"""
+    now = now or datetime.now()
+    reward = airdrop.reward_amount if airdrop.estimated_value is None else airdrop.estimated_value
+    score = BASE_SCORE
+    if reward is not None:
+        for threshold, bonus in REWARD_BONUS:
+            if reward > threshold:
+                score += bonus
+                break
+    score += DIFFICULTY_BONUS.get(airdrop.difficulty, 0.0)
+    source_bonus = SOURCE_TYPE_BONUS.get(airdrop.source_type, 0.0)
+    score += max(PLATFORM_BONUS.get(_platform(airdrop.source), 0.0), source_bonus)
+    verified = bool(airdrop.verified)
+    if verified:
+        score += VERIFIED_BONUS
+
+    cap = airdrop.max_participants
+    if cap is not None:
+        if cap <= SMALL_CAP:
+            score += SMALL_CAP_BONUS
+        elif cap > LARGE_CAP:
+            score += LARGE_CAP_PENALTY
+
+    if airdrop.end_time:
+        days_left = (airdrop.end_time - now) / timedelta(days=1)
+        if days_left < 0:
+            score = MIN_SCORE
+        elif days_left < CLOSING_DAYS:
+            score += CLOSING_PENALTY
+
+    trusted = source_bonus > 0
+    if airdrop.type == AirdropType.CEX and verified:
+        risk_level = RiskLevel.NONE
+    elif verified and trusted:
+        risk_level = RiskLevel.LOW
+    elif verified or trusted:
+        risk_level = RiskLevel.MEDIUM
+    else:
+        risk_level = RiskLevel.HIGH
+    return round(min(max(score, MIN_SCORE), MAX_SCORE), 1), risk_level
+
+
+def score_airdrops(airdrops, now=None):
+    """整批打分并写回记录的 ai_score / risk_level，返回同一列表"""
+    if not airdrops:
+        return airdrops
+    if len(airdrops) < VECTORIZE_MIN:
+        now = now or datetime.now()
+        for airdrop in airdrops:
+            airdrop.ai_score, airdrop.risk_level = score_airdrop(airdrop, now)
+        return airdrops
+    scores, risk_levels = score_features(extract_features(airdrops, now))
+    for airdrop, score, risk_level in zip(airdrops, scores.tolist(), risk_levels.tolist()):
+        airdrop.ai_score = score
+        airdrop.risk_level = RiskLevel(risk_level)
+    return airdrops
+
+
+# ---- 一致性检查 ----
+
+PARITY_REWARDS = (None, 0, 500, 501, 1000, 1001, 5000, 5001, 100000)
+PARITY_DIFFICULTIES = (None, 'easy', 'medium', 'hard', 'very_easy', 'very_hard')
+PARITY_PLATFORMS = (None, 'Layer3', 'Galxe', 'DeFiLlama', 'TaskOn', 'Foresight', 'Twitter')
+PARITY_VERIFIED = (None, False, True)
+
+
+def parity_cases():
+    return list(itertools.product(PARITY_REWARDS, PARITY_DIFFICULTIES, PARITY_PLATFORMS, PARITY_VERIFIED))
+
+
+def reference_scores(cases, dsn):
+    """参考结果：逐组输入调用数据库中的 calculate_ai_score（reward_min 在 SQL 中未使用，传 NULL）"""
+    import psycopg2
+
+    with psycopg2.connect(dsn) as conn, conn.cursor() as cur:
+        cur.execute(
+            "SELECT calculate_ai_score(NULL, r, d, p, v)::float8 "
+            "FROM unnest(%s::int[], %s::text[], %s::text[], %s::bool[]) "
+            "WITH ORDINALITY AS t(r, d, p, v, n) ORDER BY n",
+            [list(column) for column in zip(*cases)],
+        )
+        return [row[0] for row in cur.fetchall()]
+
+
+def parity_scores(cases):
+    """sql_scores 对 parity_cases 各组输入的结果"""
+    import numpy as np
+
+    rewards, difficulties, platforms, verified = zip(*cases)
+    return sql_scores(
+        np.array([np.nan if r is None else r for r in rewards], dtype=np.float64),
+        encode(difficulties, DIFFICULTIES), encode(platforms, PLATFORMS),
+        np.array([bool(v) for v in verified]),
+    ).tolist()
+
+
+def check_parity(dsn):
+    """与数据库函数对比，返回不一致的 (输入, 期望, 实际) 列表"""
+    cases = parity_cases()
+    actual = parity_scores(cases)
+    expected = reference_scores(cases, dsn)
+    return [(case, want, got) for case, want, got in zip(cases, expected, actual) if want != got]
+
+
+def _synthetic_airdrops(count, seed=0):
+    """批量耗时测试用的随机空投"""
+    import numpy as np
+
+    from .record import Airdrop
+
+    rng = np.random.default_rng(seed)
+    now = datetime.now()
+    difficulties = [None] + list(Difficulty)
+    source_types = [None, 'community'] + list(SourceType)
+    caps = [None, 5000, 50000, 200000]
+    return [
+        Airdrop(
+            title=f'Airdrop {i}', description='', project_url=f'https://example.com/{i}',
+            type=AirdropType.WEB3, estimated_value=float(reward),
+            max_participants=caps[cap], end_time=now + timedelta(days=float(days)),
+            difficulty=difficulties[difficulty], source_type=source_types[source_type],
+            verified=bool(verified),
+        )
+        for i, (reward, cap, days, difficulty, source_type, verified) in enumerate(zip(
+            rng.uniform(0, 10000, count), rng.integers(len(caps), size=count),
+            rng.uniform(-10, 120, count), rng.integers(len(difficulties), size=count),
+            rng.integers(len(source_types), size=count), rng.random(count) < 0.5,
+        ))
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='检查本地评分与 calculate_ai_score 的一致性')
+    parser.add_argument('--dsn', default=os.environ.get('DATABASE_URL'),
+                        help='Postgres 连接串（需已执行 创建空投爬虫系统.sql），默认读取 DATABASE_URL')
+    parser.add_argument('--count', type=int, default=100000, help='批量耗时测试的条数')
+    args = parser.parse_args(argv)
+
+    mismatches = check_parity(args.dsn) if args.dsn else []
+    total = len(parity_cases())
+    if not args.dsn:
+        print("⚠️ 未提供 --dsn（或 DATABASE_URL），跳过与数据库函数 calculate_ai_score 的一致性检查")
+    elif mismatches:
+        print(f"❌ 与数据库函数不一致：{len(mismatches)}/{total}")
+        for case, want, got in mismatches[:20]:
+            print(f"   {case}: 期望 {want}，实际 {got}")
+    else:
+        print(f"✅ 与数据库函数一致（{total} 组输入）")
+
+    airdrops = _synthetic_airdrops(args.count)
+    now = datetime.now()
+    sample = airdrops[:VECTORIZE_MIN * 4]
+    scores, risk_levels = score_features(extract_features(sample, now))
+    row_mismatches = sum(
+        (score, risk_level) != score_airdrop(airdrop, now)
+        for airdrop, score, risk_level in zip(sample, scores.tolist(), risk_levels.tolist())
+    )
+    if row_mismatches:
+        print(f"❌ 向量化与逐条评分不一致：{row_mismatches}/{len(sample)}")
+    else:
+        print(f"✅ 向量化与逐条评分一致（{len(sample)} 条随机空投）")
+
+    started = time.perf_counter()
+    features = extract_features(airdrops)
+    extracted = time.perf_counter()
+    score_features(features)
+    scored = time.perf_counter()
+    print(f"⏱️ {args.count} 条：提取特征 {(extracted - started) * 1000:.1f} ms，"
+          f"评分 {(scored - extracted) * 1000:.1f} ms")
+    return 1 if mismatches or row_mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+本地快照库（SQLite，单文件）
+爬取过程中边抓取边落盘：
+- pages：每个数据源抓到的页面（响应体 zlib 压缩）
+- records：每个数据源解析出的空投
+- checkpoints：每个数据源的进度（parsed 表示已解析完成）
+- snapshot：一次运行最终写出的空投（自然键 + content_hash + JSON）
+
+中途崩溃后再次运行会续上未完成的那次运行：已解析的数据源直接读 records，
+已抓取未解析的数据源从 pages 重新解析，只有剩下的数据源才重新抓取
+上一次完成的快照可作为 stored_hashes 做增量对比，无需查询线上数据库
+只有确认写入了数据库（upsert / pg_loader 成功）的运行才算完成；只生成SQL文件的运行不知道是否已执行，
+不作为对比基线，否则SQL未执行时下次增量会漏掉这些变化
+"""
+
+import json
+import os
+import sqlite3
+import time
+import zlib
+
+from .record import Airdrop
+from .sql_writer import content_hash, natural_key
+
+DEFAULT_SNAPSHOT_PATH = os.path.join('.cache', 'airdrop_crawler', 'snapshots.sqlite3')
+# 未完成的运行超过该时间（秒）不再续跑，重新开始
+DEFAULT_RESUME_WINDOW = 6 * 3600
+# 保留最近多少次已完成的运行
+DEFAULT_KEEP_RUNS = 10
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    status TEXT NOT NULL DEFAULT 'running'
+);
+CREATE TABLE IF NOT EXISTS pages (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    source TEXT NOT NULL,
+    url TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    body_hash TEXT,
+    body BLOB,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (run_id, source)
+);
+CREATE TABLE IF NOT EXISTS records (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    source TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (run_id, source, seq)
+);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    source TEXT NOT NULL,
+    state TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (run_id, source)
+);
+CREATE TABLE IF NOT EXISTS snapshot (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    key TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (run_id, key)
+);
+CREATE INDEX IF NOT EXISTS runs_job_status ON runs (job, status, id);
+"""
+
+
+class SnapshotStore:
+    """
+    用法：
+        store = SnapshotStore()
+        resumed = store.begin_run('crawl')
+        ...  # save_page / save_records / discard_page
+        previous = store.previous_hashes()
+        store.finish_run(airdrops, confirmed=写入数据库成功)
+    """
+
+    def __init__(self, path=DEFAULT_SNAPSHOT_PATH, resume_window=DEFAULT_RESUME_WINDOW,
+                 keep_runs=DEFAULT_KEEP_RUNS):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.resume_window = resume_window
+        self.keep_runs = keep_runs
+        self.conn = sqlite3.connect(path)
+        # WAL + NORMAL：每次提交不强制刷盘，崩溃时最多丢失最后一个事务
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('PRAGMA foreign_keys=ON')
+        self.conn.executescript(SCHEMA)
+        self.job = None
+        self.run_id = None
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---- 运行 ----
+
+    def begin_run(self, job='crawl', resume=True):
+        """开始一次运行；有未完成且未过期的同类运行时续跑，返回是否续跑"""
+        self.job = job
+        now = time.time()
+        row = self.conn.execute(
+            "SELECT id, started_at FROM runs WHERE job = ? AND status = 'running' ORDER BY id DESC LIMIT 1",
+            (job,),
+        ).fetchone()
+        with self.conn:
+            if row and resume and now - row[1] <= self.resume_window:
+                self.run_id = row[0]
+                return True
+            # 过期或不续跑的运行标记为放弃
+            self.conn.execute("UPDATE runs SET status = 'abandoned' WHERE job = ? AND status = 'running'", (job,))
+            self.run_id = self.conn.execute(
+                "INSERT INTO runs (job, started_at) VALUES (?, ?)", (job, now)
+            ).lastrowid
+        return False
+
+    def finish_run(self, airdrops, confirmed=True):
+        """
+        结束本次运行；只保留最近 keep_runs 次完成的运行
+
+        confirmed：数据已确认写入数据库时写入最终快照并标记完成（下次的对比基线）；
+        否则（只生成了SQL文件）标记为 unconfirmed 并随即清理，基线仍是上一次确认写入的快照
+        """
+        rows = []
+        for airdrop in airdrops if confirmed else ():
+            key = json.dumps([str(value) for value in natural_key(airdrop)], ensure_ascii=False)
+            rows.append((self.run_id, key, content_hash(airdrop), json.dumps(airdrop.to_dict(), ensure_ascii=False)))
+        with self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO snapshot VALUES (?, ?, ?, ?)", rows)
+            self.conn.execute(
+                "UPDATE runs SET status = ?, finished_at = ? WHERE id = ?",
+                ('completed' if confirmed else 'unconfirmed', time.time(), self.run_id),
+            )
+            self.conn.execute(
+                "DELETE FROM runs WHERE job = ? AND id NOT IN ("
+                "SELECT id FROM runs WHERE job = ? AND status = 'completed' ORDER BY id DESC LIMIT ?)"
+                " AND status != 'running'",
+                (self.job, self.job, self.keep_runs),
+            )
+
+    def previous_run_id(self):
+        row = self.conn.execute(
+            "SELECT id FROM runs WHERE job = ? AND status = 'completed' AND id != ? ORDER BY id DESC LIMIT 1",
+            (self.job, self.run_id or -1),
+        ).fetchone()
+        return row[0] if row else None
+
+    def previous_hashes(self):
+        """上一次完成（确认写入数据库）的快照：{自然键: content_hash}（格式同 sql_writer.fetch_stored_hashes），没有时返回 None"""
+        run_id = self.previous_run_id()
+        if run_id is None:
+            return None
+        return {
+            tuple(json.loads(key)): digest
+            for key, digest in self.conn.execute("SELECT key, content_hash FROM snapshot WHERE run_id = ?", (run_id,))
+        }
+
+    def previous_airdrops(self):
+        run_id = self.previous_run_id()
+        if run_id is None:
+            return []
+        return [Airdrop.from_dict(json.loads(data))
+                for (data,) in self.conn.execute("SELECT data FROM snapshot WHERE run_id = ?", (run_id,))]
+
+    # ---- 数据源进度 ----
+
+    def save_page(self, result):
+        """抓取到的页面（FetchResult）立即落盘；304 没有响应体时不保存"""
+        if not result.text:
+            return
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self.run_id, result.name, result.url, result.status, result.body_hash,
+                 zlib.compress(result.text.encode('utf-8')), time.time()),
+            )
+
+    def pending_pages(self):
+        """已抓取但还没有解析完成的页面：{数据源名称: (url, status, body_hash, text)}"""
+        rows = self.conn.execute(
+            "SELECT p.source, p.url, p.status, p.body_hash, p.body FROM pages p "
+            "LEFT JOIN checkpoints c ON c.run_id = p.run_id AND c.source = p.source "
+            "WHERE p.run_id = ? AND c.source IS NULL",
+            (self.run_id,),
+        )
+        return {source: (url, status, body_hash, zlib.decompress(body).decode('utf-8'))
+                for source, url, status, body_hash, body in rows}
+
+    def save_records(self, source, airdrops):
+        """一个数据源的解析结果落盘，并记录检查点"""
+        with self.conn:
+            self.conn.execute("DELETE FROM records WHERE run_id = ? AND source = ?", (self.run_id, source))
+            self.conn.executemany(
+                "INSERT INTO records VALUES (?, ?, ?, ?)",
+                ((self.run_id, source, seq, json.dumps(airdrop.to_dict(), ensure_ascii=False))
+                 for seq, airdrop in enumerate(airdrops)),
+            )
+            self._checkpoint(source, 'parsed')
+
+    def discard_page(self, source):
+        """解析失败的页面不保留，续跑时重新抓取"""
+        with self.conn:
+            self.conn.execute("DELETE FROM pages WHERE run_id = ? AND source = ?", (self.run_id, source))
+
+    def _checkpoint(self, source, state):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?)", (self.run_id, source, state, time.time())
+        )
+
+    def completed_sources(self):
+        return {source for (source,) in self.conn.execute(
+            "SELECT source FROM checkpoints WHERE run_id = ? AND state = 'parsed'", (self.run_id,)
+        )}
+
+    def load_records(self, source):
+        return [Airdrop.from_dict(json.loads(data)) for (data,) in self.conn.execute(
+            "SELECT data FROM records WHERE run_id = ? AND source = ? ORDER BY seq", (self.run_id, source)
+        )]
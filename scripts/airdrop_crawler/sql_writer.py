@@ -0,0 +1,414 @@
+# -*- coding: utf-8 -*-
+"""
+空投SQL生成
+写入模式：
+- replace：TRUNCATE 后全量插入（旧模式）
+- sync：按内容指纹增量同步，只写新增、变化的空投；调用方确认是完整爬取时（expire）才下架已消失的空投
+输出格式：
+- insert：每条空投一条 INSERT（可在 Supabase SQL 编辑器执行）
+- values：多行 VALUES，每条语句 rows_per_statement 行
+- copy-csv / copy-tsv：COPY ... FROM STDIN 数据块（需用 psql 执行）
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+
+from .supabase_writer import NATURAL_KEY, VANISHED_STATUS
+
+AIRDROP_TABLE = 'public.airdrops'
+# COPY 同步模式使用的临时表
+STAGING_TABLE = 'airdrops_staging'
+# 下架时存放本次自然键的临时表
+PRESENT_TABLE = 'airdrops_present'
+# 每次运行都会变化、或由线上业务维护的字段，不参与内容指纹
+HASH_EXCLUDED_FIELDS = frozenset({
+    'start_time', 'end_time', 'sort_order',
+    'total_participants', 'push_count', 'content_hash',
+})
+
+SQL_MODES = ('sync', 'replace')
+OUTPUT_FORMATS = ('insert', 'values', 'copy-csv', 'copy-tsv')
+DEFAULT_ROWS_PER_STATEMENT = 500
+
+
+def sql_literal(value):
+    """Python值转SQL字面量（单引号转义，列表/字典转 jsonb）"""
+    if value is None:
+        return 'NULL'
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, datetime):
+        return f"'{value.isoformat()}'::timestamptz"
+    if isinstance(value, (list, dict)):
+        return sql_literal(json.dumps(value, ensure_ascii=False)) + '::jsonb'
+    text = str(value).replace("'", "''")
+    return f"'{text}'"
+
+
+def _copy_text(value):
+    """COPY 数据中的文本表示（列表/字典为 JSON，由 jsonb 列解析）"""
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+def copy_csv_field(value):
+    """COPY CSV 字段：NULL 为空，文本一律加双引号（"" 转义）"""
+    if value is None:
+        return ''
+    text = _copy_text(value)
+    if isinstance(value, (bool, int, float)):
+        return text
+    return '"' + text.replace('"', '""') + '"'
+
+
+_TSV_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def copy_tsv_field(value):
+    """COPY TEXT 字段：NULL 为 \\N，反斜杠与制表/换行符转义"""
+    if value is None:
+        return '\\N'
+    return _copy_text(value).translate(_TSV_ESCAPES)
+
+
+def content_hash(airdrop):
+    """空投内容指纹（忽略时间戳、排序等易变字段；与写入数据库的 JSON 表示一致）"""
+    content = {k: v for k, v in airdrop.to_dict().items() if k not in HASH_EXCLUDED_FIELDS}
+    payload = json.dumps(content, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def natural_key(airdrop, key=NATURAL_KEY):
+    return tuple(getattr(airdrop, column) for column in key)
+
+
+def diff_airdrops(airdrops, stored_hashes):
+    """
+    与已存储的指纹对比
+
+    stored_hashes: {自然键: content_hash}
+    返回 (新增列表, 变化列表, 已消失的自然键列表)
+    """
+    inserts, updates = [], []
+    seen = set()
+    for airdrop in airdrops:
+        key = natural_key(airdrop)
+        seen.add(key)
+        if key not in stored_hashes:
+            inserts.append(airdrop)
+        elif stored_hashes[key] != content_hash(airdrop):
+            updates.append(airdrop)
+    vanished = [key for key in stored_hashes if key not in seen]
+    return inserts, updates, vanished
+
+
+def _comment(idx, airdrop):
+    title = ' '.join(str(airdrop.title or '').split())
+    return f"-- {idx}. {title}\n"
+
+
+def _key_condition(key_values, key=NATURAL_KEY):
+    return ' AND '.join(f"{column} = {sql_literal(value)}" for column, value in zip(key, key_values))
+
+
+def _batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def upsert_clause(columns, table=AIRDROP_TABLE, key=NATURAL_KEY):
+    """冲突时仅在内容指纹变化时才更新（未变化的行不产生写入）
+
+    下架后又重新出现的空投指纹不变，但状态需要恢复，所以状态不同时也更新
+    """
+    assignments = ',\n    '.join(
+        f"{column} = EXCLUDED.{column}" for column in columns if column not in key
+    )
+    condition = f"{table}.content_hash IS DISTINCT FROM EXCLUDED.content_hash"
+    if 'status' in columns:
+        condition += f"\n   OR {table}.status IS DISTINCT FROM EXCLUDED.status"
+    return (
+        f"\nON CONFLICT ({', '.join(key)}) DO UPDATE SET\n    {assignments}\n"
+        f"WHERE {condition}"
+    )
+
+
+def render_insert(columns, values, table=AIRDROP_TABLE, on_conflict=''):
+    column_sql = ',\n  '.join(columns)
+    value_sql = ',\n  '.join(sql_literal(value) for value in values)
+    return f"INSERT INTO {table} (\n  {column_sql}\n) VALUES (\n  {value_sql}\n){on_conflict};\n\n"
+
+
+def render_values_insert(columns, rows_values, table=AIRDROP_TABLE, on_conflict=''):
+    """多行 VALUES：列名只出现一次"""
+    value_rows = ',\n'.join(
+        '(' + ', '.join(sql_literal(value) for value in values) + ')' for values in rows_values
+    )
+    return f"INSERT INTO {table} ({', '.join(columns)}) VALUES\n{value_rows}{on_conflict};\n\n"
+
+
+def iter_copy_block(columns, rows_values, table, fmt):
+    """COPY ... FROM STDIN 数据块（逐行输出）"""
+    if fmt == 'copy-csv':
+        options, separator, encode = 'FORMAT csv', ',', copy_csv_field
+    else:
+        options, separator, encode = 'FORMAT text', '\t', copy_tsv_field
+    yield f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH ({options});\n"
+    for values in rows_values:
+        yield separator.join(encode(value) for value in values) + '\n'
+    yield "\\.\n\n"
+
+
+def iter_insert_rows(columns, rows, fmt='insert', table=AIRDROP_TABLE, on_conflict='',
+                     rows_per_statement=DEFAULT_ROWS_PER_STATEMENT):
+    """
+    按输出格式写入一批行
+
+    rows: 可迭代的 (airdrop, 各列值列表)；COPY 格式不支持 on_conflict
+    """
+    if fmt == 'insert':
+        for idx, (airdrop, values) in enumerate(rows, 1):
+            yield _comment(idx, airdrop)
+            yield render_insert(columns, values, table, on_conflict)
+    elif fmt == 'values':
+        for batch in _batched(rows, rows_per_statement):
+            yield render_values_insert(columns, [values for _, values in batch], table, on_conflict)
+    else:
+        yield from iter_copy_block(columns, (values for _, values in rows), table, fmt)
+
+
+def render_update(columns, values, key_values, table=AIRDROP_TABLE, key=NATURAL_KEY):
+    assignments = ',\n  '.join(
+        f"{column} = {sql_literal(value)}"
+        for column, value in zip(columns, values) if column not in key
+    )
+    return f"UPDATE {table} SET\n  {assignments}\nWHERE {_key_condition(key_values, key)};\n\n"
+
+
+def render_expire_keys(keys, table=AIRDROP_TABLE, key=NATURAL_KEY):
+    """已知消失的自然键 → 状态改为下架"""
+    if not keys:
+        return ''
+    conditions = '\n   OR '.join(f"({_key_condition(k, key)})" for k in keys)
+    return (
+        f"UPDATE {table} SET status = {sql_literal(VANISHED_STATUS)}\n"
+        f"WHERE status = 'active' AND (\n      {conditions}\n);\n\n"
+    )
+
+
+def iter_expire_missing(present_keys, table=AIRDROP_TABLE, key=NATURAL_KEY,
+                        rows_per_statement=DEFAULT_ROWS_PER_STATEMENT):
+    """
+    不在本次数据中的爬虫空投（content_hash 非空）→ 状态改为下架（逐行输出）
+
+    本次的自然键先分批写入临时表，再用 NOT EXISTS 反连接下架：
+    10 万行时也只是几百条小的 INSERT，不会生成一条带全部键的超长 NOT IN 语句
+    """
+    if not present_keys:
+        return
+    yield f"DROP TABLE IF EXISTS {PRESENT_TABLE};\n"
+    # 列类型与正式表一致
+    yield f"CREATE TEMP TABLE {PRESENT_TABLE} AS SELECT {', '.join(key)} FROM {table} WITH NO DATA;\n\n"
+    for batch in _batched(present_keys, rows_per_statement):
+        yield render_values_insert(key, batch, PRESENT_TABLE)
+    yield f"ANALYZE {PRESENT_TABLE};\n\n"
+    yield (
+        f"UPDATE {table} SET status = {sql_literal(VANISHED_STATUS)}\n"
+        f"WHERE status = 'active' AND content_hash IS NOT NULL\n"
+        f"AND NOT EXISTS (\n"
+        f"  SELECT 1 FROM {PRESENT_TABLE} p WHERE ({', '.join('p.' + c for c in key)}) = "
+        f"({', '.join(table + '.' + c for c in key)})\n"
+        f");\n\n"
+    )
+    yield f"DROP TABLE {PRESENT_TABLE};\n\n"
+
+
+def iter_replace_statements(rows, columns, table=AIRDROP_TABLE, fmt='insert',
+                            rows_per_statement=DEFAULT_ROWS_PER_STATEMENT):
+    """
+    全量模式：TRUNCATE + 全量写入
+
+    rows: 可迭代的 (airdrop, 各列值列表)，可以是生成器
+    """
+    yield "-- 清空旧数据\n"
+    yield f"TRUNCATE TABLE {table} CASCADE;\n\n"
+    yield from iter_insert_rows(columns, rows, fmt, table, rows_per_statement=rows_per_statement)
+
+
+def _iter_hashed_rows(rows, seen):
+    """追加 content_hash 列；同一自然键只保留第一条（键记录到有序集合 seen）"""
+    for airdrop, values in rows:
+        key = natural_key(airdrop)
+        if key in seen:
+            continue
+        seen[key] = None
+        digest = content_hash(airdrop)
+        yield airdrop, digest, list(values) + [digest]
+
+
+def should_expire(expire):
+    """expire 可以是布尔值，也可以是全部行写出后才求值的无参函数（分页流式爬取时失败的数据源到最后才知道）"""
+    return bool(expire() if callable(expire) else expire)
+
+
+def _iter_copy_sync(hashed_rows, columns, seen, table, expire=False):
+    """COPY 到临时表，再在同一事务里合并到正式表（expire 时下架消失的空投）"""
+    yield "BEGIN;\n\n"
+    yield f"CREATE TEMP TABLE {STAGING_TABLE} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP;\n\n"
+    yield from hashed_rows
+    if not seen:
+        yield "-- 本次没有空投数据，跳过同步\nROLLBACK;\n"
+        return
+    yield (
+        f"INSERT INTO {table} ({', '.join(columns)})\n"
+        f"SELECT {', '.join(columns)} FROM {STAGING_TABLE}"
+        f"{upsert_clause(columns, table)};\n\n"
+    )
+    if not should_expire(expire):
+        yield "COMMIT;\n\n"
+        return
+    yield "-- 本次数据中已消失的空投标记为下架\n"
+    yield (
+        f"UPDATE {table} SET status = {sql_literal(VANISHED_STATUS)}\n"
+        f"WHERE status = 'active' AND content_hash IS NOT NULL\n"
+        f"AND NOT EXISTS (\n"
+        f"  SELECT 1 FROM {STAGING_TABLE} s WHERE ({', '.join('s.' + c for c in NATURAL_KEY)}) = "
+        f"({', '.join(table + '.' + c for c in NATURAL_KEY)})\n"
+        f");\n\n"
+    )
+    yield "COMMIT;\n\n"
+
+
+def iter_sync_statements(rows, columns, stored_hashes=None, table=AIRDROP_TABLE, fmt='insert',
+                         rows_per_statement=DEFAULT_ROWS_PER_STATEMENT, expire=False):
+    """
+    增量模式：附带 content_hash 列写入（流式输出）
+
+    stored_hashes 为 None 时由数据库在 ON CONFLICT 中比较指纹；
+    已知线上指纹时只输出新增行、变化行的 UPDATE 和消失空投的状态变更
+    （变化行先缓存，待新增行写完后统一输出，以便 COPY 数据块保持连续）
+    同一自然键只写入第一条
+
+    expire：本次是完整爬取（所有数据源都成功）时才下架不在本次数据中的爬虫空投，由调用方决定；
+    只有部分数据（仅手动目录、有数据源失败、另一个脚本的数据）时下架会误伤其它来源写入的空投
+    """
+    columns = list(columns) + ['content_hash']
+    # 有序集合：保证下架语句中的键顺序稳定
+    seen = {}
+    hashed = _iter_hashed_rows(rows, seen)
+
+    if stored_hashes is None:
+        yield "-- 增量同步：内容未变化的空投不会被改写\n"
+        if fmt.startswith('copy'):
+            copy_rows = iter_insert_rows(
+                columns, ((airdrop, values) for airdrop, _, values in hashed), fmt, STAGING_TABLE
+            )
+            yield from _iter_copy_sync(copy_rows, columns, seen, table, expire)
+            return
+        yield from iter_insert_rows(
+            columns, ((airdrop, values) for airdrop, _, values in hashed), fmt, table,
+            upsert_clause(columns, table), rows_per_statement
+        )
+        if not seen:
+            # 没有抓到任何数据时不做下架处理，避免一次失败的爬取清空线上列表
+            yield "-- 本次没有空投数据，跳过同步\n"
+            return
+        if not should_expire(expire):
+            return
+        yield "-- 本次数据中已消失的空投标记为下架\n"
+        yield from iter_expire_missing(seen, table, rows_per_statement=rows_per_statement)
+        return
+
+    updates = []
+    inserted = []
+
+    def new_rows():
+        for airdrop, digest, values in hashed:
+            key = natural_key(airdrop)
+            if key not in stored_hashes:
+                inserted.append(key)
+                yield airdrop, values
+            elif stored_hashes[key] != digest:
+                updates.append((airdrop, values))
+
+    yield "-- 增量同步：仅新增与变化的空投\n"
+    yield from iter_insert_rows(columns, new_rows(), fmt, table, rows_per_statement=rows_per_statement)
+    for idx, (airdrop, values) in enumerate(updates, 1):
+        yield _comment(idx, airdrop)
+        yield render_update(columns, values, natural_key(airdrop), table)
+
+    if not seen:
+        yield "-- 本次没有空投数据，跳过同步\n"
+        return
+    vanished = [key for key in stored_hashes if key not in seen] if should_expire(expire) else []
+    yield render_expire_keys(vanished, table)
+    yield f"-- 增量同步：新增 {len(inserted)}，变化 {len(updates)}，下架 {len(vanished)}\n\n"
+
+
+def iter_statements(rows, columns, mode='sync', stored_hashes=None, table=AIRDROP_TABLE,
+                    fmt='insert', rows_per_statement=DEFAULT_ROWS_PER_STATEMENT, expire=False):
+    if mode not in SQL_MODES:
+        raise ValueError(f"未知的SQL模式: {mode}（可选: {', '.join(SQL_MODES)}）")
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"未知的输出格式: {fmt}（可选: {', '.join(OUTPUT_FORMATS)}）")
+    if mode == 'replace':
+        return iter_replace_statements(rows, columns, table, fmt, rows_per_statement)
+    return iter_sync_statements(rows, columns, stored_hashes, table, fmt, rows_per_statement, expire)
+
+
+def write_sql(chunks, output):
+    """
+    流式写出SQL片段
+
+    output 为文件路径或已打开的文本流（如 sys.stdout，可直接管道给 psql）；
+    写文件时先写临时文件再替换，中途失败不会留下半个迁移文件
+    返回写出的字符数
+    """
+    written = 0
+
+    def counted():
+        nonlocal written
+        for chunk in chunks:
+            written += len(chunk)
+            yield chunk
+
+    if hasattr(output, 'write'):
+        output.writelines(counted())
+        output.flush()
+        return written
+    tmp_path = f'{output}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.writelines(counted())
+    os.replace(tmp_path, output)
+    return written
+
+
+def fetch_stored_hashes(client, table='airdrops', key=NATURAL_KEY, page_size=1000):
+    """从Supabase分页读取线上空投的自然键与内容指纹"""
+    stored = {}
+    start = 0
+    while True:
+        result = client.table(table).select(','.join(key) + ',content_hash') \
+            .not_.is_('content_hash', 'null') \
+            .range(start, start + page_size - 1).execute()
+        for row in result.data:
+            # PostgREST 返回的是 dict，不是 Airdrop
+            stored[tuple(row[column] for column in key)] = row['content_hash']
+        if len(result.data) < page_size:
+            return stored
+        start += page_size
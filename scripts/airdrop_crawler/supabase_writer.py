@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+Supabase 批量写入
+按自然键分块 upsert，失败的分块单独重试，不会重放整批数据
+写入前先读取线上的内容指纹，指纹和状态都没变的行不再写入，同 sql_writer 的增量模式
+全量爬取成功后，本次数据中已消失的爬虫空投（content_hash 非空）改为下架，同 sql_writer 的同步模式
+"""
+
+import time
+
+from . import metrics
+
+DEFAULT_TABLE = 'airdrops'
+# 每次请求写入的行数
+DEFAULT_BATCH_SIZE = 500
+# 自然键（需要数据库中存在对应的唯一索引）
+NATURAL_KEY = ('project_url', 'type')
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF = 1.0
+# 分页读取线上数据时每页的行数
+DEFAULT_PAGE_SIZE = 1000
+# 下架时每次请求的自然键数（键放在请求地址的过滤条件里，不能太长）
+DEFAULT_EXPIRE_BATCH = 50
+# 本次数据中已消失的空投改为该状态（不删除，保留推送历史引用）
+VANISHED_STATUS = 'expired'
+
+
+def chunked(rows, size):
+    """按 size 切分列表"""
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def dedupe_by_key(rows, key=NATURAL_KEY):
+    """同一自然键只保留最后一条（同一条 upsert 语句里不能出现重复键）"""
+    unique = {}
+    for row in rows:
+        unique[tuple(row.get(column) for column in key)] = row
+    return list(unique.values())
+
+
+def execute_with_retries(build_query, action, count, max_retries=DEFAULT_MAX_RETRIES, backoff=DEFAULT_BACKOFF):
+    """执行 build_query() 生成的请求，失败时指数退避重试，返回是否成功"""
+    for attempt in range(1, max_retries + 1):
+        try:
+            build_query().execute()
+            return True
+        except Exception as e:
+            print(f"⚠️ {action}失败（第{attempt}/{max_retries}次，{count}行）: {e}")
+            if attempt < max_retries:
+                time.sleep(backoff * 2 ** (attempt - 1))
+    return False
+
+
+def upsert_chunk(client, rows, table=DEFAULT_TABLE, key=NATURAL_KEY,
+                 max_retries=DEFAULT_MAX_RETRIES, backoff=DEFAULT_BACKOFF):
+    """写入单个分块，失败时指数退避重试，返回是否成功"""
+    return execute_with_retries(
+        lambda: client.table(table).upsert(rows, on_conflict=','.join(key)),
+        '分块写入', len(rows), max_retries, backoff,
+    )
+
+
+def fetch_stored_versions(client, table=DEFAULT_TABLE, key=NATURAL_KEY, page_size=DEFAULT_PAGE_SIZE):
+    """分页读取线上爬虫空投（content_hash 非空）的 {自然键: (content_hash, status)}"""
+    stored = {}
+    start = 0
+    while True:
+        query = client.table(table).select(','.join(key) + ',content_hash,status') \
+            .not_.is_('content_hash', 'null')
+        for column in key:
+            query = query.order(column)
+        result = query.range(start, start + page_size - 1).execute()
+        for row in result.data:
+            stored[tuple(row[column] for column in key)] = (row['content_hash'], row['status'])
+        if len(result.data) < page_size:
+            return stored
+        start += page_size
+
+
+def drop_unchanged(rows, stored, key=NATURAL_KEY):
+    """
+    去掉线上指纹和状态都相同的行，返回 (需要写入的行, 跳过的行数)
+
+    指纹相同但线上已下架的行（重新出现的空投）仍要写入，恢复为 active
+    """
+    changed = [row for row in rows
+               if row.get('content_hash') is None
+               or stored.get(tuple(row.get(column) for column in key))
+               != (row['content_hash'], row.get('status', 'active'))]
+    return changed, len(rows) - len(changed)
+
+
+def bulk_upsert(client, rows, table=DEFAULT_TABLE, batch_size=DEFAULT_BATCH_SIZE,
+                key=NATURAL_KEY, max_retries=DEFAULT_MAX_RETRIES, backoff=DEFAULT_BACKOFF, stored=None):
+    """
+    分块批量 upsert，跳过线上未变化的行
+
+    stored：已读取的 fetch_stored_versions() 结果（多次写入时只读一次），None 时在写入前读取
+    返回 (成功写入行数, 失败的分块列表)；失败分块可以原样再次传入重试
+    """
+    rows = dedupe_by_key(rows, key)
+    if any(row.get('content_hash') is not None for row in rows):
+        if stored is None:
+            stored = fetch_stored_versions(client, table, key)
+        rows, unchanged = drop_unchanged(rows, stored, key)
+        metrics.incr('rows_unchanged', unchanged)
+    written = 0
+    failed_chunks = []
+    for chunk in chunked(rows, batch_size):
+        if upsert_chunk(client, chunk, table, key, max_retries, backoff):
+            written += len(chunk)
+        else:
+            failed_chunks.append(chunk)
+    return written, failed_chunks
+
+
+def fetch_live_keys(client, table=DEFAULT_TABLE, key=NATURAL_KEY, page_size=DEFAULT_PAGE_SIZE):
+    """分页读取线上仍为 active 的爬虫空投（content_hash 非空，后台手工添加的不算）的自然键"""
+    keys = set()
+    start = 0
+    while True:
+        query = client.table(table).select(','.join(key)).eq('status', 'active') \
+            .not_.is_('content_hash', 'null')
+        for column in key:
+            # 固定顺序，分页时不会漏行或重复
+            query = query.order(column)
+        result = query.range(start, start + page_size - 1).execute()
+        keys.update(tuple(row[column] for column in key) for row in result.data)
+        if len(result.data) < page_size:
+            return keys
+        start += page_size
+
+
+def expire_missing(client, present_keys, table=DEFAULT_TABLE, key=NATURAL_KEY,
+                   batch_size=DEFAULT_EXPIRE_BATCH, max_retries=DEFAULT_MAX_RETRIES, backoff=DEFAULT_BACKOFF):
+    """
+    线上 active 的爬虫空投中不在 present_keys 里的 → 状态改为下架
+
+    只应在全量爬取并全部写入成功后调用（部分数据源失败时调用会误下架）
+    返回 (下架行数, 失败的键列表)
+    """
+    present = set(present_keys)
+    if not present:
+        # 没有抓到任何数据时不做下架处理，避免一次失败的爬取清空线上列表
+        return 0, []
+    vanished = sorted(k for k in fetch_live_keys(client, table, key) if k not in present)
+    # 按其余键列分组（自然键为 project_url + type 时即按 type），第一列用 in 过滤
+    groups = {}
+    for k in vanished:
+        groups.setdefault(k[1:], []).append(k[0])
+    expired = 0
+    failed = []
+    for rest, firsts in groups.items():
+        for chunk in chunked(firsts, batch_size):
+            def build_query():
+                query = client.table(table).update({'status': VANISHED_STATUS}) \
+                    .eq('status', 'active').in_(key[0], chunk)
+                for column, value in zip(key[1:], rest):
+                    query = query.eq(column, value)
+                return query
+
+            if execute_with_retries(build_query, '下架', len(chunk), max_retries, backoff):
+                expired += len(chunk)
+            else:
+                failed.extend((first, *rest) for first in chunk)
+    return expired, failed
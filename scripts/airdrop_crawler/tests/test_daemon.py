@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+守护进程：只有 on_change 报告写入成功后才提交指纹，写入失败的变化下一轮会再次写入
+
+在 scripts 目录下执行：python -m pytest airdrop_crawler/tests
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+from airdrop_crawler.daemon import CrawlDaemon, ScheduleStore, items_fingerprint
+from airdrop_crawler.record import Airdrop, AirdropType
+
+SOURCE = {'name': 'fake', 'url': 'https://example.com/'}
+
+
+class FakeEngine:
+    async def fetch_many(self, sources):
+        return [SimpleNamespace(name=source['name'], skipped=False) for source in sources]
+
+
+def _airdrop(title):
+    return Airdrop(title=title, description='', project_url=f'https://example.com/{title}', type=AirdropType.WEB3)
+
+
+def _daemon(on_change, items):
+    return CrawlDaemon(
+        [SOURCE], FakeEngine(), SimpleNamespace(parse_many=None),
+        lambda results, parse_many: {result.name: items for result in results},
+        on_change, schedule=ScheduleStore(path=None),
+    )
+
+
+def _cycle(daemon):
+    # now 取无穷大：每轮所有数据源都已到期
+    return asyncio.run(daemon.run_cycle(now=float('inf')))
+
+
+def test_failed_write_keeps_previous_fingerprint_and_retries():
+    items = [_airdrop('a')]
+    outcomes = [False, True]
+    calls = []
+
+    def on_change(latest):
+        calls.append(latest)
+        return outcomes[len(calls) - 1]
+
+    daemon = _daemon(on_change, items)
+    assert _cycle(daemon) == ['fake']
+    assert daemon.schedule.get('fake').fingerprint == ''
+    assert daemon.latest == {}
+
+    # 内容没变，但上次没有写入成功：仍视为有变化并重试
+    assert _cycle(daemon) == ['fake']
+    assert len(calls) == 2
+    assert daemon.schedule.get('fake').fingerprint == items_fingerprint(items)
+    assert daemon.latest == {'fake': items}
+
+    assert _cycle(daemon) == []
+    assert len(calls) == 2
+
+
+def test_exception_in_on_change_counts_as_failure():
+    def on_change(latest):
+        raise RuntimeError('db down')
+
+    daemon = _daemon(on_change, [_airdrop('a')])
+    assert _cycle(daemon) == ['fake']
+    assert daemon.schedule.get('fake').fingerprint == ''
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+近似去重（MinHash + LSH）
+列表页地址：没有详情链接的列表项各有稳定的自然键，去重时不按列表页地址合并
+
+在 scripts 目录下执行：python -m pytest airdrop_crawler/tests
+"""
+
+import importlib
+from dataclasses import replace
+
+import pytest
+
+from airdrop_crawler.dedup import DedupIndex, dedupe_airdrops, normalize_text, normalize_url
+from airdrop_crawler.record import Airdrop, AirdropType
+from airdrop_crawler.sql_writer import natural_key
+
+SOURCE = {'name': 'listing', 'url': 'https://airdrops.example/page/3', 'listing_url': 'https://airdrops.example/'}
+ITEMS = [
+    {'title': 'Alpha Protocol 测试网', 'description': '完成跨链桥交互即可参与', 'href': None},
+    {'title': 'Beta Wallet 积分活动', 'description': '每日签到领取积分，按积分分配代币', 'href': None},
+    {'title': 'Gamma DEX', 'description': '提供流动性获得空投资格', 'href': '/gamma'},
+]
+
+
+def _airdrop(title, description, project_url):
+    return Airdrop(title=title, description=description, project_url=project_url, type=AirdropType.WEB3)
+
+
+@pytest.fixture(scope='module')
+def crawler():
+    return importlib.import_module('爬取空投数据')
+
+
+def test_items_without_href_get_distinct_stable_keys(crawler):
+    airdrops = crawler.parse_airdrop_items(ITEMS, SOURCE)
+    assert [a.project_url for a in airdrops] == [
+        crawler.listing_item_url(SOURCE, ITEMS[0]['title']),
+        crawler.listing_item_url(SOURCE, ITEMS[1]['title']),
+        'https://airdrops.example/gamma',
+    ]
+    assert all(a.project_url.startswith('https://airdrops.example/#') for a in airdrops[:2])
+    assert len({natural_key(a) for a in airdrops}) == len(airdrops)
+    # 再次爬取（哪怕出现在别的页）得到相同的键
+    again = crawler.parse_airdrop_items(ITEMS[:2], {**SOURCE, 'url': 'https://airdrops.example/page/7'})
+    assert [natural_key(a) for a in again] == [natural_key(a) for a in airdrops[:2]]
+
+
+def test_listing_items_are_not_merged_by_url(crawler):
+    airdrops = crawler.parse_airdrop_items(ITEMS[:2], SOURCE)
+    unique, merged = dedupe_airdrops(airdrops, listing_urls=[SOURCE['listing_url']])
+    assert merged == 0 and unique == airdrops
+
+
+# ---- MinHash 去重 ----
+
+LAYERZERO = _airdrop('LayerZero 主网交互空投', '跨链桥交互，完成至少10笔交易，预计奖励 ZRO 代币', 'https://layerzero.network')
+# 同一项目在另一来源的文案：相似度低于默认阈值，但高于同 project_url 时的阈值
+LAYERZERO_ELSEWHERE = _airdrop('LayerZero Airdrop', 'LayerZero 跨链交互任务，奖励 ZRO', 'https://www.layerzero.network/')
+UNRELATED = _airdrop('Blast 积分', '存入 ETH 和稳定币获取原生收益与积分', 'https://blast.io')
+
+
+def test_normalize():
+    assert normalize_text('ＡＢＣ 空投！🚀 Go_Go') == 'abc空投gogo'
+    assert normalize_url('HTTPS://www.Example.com/path/?q=1#x') == 'example.com/path'
+    assert normalize_url('example.com') == 'example.com'
+    assert normalize_url(None) == ''
+
+
+def test_same_url_uses_lower_threshold():
+    unique, merged = dedupe_airdrops([LAYERZERO, LAYERZERO_ELSEWHERE, UNRELATED])
+    assert merged == 1 and [a.title for a in unique] == [LAYERZERO.title, UNRELATED.title]
+
+
+def test_listing_url_does_not_count_as_same_url():
+    unique, merged = dedupe_airdrops([LAYERZERO, LAYERZERO_ELSEWHERE], listing_urls=['https://layerzero.network/'])
+    assert merged == 0 and len(unique) == 2
+
+
+def test_near_identical_text_merges_across_urls():
+    copy = replace(LAYERZERO, project_url='https://mirror.example/layerzero', title=LAYERZERO.title + '！')
+    _, merged = dedupe_airdrops([LAYERZERO, copy])
+    assert merged == 1
+
+
+def test_merge_keeps_fuller_record_and_fills_gaps():
+    sparse = replace(LAYERZERO, twitter_url='https://twitter.com/LayerZero_Labs')
+    full = replace(LAYERZERO, image_url='https://example.com/zro.png', reward_amount=2500, tags=['L0'])
+    unique, merged = dedupe_airdrops([sparse, full])
+    assert merged == 1
+    assert unique[0].image_url == full.image_url and unique[0].tags == ['L0']
+    assert unique[0].twitter_url == sparse.twitter_url
+
+
+def test_index_requires_bands_to_divide_num_perm():
+    with pytest.raises(ValueError):
+        DedupIndex(num_perm=100, bands=32)
+    index = DedupIndex()
+    assert index.add(LAYERZERO) is None and index.add(LAYERZERO) == 0 and len(index) == 1
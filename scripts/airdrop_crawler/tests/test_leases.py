@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+数据源租约：同一时刻只有一个 worker 持有，过期后可被接手，被接手后原持有者不能续期、写入或记账
+
+默认在临时 SQLite 上执行；配置了 DATABASE_URL 且已执行 添加数据源租约.sql 时，同样的用例也在 Postgres 上执行
+    DATABASE_URL=postgresql://localhost/postgres python -m pytest airdrop_crawler/tests
+"""
+
+import os
+import uuid
+
+import pytest
+
+from airdrop_crawler.leases import PostgresLeaseStore, ShardWorker, SqliteLeaseStore
+
+DSN = os.environ.get('DATABASE_URL')
+TTL = 60
+INTERVAL = 3600
+
+
+@pytest.fixture(params=['sqlite', 'postgres'])
+def store(request, tmp_path):
+    if request.param == 'sqlite':
+        store = SqliteLeaseStore(str(tmp_path / 'leases.sqlite3'))
+        yield store
+        store.close()
+        return
+    if not DSN:
+        pytest.skip('未配置 DATABASE_URL')
+    pytest.importorskip('psycopg2')
+    store = PostgresLeaseStore(DSN)
+    with store.conn.cursor() as cur:
+        cur.execute("SELECT 1 FROM information_schema.columns "
+                    "WHERE table_name = 'airdrop_sources' AND column_name = 'lease_token'")
+        if cur.fetchone() is None:
+            store.close()
+            pytest.skip('数据库中没有 airdrop_sources 的租约列（先执行 添加数据源租约.sql）')
+    yield store
+    with store.conn.cursor() as cur:
+        cur.execute("DELETE FROM airdrop_sources WHERE name LIKE 'lease-test-%'")
+    store.close()
+
+
+@pytest.fixture
+def names(store):
+    # 每个用例用不重复的数据源名，Postgres 上不影响真实数据源
+    prefix = f'lease-test-{uuid.uuid4().hex[:8]}'
+    names = [f'{prefix}-a', f'{prefix}-b']
+    store.register([(name, 'crawler') for name in names])
+    return names
+
+
+def test_only_one_worker_holds_a_source(store, names):
+    leases, taken_over = store.acquire('w1', names, 1, TTL, INTERVAL)
+    assert [lease.source for lease in leases] == names[:1] and taken_over == 0
+    others, _ = store.acquire('w2', names, 5, TTL, INTERVAL)
+    assert [lease.source for lease in others] == names[1:]
+    assert store.acquire('w3', names, 5, TTL, INTERVAL) == ([], 0)
+
+
+def test_expired_lease_is_taken_over(store, names):
+    (stale,), _ = store.acquire('w1', names[:1], 1, -1, INTERVAL)
+    (fresh,), taken_over = store.acquire('w2', names[:1], 1, TTL, INTERVAL)
+    assert taken_over == 1 and fresh.token > stale.token
+    # 原持有者不能续期，也不能记下这次爬取
+    assert store.renew('w1', [stale], TTL) == []
+    assert store.release('w1', stale, True) is False
+    assert store.renew('w2', [fresh], TTL) == [fresh]
+    assert store.release('w2', fresh, True) is True
+
+
+def test_released_source_waits_for_interval(store, names):
+    (lease,), _ = store.acquire('w1', names[:1], 1, TTL, INTERVAL)
+    assert store.release('w1', lease, True)
+    assert store.acquire('w2', names[:1], 1, TTL, INTERVAL) == ([], 0)
+    assert len(store.acquire('w2', names[:1], 1, TTL, 0)[0]) == 1
+
+
+def test_abandoned_lease_can_be_taken_immediately(store, names):
+    (lease,), _ = store.acquire('w1', names[:1], 1, TTL, INTERVAL)
+    assert store.release('w1', lease)
+    assert len(store.acquire('w2', names[:1], 1, TTL, INTERVAL)[0]) == 1
+
+
+def test_shard_worker_writes_held_sources_once(store, names):
+    written = []
+
+    def crawl(sources):
+        return {name: [f'{name}-item'] for name in sources}
+
+    def write(airdrops):
+        written.extend(airdrops)
+        return True
+
+    worker = ShardWorker(store, [(name, 'crawler') for name in names], crawl, write, owner='w1',
+                         ttl=TTL, batch=1, interval=INTERVAL)
+    assert worker.run(once=True) == 2
+    assert written == [f'{name}-item' for name in names]
+    # 已爬取的数据源在 interval 内不会再被领取
+    assert worker.run(once=True) == 0
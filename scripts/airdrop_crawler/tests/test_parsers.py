@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+各解析后端的一致性：同一页面提取出的空投列表项必须完全相同
+流式后端另按不同大小的块喂入，结果与整页解析相同
+分页解析（parse_page / extract_page）一次取得的列表项和下一页链接与分开解析的结果相同
+
+在 scripts 目录下执行：python -m pytest airdrop_crawler/tests
+"""
+
+import random
+
+import pytest
+
+from airdrop_crawler.parsers import (
+    BACKENDS, DEFAULT_FIXTURE, STREAM_BACKEND, available_backends, extract_page, get_parser,
+)
+
+SOURCE = {'name': 'parity-fixture', 'url': 'https://example.com/'}
+# 对照后端：BeautifulSoup 内置的 html.parser（不依赖其他解析库）
+BASELINE_BACKEND = 'html.parser'
+CHUNK_SIZES = (1, 7, 64, 1000, 4096)
+
+PAGINATED_PAGE = '''<html><body>
+<div class="airdrop-item"><h3 class="title">A</h3><p class="description">a</p><a href="/a">go</a></div>
+<nav><a href="/page/1">1</a><a class="more" rel="nofollow next" href="/page/2">下一页</a></nav>
+</body></html>'''
+
+# 手写扫描器容易出错的写法：属性值中的 >、注释和 <script> 中的空投标记、大小写、实体、嵌套、未闭合的标签
+TRICKY_PAGE = '''<!DOCTYPE html><html><head><title>t</title>
+<script>var tpl = '<div class="airdrop-item"><h3 class="title">FAKE</h3><p class="description">x</p></div>';</script>
+<style>.airdrop-item > .title { color: red }</style></head><body>
+<!-- <div class="airdrop-item"><h3 class="title">COMMENTED</h3><p class="description">c</p></div> -->
+<div class="airdrop-item card" data-x="a>b" title='x > y'><h3 class="title">GT attr</h3>
+<p class="description">d1</p><a href="/1">1</a></div>
+<DIV CLASS="card airdrop-item"><H3 class="title">Upper &amp; entity</H3>
+<p class="description">d2 <b>bold</b></p><a href="/2?a=1&amp;b=2">2</a></DIV>
+<div class="airdrop-item"><h3 class="title">Nested outer</h3><p class="description">d3</p>
+  <div class="airdrop-item"><h3 class="title">Nested inner</h3><p class="description">d4</p><a href="/4">4</a></div></div>
+<div class="airdrop-item"><h3 class="title">Unclosed span</h3><p class="description">d5</p><span>more</div>
+<div class="airdrop-itemx"><h3 class="title">NOT AN ITEM</h3></div>
+<a rel="nofollow next" href="/page/2">next</a>
+<div class="airdrop-item"><h3 class="title">Unclosed at EOF</h3><p class="description">d6
+'''
+TRICKY_TITLES = ['GT attr', 'Upper & entity', 'Nested outer', 'Nested inner', 'Unclosed span', 'Unclosed at EOF']
+
+
+def _require(backend):
+    if backend == STREAM_BACKEND:
+        backend = 'lxml'
+    if backend not in available_backends():
+        pytest.skip(f'未安装 {backend} 后端的依赖')
+
+
+def _chunks(text, size):
+    return [text[start:start + size] for start in range(0, len(text), size)]
+
+
+def _random_chunks(text, seed):
+    rng = random.Random(seed)
+    chunks = []
+    start = 0
+    while start < len(text):
+        size = rng.randint(1, 5000)
+        chunks.append(text[start:start + size])
+        start += size
+    return chunks
+
+
+def _feed(backend, chunks, source=SOURCE):
+    stream = get_parser(source, backend).stream()
+    items = []
+    for chunk in chunks:
+        items.extend(stream.feed(chunk))
+    items.extend(stream.close())
+    return items, stream.next_href
+
+
+@pytest.fixture(scope='module')
+def fixture_html():
+    with open(DEFAULT_FIXTURE, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+@pytest.fixture(scope='module')
+def baseline(fixture_html):
+    items = list(get_parser(SOURCE, BASELINE_BACKEND).parse(fixture_html))
+    assert items and all(item['title'] and item['description'] and item['href'] for item in items)
+    return items
+
+
+@pytest.mark.parametrize('backend', BACKENDS + (STREAM_BACKEND,))
+def test_backends_extract_identical_records(backend, fixture_html, baseline):
+    _require(backend)
+    assert list(get_parser(SOURCE, backend).parse(fixture_html)) == baseline
+
+
+@pytest.mark.parametrize('backend', BACKENDS + (STREAM_BACKEND,))
+def test_backends_find_same_next_href(backend):
+    _require(backend)
+    assert get_parser(SOURCE, backend).next_href(PAGINATED_PAGE) == '/page/2'
+
+
+@pytest.mark.parametrize('size', CHUNK_SIZES)
+def test_stream_chunked_feeding(size, fixture_html, baseline):
+    _require(STREAM_BACKEND)
+    items, _ = _feed(STREAM_BACKEND, _chunks(fixture_html, size))
+    assert items == baseline
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_stream_random_chunks(seed, fixture_html, baseline):
+    _require(STREAM_BACKEND)
+    items, _ = _feed(STREAM_BACKEND, _random_chunks(fixture_html, seed))
+    assert items == baseline
+
+
+@pytest.mark.parametrize('size', CHUNK_SIZES)
+def test_stream_chunked_next_href(size):
+    _require(STREAM_BACKEND)
+    items, next_href = _feed(STREAM_BACKEND, _chunks(PAGINATED_PAGE, size))
+    assert next_href == '/page/2'
+    assert items == list(get_parser(SOURCE, BASELINE_BACKEND).parse(PAGINATED_PAGE))
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_stream_matches_full_page_backends_on_tricky_markup(backend):
+    _require(backend)
+    _require(STREAM_BACKEND)
+    expected = list(get_parser(SOURCE, backend).parse(TRICKY_PAGE))
+    assert [item['title'] for item in expected] == TRICKY_TITLES
+    assert get_parser(SOURCE, backend).next_href(TRICKY_PAGE) == '/page/2'
+    for size in CHUNK_SIZES:
+        items, next_href = _feed(STREAM_BACKEND, _chunks(TRICKY_PAGE, size))
+        assert items == expected, size
+        assert next_href == '/page/2', size
+
+
+@pytest.mark.parametrize('backend', BACKENDS + (STREAM_BACKEND,))
+@pytest.mark.parametrize('page', [PAGINATED_PAGE, TRICKY_PAGE])
+def test_parse_page_matches_separate_parses(backend, page):
+    _require(backend)
+    parser = get_parser(SOURCE, backend)
+    assert parser.parse_page(page) == (list(parser.parse(page)), '/page/2')
+
+
+def test_extract_page_json():
+    source = {'name': 'api', 'url': 'https://example.com/api', 'type': 'json',
+              'api': {'items': 'result.list', 'next': 'result.next'}}
+    text = '{"result": {"list": [{"title": " A ", "description": "a", "url": "/a"}, 1], "next": "/api?page=2"}}'
+    items, next_href = extract_page(text, source)
+    assert items == [{'title': 'A', 'description': 'a', 'href': '/a'}]
+    assert next_href == '/api?page=2'
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+直连 Postgres 写入
+- 二进制 COPY 编码（文件头、各类型的编码、NULL、结束标记），不需要数据库
+- 只有调用方确认是完整爬取（expire）时才下架本次消失的空投
+- 二进制数据导入临时表后读回的值与原值相同
+
+需要数据库的用例连接串取环境变量 DATABASE_URL，未配置时跳过
+    DATABASE_URL=postgresql://localhost/postgres python -m pytest airdrop_crawler/tests
+"""
+
+import io
+import os
+import struct
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from airdrop_crawler import pg_loader
+from airdrop_crawler.pg_loader import COPY_SIGNATURE, IterReader, _encode_timestamptz, iter_copy_binary
+from airdrop_crawler.record import Airdrop, AirdropType
+
+DSN = os.environ.get('DATABASE_URL')
+# 按 public.airdrops 的结构（含唯一约束）建一张测试表，不动线上数据
+TEST_TABLE = 'public.airdrops_pg_loader_test'
+COLUMNS = ('title', 'description', 'project_url', 'type', 'status')
+ROUNDTRIP_TYPES = ('text', 'float8', 'int4', 'bool', 'jsonb', 'timestamptz')
+ROUNDTRIP_ROWS = [
+    ("It's 中文\t\n", 1.25, -7, True, {'tags': ['a', '"b"']}, datetime(2026, 1, 2, 3, 4, 5, 6, tzinfo=timezone.utc)),
+    ('', 0.0, 2 ** 31 - 1, False, [], datetime(1999, 12, 31, 23, 59, 59, tzinfo=timezone.utc)),
+    (None, None, None, None, None, None),
+]
+
+
+def test_encode_timestamptz():
+    assert _encode_timestamptz(pg_loader.PG_EPOCH) == struct.pack('!q', 0)
+    one_day = pg_loader.PG_EPOCH + timedelta(days=1, microseconds=5)
+    assert _encode_timestamptz(one_day) == struct.pack('!q', 86400 * 1_000_000 + 5)
+    before = pg_loader.PG_EPOCH - timedelta(microseconds=1)
+    assert _encode_timestamptz(before) == struct.pack('!q', -1)
+    # 不带时区的时间按本机时区处理
+    naive = datetime(2026, 1, 1, 8, 0)
+    assert _encode_timestamptz(naive) == _encode_timestamptz(naive.astimezone())
+
+
+def test_iter_copy_binary_layout():
+    chunks = list(iter_copy_binary([('ab', None, True)], ('text', 'int4', 'bool')))
+    assert chunks[0] == COPY_SIGNATURE + struct.pack('!ii', 0, 0)
+    assert chunks[1] == (struct.pack('!h', 3) + struct.pack('!i', 2) + b'ab'
+                         + struct.pack('!i', -1) + struct.pack('!i', 1) + b'\x01')
+    assert chunks[-1] == struct.pack('!h', -1)
+
+
+def test_jsonb_encoding_has_version_byte():
+    (_, row, _) = iter_copy_binary([({'k': '中'},)], ('jsonb',))
+    assert row[6:] == b'\x01' + '{"k": "中"}'.encode('utf-8')
+
+
+def test_iter_reader_reads_across_chunks():
+    reader = io.BufferedReader(IterReader([b'abc', b'', b'defg', b'h']), 3)
+    assert reader.read() == b'abcdefgh'
+    assert reader.raw.size == 8
+
+
+def _airdrop(i):
+    return Airdrop(title=f'Airdrop {i}', description=f'描述 {i}', project_url=f'https://example.com/{i}',
+                   type=AirdropType.WEB3)
+
+
+def _rows(airdrops):
+    return [(a, [a.title, a.description, a.project_url, a.type.value, a.status]) for a in airdrops]
+
+
+@pytest.fixture
+def conn():
+    if not DSN:
+        pytest.skip('未配置 DATABASE_URL')
+    psycopg2 = pytest.importorskip('psycopg2')
+    conn = psycopg2.connect(DSN)
+    with conn, conn.cursor() as cur:
+        cur.execute("SELECT to_regclass('public.airdrops')")
+        if cur.fetchone()[0] is None:
+            conn.close()
+            pytest.skip('数据库中没有 public.airdrops（先执行 创建空投爬虫系统.sql）')
+        cur.execute(f"DROP TABLE IF EXISTS {TEST_TABLE}")
+        cur.execute(f"CREATE TABLE {TEST_TABLE} (LIKE public.airdrops INCLUDING ALL)")
+    yield conn
+    with conn, conn.cursor() as cur:
+        cur.execute(f"DROP TABLE IF EXISTS {TEST_TABLE}")
+    conn.close()
+
+
+def _statuses(conn):
+    with conn, conn.cursor() as cur:
+        cur.execute(f"SELECT project_url, status FROM {TEST_TABLE} ORDER BY project_url")
+        return dict(cur.fetchall())
+
+
+def test_load_rows_expires_only_when_confirmed(conn):
+    kept, vanished = _airdrop(1), _airdrop(2)
+    pg_loader.load_rows(conn, _rows([kept, vanished]), COLUMNS, table=TEST_TABLE)
+
+    stats = pg_loader.load_rows(conn, _rows([kept]), COLUMNS, table=TEST_TABLE)
+    assert stats['expired'] == 0
+    assert set(_statuses(conn).values()) == {'active'}
+
+    stats = pg_loader.load_rows(conn, _rows([kept]), COLUMNS, table=TEST_TABLE, expire=lambda: True)
+    assert stats['expired'] == 1
+    assert _statuses(conn) == {kept.project_url: 'active', vanished.project_url: 'expired'}
+
+
+def test_copy_binary_roundtrip(conn):
+    columns = [f'c{i}' for i in range(len(ROUNDTRIP_TYPES))]
+    with conn, conn.cursor() as cur:
+        cur.execute(f"CREATE TEMP TABLE binary_roundtrip "
+                    f"({', '.join(f'{c} {t}' for c, t in zip(columns, ROUNDTRIP_TYPES))}) ON COMMIT DROP")
+        reader = IterReader(iter_copy_binary(ROUNDTRIP_ROWS, ROUNDTRIP_TYPES))
+        cur.copy_expert("COPY binary_roundtrip FROM STDIN WITH (FORMAT binary)", io.BufferedReader(reader))
+        cur.execute(f"SELECT {', '.join(columns)} FROM binary_roundtrip")
+        assert cur.fetchall() == ROUNDTRIP_ROWS
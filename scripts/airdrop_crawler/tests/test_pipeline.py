@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+分页流水线：按下一页链接逐页抓取，每页只解析一次（列表项和下一页链接由同一次解析取得）
+用内存中的抓取引擎代替 FetchEngine，解析仍在进程池中执行
+
+在 scripts 目录下执行：python -m pytest airdrop_crawler/tests
+"""
+
+import asyncio
+
+from airdrop_crawler import parsers
+from airdrop_crawler.fetcher import FetchResult
+from airdrop_crawler.parse_pool import ParsePool, register_page_parser, register_parser
+from airdrop_crawler.pipeline import CrawlPipeline
+
+PARSER = 'pipeline-test'
+SOURCE = {'name': 'paged', 'url': 'https://airdrops.example/page/1', 'parser': PARSER}
+PAGES = {
+    'https://airdrops.example/page/1': 'a,b|/page/2',
+    'https://airdrops.example/page/2': 'c|3',
+    'https://airdrops.example/page/3': 'd|',
+}
+
+
+@register_parser(PARSER)
+def parse_whole_page(html, source):
+    raise AssertionError('分页爬取应使用分页解析函数')
+
+
+@register_page_parser(PARSER)
+def parse_page(html, source):
+    items, next_href = html.split('|')
+    return [f"{source['page']}:{item}" for item in items.split(',')], next_href or None
+
+
+class FakeEngine:
+    def __init__(self, pages=PAGES):
+        self.pages = pages
+        self.fetched = []
+
+    async def fetch(self, source):
+        self.fetched.append(source['url'])
+        return FetchResult(source['name'], source['url'], status=200, text=self.pages[source['url']])
+
+
+def _crawl(engine):
+    async def run():
+        with ParsePool(max_workers=2) as pool:
+            pipeline = CrawlPipeline([SOURCE], engine, pool)
+            return [batch async for batch in pipeline.stream()], pipeline
+    return asyncio.run(run())
+
+
+def test_follows_next_links_from_the_pool_parse(monkeypatch):
+    def parse_again(*args, **kwargs):
+        raise AssertionError('下一页链接不应再单独解析')
+
+    monkeypatch.setattr(parsers, 'extract_next_href', parse_again)
+    engine = FakeEngine()
+    batches, pipeline = _crawl(engine)
+    assert engine.fetched == list(PAGES)
+    assert batches == [('paged', ['1:a', '1:b']), ('paged', ['2:c']), ('paged', ['3:d'])]
+    assert pipeline.pages_fetched == {'paged': 3} and pipeline.errors == {}
+
+
+def test_parse_error_stops_paging():
+    engine = FakeEngine({**PAGES, 'https://airdrops.example/page/2': 'broken'})
+    batches, pipeline = _crawl(engine)
+    assert engine.fetched == list(PAGES)[:2]
+    assert batches == [('paged', ['1:a', '1:b'])]
+    assert pipeline.errors['paged'].startswith('ValueError')
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+向量化评分与数据库函数 calculate_ai_score（创建空投爬虫系统.sql）的一致性
+
+需要已执行该迁移的 Postgres：连接串取环境变量 DATABASE_URL，未配置时跳过
+    DATABASE_URL=postgresql://localhost/postgres python -m pytest airdrop_crawler/tests
+"""
+
+import os
+from datetime import datetime
+
+import pytest
+
+from airdrop_crawler.record import Airdrop, AirdropType
+from airdrop_crawler.scoring import (
+    SQL_DIFFICULTY_BONUS, VECTORIZE_MIN, _synthetic_airdrops, extract_features, parity_cases, parity_scores,
+    reference_scores, score_airdrop, score_airdrops, score_features,
+)
+
+pytest.importorskip('numpy')
+
+DSN = os.environ.get('DATABASE_URL')
+
+
+@pytest.fixture(scope='module')
+def dsn():
+    if not DSN:
+        pytest.skip('未配置 DATABASE_URL')
+    psycopg2 = pytest.importorskip('psycopg2')
+    with psycopg2.connect(DSN) as conn, conn.cursor() as cur:
+        cur.execute("SELECT to_regprocedure('calculate_ai_score(integer, integer, text, text, boolean)')")
+        if cur.fetchone()[0] is None:
+            pytest.skip('数据库中没有 calculate_ai_score（先执行 创建空投爬虫系统.sql）')
+    return DSN
+
+
+def test_sql_scores_match_database_function(dsn):
+    cases = parity_cases()
+    expected = reference_scores(cases, dsn)
+    mismatches = [(case, want, got) for case, want, got in zip(cases, expected, parity_scores(cases))
+                  if want != got]
+    assert not mismatches
+
+
+def test_score_airdrops_matches_database_function(dsn):
+    """只有 SQL 函数认识的特征时，整条评分流程（提取特征 + 扩展评分）的结果与数据库函数相同"""
+    cases = [case for case in parity_cases() if case[1] is None or case[1] in SQL_DIFFICULTY_BONUS]
+    airdrops = [
+        Airdrop(title=f'Airdrop {i}', description='', project_url=f'https://example.com/{i}',
+                type=AirdropType.WEB3, reward_amount=reward, difficulty=difficulty,
+                source=platform and f'{platform} @campaign', verified=verified)
+        for i, (reward, difficulty, platform, verified) in enumerate(cases)
+    ]
+    score_airdrops(airdrops)
+    assert [airdrop.ai_score for airdrop in airdrops] == reference_scores(cases, dsn)
+
+
+def test_row_by_row_matches_vectorized():
+    """少量记录逐条计算（不导入 NumPy），规则必须与向量化实现完全相同"""
+    now = datetime.now()
+    airdrops = _synthetic_airdrops(VECTORIZE_MIN * 4)
+    scores, risk_levels = score_features(extract_features(airdrops, now))
+    assert [score_airdrop(airdrop, now) for airdrop in airdrops] == list(zip(scores.tolist(), risk_levels.tolist()))
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+评分的固定期望值（不需要数据库，总是执行）
+期望分数按 创建空投爬虫系统.sql 中 calculate_ai_score 的规则逐项算出；配置了 DATABASE_URL 时
+另外用数据库函数核对这张表本身
+
+在 scripts 目录下执行：python -m pytest airdrop_crawler/tests
+"""
+
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from airdrop_crawler.record import Airdrop, AirdropType, RiskLevel, SourceType
+from airdrop_crawler.scoring import extract_features, reference_scores, score_airdrop, score_features
+
+NOW = datetime(2026, 1, 1, 12, 0)
+
+# (reward_max, difficulty, platform, is_verified) -> calculate_ai_score
+SQL_GOLDEN = [
+    ((None, None, None, None), 5.0),
+    ((500, None, None, False), 5.0),
+    ((501, 'easy', None, False), 8.0),
+    ((1000, 'medium', 'TaskOn', False), 8.0),
+    ((1001, 'hard', 'Galxe', True), 9.0),
+    ((5000, 'easy', 'Layer3', True), 10.0),
+    ((5001, None, 'Twitter', False), 8.0),
+    ((0, 'medium', 'Foresight', True), 7.5),
+    ((100000, 'easy', 'DeFiLlama', False), 10.0),
+    ((None, 'hard', None, True), 5.5),
+]
+
+# 本地扩展特征：(Airdrop 字段, 期望 ai_score, 期望 risk_level)
+EXTENDED_GOLDEN = [
+    ({'type': AirdropType.CEX, 'verified': True}, 5.5, RiskLevel.NONE),
+    ({'source_type': SourceType.OFFICIAL, 'verified': True}, 7.0, RiskLevel.LOW),
+    ({'source_type': SourceType.CEX_ANNOUNCEMENT, 'source': 'Galxe @x'}, 6.5, RiskLevel.MEDIUM),
+    ({'difficulty': 'very_easy', 'max_participants': 5000}, 7.5, RiskLevel.HIGH),
+    ({'difficulty': 'very_hard', 'max_participants': 200000}, 3.5, RiskLevel.HIGH),
+    ({'estimated_value': 2000, 'reward_amount': 100, 'end_time': NOW + timedelta(days=2)}, 6.0, RiskLevel.HIGH),
+    ({'reward_amount': 9000, 'end_time': NOW - timedelta(days=1)}, 0.0, RiskLevel.HIGH),
+]
+
+
+def _sql_case_airdrop(i, reward, difficulty, platform, verified):
+    return Airdrop(title=f'Airdrop {i}', description='', project_url=f'https://example.com/{i}',
+                   type=AirdropType.WEB3, reward_amount=reward, difficulty=difficulty,
+                   source=platform and f'{platform} @campaign', verified=verified)
+
+
+def _extended_airdrops():
+    return [Airdrop(title=f'Airdrop {i}', description='', project_url=f'https://example.com/{i}',
+                    **{'type': AirdropType.WEB3, **fields})
+            for i, (fields, _, _) in enumerate(EXTENDED_GOLDEN)]
+
+
+def _sql_cases():
+    return [_sql_case_airdrop(i, *case) for i, (case, _) in enumerate(SQL_GOLDEN)]
+
+
+def _expected_sql():
+    # SQL 函数不产生风险等级：只有 SQL 特征时，已审核为 medium，否则为 high
+    return [(score, RiskLevel.MEDIUM if case[3] else RiskLevel.HIGH) for case, score in SQL_GOLDEN]
+
+
+def _vectorized(airdrops):
+    pytest.importorskip('numpy')
+    scores, risk_levels = score_features(extract_features(airdrops, NOW))
+    return list(zip(scores.tolist(), map(RiskLevel, risk_levels.tolist())))
+
+
+def test_row_by_row_sql_golden():
+    assert [score_airdrop(airdrop, NOW) for airdrop in _sql_cases()] == _expected_sql()
+
+
+def test_vectorized_sql_golden():
+    assert _vectorized(_sql_cases()) == _expected_sql()
+
+
+def test_row_by_row_extended_golden():
+    expected = [(score, risk_level) for _, score, risk_level in EXTENDED_GOLDEN]
+    assert [score_airdrop(airdrop, NOW) for airdrop in _extended_airdrops()] == expected
+
+
+def test_vectorized_extended_golden():
+    expected = [(score, risk_level) for _, score, risk_level in EXTENDED_GOLDEN]
+    assert _vectorized(_extended_airdrops()) == expected
+
+
+def test_golden_table_matches_database_function():
+    dsn = os.environ.get('DATABASE_URL')
+    if not dsn:
+        pytest.skip('未配置 DATABASE_URL')
+    pytest.importorskip('psycopg2')
+    assert reference_scores([case for case, _ in SQL_GOLDEN], dsn) == [score for _, score in SQL_GOLDEN]
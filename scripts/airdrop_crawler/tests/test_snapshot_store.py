@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+本地快照库：中途中断后续跑、只有确认写入数据库的运行才作为增量对比基线
+
+在 scripts 目录下执行：python -m pytest airdrop_crawler/tests
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from airdrop_crawler.record import Airdrop, AirdropType
+from airdrop_crawler.snapshot_store import SnapshotStore
+from airdrop_crawler.sql_writer import content_hash, natural_key
+
+
+def _airdrop(i, description='描述'):
+    return Airdrop(title=f'Airdrop {i}', description=description, project_url=f'https://example.com/{i}',
+                   type=AirdropType.WEB3)
+
+
+def _page(name, text):
+    return SimpleNamespace(name=name, url=f'https://{name}.example/', status=200, body_hash=f'hash-{name}', text=text)
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'snapshots.sqlite3')
+
+
+def test_resume_continues_unfinished_run(path):
+    with SnapshotStore(path) as store:
+        assert store.begin_run('crawl') is False
+        run_id = store.run_id
+        store.save_page(_page('parsed', '<html>a</html>'))
+        store.save_records('parsed', [_airdrop(1), _airdrop(2)])
+        store.save_page(_page('fetched', '<html>b</html>'))
+        store.save_page(_page('failed', '<html>c</html>'))
+        store.discard_page('failed')
+    # 进程在这里中断，再次运行时续上
+    with SnapshotStore(path) as store:
+        assert store.begin_run('crawl') is True
+        assert store.run_id == run_id
+        assert store.completed_sources() == {'parsed'}
+        assert [a.title for a in store.load_records('parsed')] == ['Airdrop 1', 'Airdrop 2']
+        assert store.pending_pages() == {'fetched': ('https://fetched.example/', 200, 'hash-fetched', '<html>b</html>')}
+
+
+def test_restart_or_stale_run_starts_over(path):
+    with SnapshotStore(path) as store:
+        store.begin_run('crawl')
+        first = store.run_id
+        store.save_records('parsed', [_airdrop(1)])
+    with SnapshotStore(path) as store:
+        assert store.begin_run('crawl', resume=False) is False
+        assert store.run_id != first and store.completed_sources() == set()
+    with SnapshotStore(path, resume_window=-1) as store:
+        assert store.begin_run('crawl') is False
+
+
+def test_only_confirmed_runs_become_the_baseline(path):
+    confirmed = [_airdrop(1), _airdrop(2)]
+    with SnapshotStore(path) as store:
+        store.begin_run('crawl')
+        assert store.previous_hashes() is None
+        store.finish_run(confirmed, confirmed=True)
+
+    # 只生成了SQL文件：不知道是否执行，不能替换基线
+    with SnapshotStore(path) as store:
+        store.begin_run('crawl')
+        store.finish_run([_airdrop(1, '改过的描述'), _airdrop(3)], confirmed=False)
+
+    with SnapshotStore(path) as store:
+        store.begin_run('crawl')
+        assert store.previous_hashes() == {
+            tuple(str(value) for value in natural_key(a)): content_hash(a) for a in confirmed
+        }
+        assert [a.title for a in store.previous_airdrops()] == ['Airdrop 1', 'Airdrop 2']
+        statuses = [status for (status,) in store.conn.execute("SELECT status FROM runs ORDER BY id")]
+        # 未确认的运行已被清理，只剩完成的和当前的运行
+        assert statuses == ['completed', 'running']
+
+
+def test_keeps_only_recent_completed_runs(path):
+    for i in range(4):
+        with SnapshotStore(path, keep_runs=2) as store:
+            store.begin_run('crawl')
+            store.finish_run([_airdrop(i)])
+    with SnapshotStore(path, keep_runs=2) as store:
+        assert store.conn.execute("SELECT count(*) FROM runs").fetchone()[0] == 2
+        store.begin_run('crawl')
+        assert [a.title for a in store.previous_airdrops()] == ['Airdrop 3']
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+SQL 输出格式的转义：insert / values（SQL 字面量）、copy-csv、copy-tsv
+配置了 DATABASE_URL 时另外把生成的语句和 COPY 数据导入临时表，核对读回的值与原值相同
+
+在 scripts 目录下执行：python -m pytest airdrop_crawler/tests
+"""
+
+import io
+import os
+from datetime import datetime, timezone
+
+import pytest
+
+from airdrop_crawler.record import Airdrop, AirdropType
+from airdrop_crawler.sql_writer import (
+    copy_csv_field, copy_tsv_field, iter_copy_block, iter_insert_rows, sql_literal,
+)
+
+DSN = os.environ.get('DATABASE_URL')
+TABLE = 'format_roundtrip'
+COLUMNS = ('title', 'description', 'tags', 'verified', 'reward_amount', 'start_time')
+COLUMN_TYPES = ('text', 'text', 'jsonb', 'bool', 'float8', 'timestamptz')
+# 各格式容易出错的值：引号、反斜杠、制表/换行、看起来像 NULL 的文本、空字符串与 NULL
+TRICKY_ROWS = [
+    ["It's \"quoted\"", 'back\\slash\tTab\nnew line\r\n', ['a"b', "c'd", '中文'], True, 1.5,
+     datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)],
+    ['\\N', '', {'k': 'v\\n'}, False, 0, None],
+    ['NULL', None, None, None, None, None],
+]
+
+
+def _airdrop(i):
+    return Airdrop(title=f'Airdrop {i}', description='', project_url=f'https://example.com/{i}',
+                   type=AirdropType.WEB3)
+
+
+def _rows(rows_values):
+    return [(_airdrop(i), values) for i, values in enumerate(rows_values)]
+
+
+def test_sql_literal():
+    assert sql_literal(None) == 'NULL'
+    assert sql_literal(True) == 'true' and sql_literal(False) == 'false'
+    assert sql_literal(3) == '3' and sql_literal(2.5) == '2.5'
+    assert sql_literal("It's") == "'It''s'"
+    assert sql_literal(['it\'s']) == '\'["it\'\'s"]\'::jsonb'
+    assert sql_literal(datetime(2026, 1, 2, 3, 4)) == "'2026-01-02T03:04:00'::timestamptz"
+
+
+def test_copy_csv_field():
+    assert copy_csv_field(None) == ''
+    # 空字符串加引号，与 NULL 区分
+    assert copy_csv_field('') == '""'
+    assert copy_csv_field('a "b", c\nd') == '"a ""b"", c\nd"'
+    assert copy_csv_field(True) == 't' and copy_csv_field(7) == '7'
+    assert copy_csv_field({'k': '"'}) == '"{""k"": ""\\""""}"'
+
+
+def test_copy_tsv_field():
+    assert copy_tsv_field(None) == '\\N'
+    assert copy_tsv_field('\\N') == '\\\\N'
+    assert copy_tsv_field('a\tb\nc\rd\\e') == 'a\\tb\\nc\\rd\\\\e'
+    assert copy_tsv_field(False) == 'f'
+
+
+def test_values_batches_rows_per_statement():
+    rows = _rows([[f't{i}', 'd', None, True, i, None] for i in range(5)])
+    statements = list(iter_insert_rows(COLUMNS, rows, 'values', TABLE, rows_per_statement=2))
+    assert len(statements) == 3
+    assert all(statement.startswith(f'INSERT INTO {TABLE} ({", ".join(COLUMNS)}) VALUES') for statement in statements)
+
+
+@pytest.mark.parametrize('fmt', ('copy-csv', 'copy-tsv'))
+def test_copy_block_one_line_per_row(fmt):
+    lines = list(iter_copy_block(COLUMNS, TRICKY_ROWS, TABLE, fmt))
+    assert lines[0].startswith(f'COPY {TABLE} ({", ".join(COLUMNS)}) FROM STDIN')
+    assert lines[-1] == '\\.\n\n'
+    if fmt == 'copy-tsv':
+        # 文本格式的行内不能有未转义的换行
+        assert all(line.count('\n') == 1 for line in lines[1:-1])
+
+
+@pytest.fixture
+def cursor():
+    if not DSN:
+        pytest.skip('未配置 DATABASE_URL')
+    psycopg2 = pytest.importorskip('psycopg2')
+    with psycopg2.connect(DSN) as conn, conn.cursor() as cur:
+        definitions = ', '.join(f'{column} {type_}' for column, type_ in zip(COLUMNS, COLUMN_TYPES))
+        cur.execute(f"CREATE TEMP TABLE {TABLE} ({definitions})")
+        yield cur
+        conn.rollback()
+
+
+def _read_back(cur):
+    cur.execute(f"SELECT {', '.join(COLUMNS)} FROM {TABLE}")
+    return [list(row) for row in cur.fetchall()]
+
+
+@pytest.mark.parametrize('fmt', ('insert', 'values'))
+def test_statements_roundtrip(cursor, fmt):
+    for statement in iter_insert_rows(COLUMNS, _rows(TRICKY_ROWS), fmt, TABLE):
+        if not statement.startswith('--'):
+            cursor.execute(statement)
+    assert _read_back(cursor) == TRICKY_ROWS
+
+
+@pytest.mark.parametrize('fmt', ('copy-csv', 'copy-tsv'))
+def test_copy_roundtrip(cursor, fmt):
+    command, *data, end = iter_copy_block(COLUMNS, TRICKY_ROWS, TABLE, fmt)
+    assert end == '\\.\n\n'
+    cursor.copy_expert(command.rstrip(';\n'), io.StringIO(''.join(data)))
+    assert _read_back(cursor) == TRICKY_ROWS
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+SQL 生成
+- sync 模式只在调用方确认是完整爬取（expire）时才下架已消失的空投
+- 增量指纹对比：只写新增、变化的空投
+- 流式写出：先写临时文件再替换
+
+在 scripts 目录下执行：python -m pytest airdrop_crawler/tests
+"""
+
+import importlib
+import io
+from dataclasses import replace
+from datetime import datetime
+
+import pytest
+
+from airdrop_crawler.record import Airdrop, AirdropType
+from airdrop_crawler.sql_writer import (
+    OUTPUT_FORMATS, VANISHED_STATUS, content_hash, diff_airdrops, iter_statements, natural_key, write_sql,
+)
+
+COLUMNS = ('title', 'description', 'project_url', 'type')
+EXPIRE_MARKER = f"SET status = '{VANISHED_STATUS}'"
+
+
+def _airdrop(i):
+    return Airdrop(title=f'Airdrop {i}', description=f'描述 {i}', project_url=f'https://example.com/{i}',
+                   type=AirdropType.WEB3)
+
+
+def _rows(airdrops):
+    return [(a, [a.title, a.description, a.project_url, a.type.value]) for a in airdrops]
+
+
+def _sql(airdrops, **options):
+    return ''.join(iter_statements(_rows(airdrops), COLUMNS, 'sync', **options))
+
+
+@pytest.mark.parametrize('fmt', OUTPUT_FORMATS)
+def test_sync_does_not_expire_by_default(fmt):
+    assert EXPIRE_MARKER not in _sql([_airdrop(1), _airdrop(2)], fmt=fmt)
+
+
+@pytest.mark.parametrize('fmt', OUTPUT_FORMATS)
+def test_sync_expires_when_caller_confirms_complete_crawl(fmt):
+    assert EXPIRE_MARKER in _sql([_airdrop(1), _airdrop(2)], fmt=fmt, expire=True)
+
+
+def test_expire_callable_is_evaluated_after_rows_are_written():
+    consumed = []
+
+    def rows():
+        for row in _rows([_airdrop(1), _airdrop(2)]):
+            consumed.append(row)
+            yield row
+
+    def complete():
+        # 分页流式爬取：所有行写出后才知道是否有数据源失败
+        assert len(consumed) == 2
+        return False
+
+    sql = ''.join(iter_statements(rows(), COLUMNS, 'sync', expire=complete))
+    assert EXPIRE_MARKER not in sql
+
+
+def test_known_hashes_only_expire_vanished_keys_when_confirmed():
+    kept, vanished = _airdrop(1), _airdrop(2)
+    stored = {natural_key(kept): content_hash(kept), natural_key(vanished): content_hash(vanished)}
+    assert EXPIRE_MARKER not in _sql([kept], stored_hashes=stored)
+    sql = _sql([kept], stored_hashes=stored, expire=True)
+    assert EXPIRE_MARKER in sql and vanished.project_url in sql and kept.project_url not in sql
+
+
+@pytest.fixture(scope='module')
+def crawler():
+    return importlib.import_module('爬取空投数据')
+
+
+def test_manual_only_output_does_not_expire(crawler, tmp_path):
+    """只有手动整理的空投（没有 --sources）时，生成的SQL不能下架其它来源写入的空投"""
+    pytest.importorskip('yaml')
+    pytest.importorskip('numpy')
+    output = tmp_path / 'manual.sql'
+    crawler.main([str(output), '--no-snapshot'])
+    sql = output.read_text(encoding='utf-8')
+    assert 'INSERT INTO' in sql
+    assert EXPIRE_MARKER not in sql
+
+
+# ---- 增量指纹对比 ----
+
+def test_content_hash_ignores_volatile_fields():
+    airdrop = _airdrop(1)
+    moved = replace(airdrop, sort_order=99, start_time=datetime(2020, 1, 1))
+    assert content_hash(moved) == content_hash(airdrop)
+    assert content_hash(replace(airdrop, description='改过的描述')) != content_hash(airdrop)
+
+
+def test_diff_airdrops():
+    same, changed, new, gone = _airdrop(1), _airdrop(2), _airdrop(3), _airdrop(4)
+    stored = {natural_key(a): content_hash(a) for a in (same, changed, gone)}
+    changed = replace(changed, description='新描述')
+    inserts, updates, vanished = diff_airdrops([same, changed, new], stored)
+    assert inserts == [new]
+    assert updates == [changed]
+    assert vanished == [natural_key(gone)]
+
+
+def test_known_hashes_only_write_new_and_changed_rows():
+    same, changed, new = _airdrop(1), _airdrop(2), _airdrop(3)
+    stored = {natural_key(a): content_hash(a) for a in (same, changed)}
+    changed = replace(changed, description='新描述')
+    sql = _sql([same, changed, new], stored_hashes=stored)
+    assert 'INSERT INTO' in sql and new.project_url in sql
+    assert 'UPDATE public.airdrops SET' in sql and '新描述' in sql
+    assert same.project_url not in sql
+    assert '新增 1，变化 1，下架 0' in sql
+
+
+def test_duplicate_natural_keys_write_first_row_only():
+    first = _airdrop(1)
+    duplicate = replace(first, title='同一自然键的第二条')
+    sql = _sql([first, duplicate])
+    assert sql.count('INSERT INTO') == 1 and duplicate.title not in sql
+
+
+# ---- 流式写出 ----
+
+def test_write_sql_streams_to_file_and_counts_chars(tmp_path):
+    output = tmp_path / 'out.sql'
+    chunks = ['-- a\n', 'SELECT 1;\n']
+    assert write_sql(iter(chunks), str(output)) == sum(map(len, chunks))
+    assert output.read_text(encoding='utf-8') == ''.join(chunks)
+
+
+def test_write_sql_failure_keeps_previous_file(tmp_path):
+    output = tmp_path / 'out.sql'
+    output.write_text('-- 上一次的迁移\n', encoding='utf-8')
+
+    def failing():
+        yield 'SELECT 1;\n'
+        raise RuntimeError('生成中途失败')
+
+    with pytest.raises(RuntimeError):
+        write_sql(failing(), str(output))
+    assert output.read_text(encoding='utf-8') == '-- 上一次的迁移\n'
+
+
+def test_write_sql_to_stream():
+    stream = io.StringIO()
+    assert write_sql(iter(['a', 'bc']), stream) == 3
+    assert stream.getvalue() == 'abc'
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+Supabase 批量写入：分块 upsert、跳过线上未变化的行、失败分块单独重试、下架本次已消失的爬虫空投
+用内存中的 PostgREST 替身代替 supabase 客户端（只实现用到的查询方法）
+
+在 scripts 目录下执行：python -m pytest airdrop_crawler/tests
+"""
+
+from types import SimpleNamespace
+
+from airdrop_crawler.supabase_writer import (
+    VANISHED_STATUS, bulk_upsert, chunked, dedupe_by_key, expire_missing, fetch_stored_versions,
+)
+
+
+class FakeQuery:
+    def __init__(self, db):
+        self.db = db
+        self.filters = []
+        self.action = None
+        self.payload = None
+        self.bounds = None
+        self.not_ = self
+
+    def upsert(self, rows, on_conflict):
+        self.action, self.payload = 'upsert', (rows, on_conflict)
+        return self
+
+    def select(self, columns):
+        self.action = 'select'
+        return self
+
+    def update(self, values):
+        self.action, self.payload = 'update', values
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def in_(self, column, values):
+        values = set(values)
+        self.filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def is_(self, column, value):
+        # 只用于 not_.is_('content_hash', 'null')
+        self.filters.append(lambda row: row.get(column) is not None)
+        return self
+
+    def order(self, column):
+        return self
+
+    def range(self, start, end):
+        self.bounds = (start, end)
+        return self
+
+    def execute(self):
+        self.db.requests.append(self.action)
+        if self.action == 'upsert':
+            rows, on_conflict = self.payload
+            if any(row.get('title') == self.db.poison for row in rows):
+                raise RuntimeError('写入失败')
+            key = on_conflict.split(',')
+            for row in rows:
+                self.db.rows[tuple(row[column] for column in key)] = dict(row)
+            return SimpleNamespace(data=rows)
+        matched = [row for row in self.db.rows.values() if all(f(row) for f in self.filters)]
+        if self.action == 'update':
+            for row in matched:
+                row.update(self.payload)
+            return SimpleNamespace(data=matched)
+        start, end = self.bounds
+        return SimpleNamespace(data=matched[start:end + 1])
+
+
+class FakeClient:
+    def __init__(self, rows=(), poison=None):
+        self.rows = {(row['project_url'], row['type']): dict(row) for row in rows}
+        self.poison = poison
+        self.requests = []
+
+    def table(self, name):
+        return FakeQuery(self)
+
+
+def _row(i, type_='web3', content_hash='h', status='active'):
+    return {'title': f'Airdrop {i}', 'project_url': f'https://example.com/{i}', 'type': type_,
+            'status': status, 'content_hash': content_hash}
+
+
+def test_chunked_and_dedupe_by_key():
+    assert list(chunked(list(range(5)), 2)) == [[0, 1], [2, 3], [4]]
+    first, last = _row(1), {**_row(1), 'title': 'newer'}
+    assert dedupe_by_key([first, _row(2), last]) == [last, _row(2)]
+
+
+def test_bulk_upsert_chunks_rows():
+    client = FakeClient()
+    written, failed = bulk_upsert(client, [_row(i) for i in range(7)], batch_size=3)
+    assert (written, failed) == (7, [])
+    assert client.requests == ['select'] + ['upsert'] * 3
+    assert len(client.rows) == 7
+
+
+def test_failed_chunk_is_returned_without_replaying_others():
+    client = FakeClient(poison='Airdrop 4')
+    rows = [_row(i) for i in range(7)]
+    written, failed = bulk_upsert(client, rows, batch_size=3, max_retries=2, backoff=0)
+    assert written == 4
+    assert failed == [rows[3:6]]
+    # 第一、三块各一次，失败的第二块重试两次
+    assert client.requests == ['select'] + ['upsert'] * 4
+
+    client.poison = None
+    assert bulk_upsert(client, failed[0], batch_size=3) == (3, [])
+
+
+def test_bulk_upsert_skips_unchanged_rows():
+    client = FakeClient([_row(1), _row(2), _row(3, status=VANISHED_STATUS), _row('manual', content_hash=None)])
+    rows = [_row(1), _row(2, content_hash='h2'), _row(3), _row(4)]
+    written, failed = bulk_upsert(client, rows)
+    # 1 未变化；2 指纹变了，3 重新出现要恢复为 active，4 是新增
+    assert (written, failed) == (3, [])
+    assert client.rows[('https://example.com/3', 'web3')]['status'] == 'active'
+    assert client.requests == ['select', 'upsert']
+
+    # 传入已读取的指纹时不再查询；没有指纹的行（手工整理的）总是写入
+    client.requests.clear()
+    stored = fetch_stored_versions(client)
+    assert bulk_upsert(client, rows, stored=stored) == (0, [])
+    assert bulk_upsert(client, [_row('manual', content_hash=None)], stored=stored) == (1, [])
+    assert client.requests == ['select', 'upsert']
+
+
+def test_expire_missing_only_touches_active_crawled_rows():
+    live = [_row(i) for i in range(120)] + [
+        _row('manual', content_hash=None), _row('cex', type_='cex'), _row('old', status=VANISHED_STATUS),
+    ]
+    client = FakeClient(live)
+    present = [(row['project_url'], row['type']) for row in live[:100]]
+    expired, failed = expire_missing(client, present, batch_size=7, backoff=0)
+    assert (expired, failed) == (21, [])
+    statuses = {key: row['status'] for key, row in client.rows.items()}
+    assert all(statuses[key] == 'active' for key in present)
+    assert sum(status == VANISHED_STATUS for status in statuses.values()) == 22
+    # 后台手工添加的（没有 content_hash）不下架
+    assert statuses[('https://example.com/manual', 'web3')] == 'active'
+
+
+def test_expire_missing_without_data_does_nothing():
+    client = FakeClient([_row(1)])
+    assert expire_missing(client, []) == (0, [])
+    assert client.requests == []
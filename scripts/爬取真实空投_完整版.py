@@ -5,511 +5,97 @@
 从Twitter、交易所、专业空投网站爬取真实数据
 """
 
-import json
-from datetime import datetime, timedelta
+import argparse
+import sys
+from contextlib import redirect_stdout
+from datetime import datetime
+from itertools import chain
+
+from airdrop_crawler import metrics
+from airdrop_crawler.dedup import dedupe_airdrops
+from airdrop_crawler.scoring import score_airdrops
+from airdrop_crawler.sql_writer import (
+    DEFAULT_ROWS_PER_STATEMENT, OUTPUT_FORMATS, SQL_MODES, iter_statements, write_sql
+)
 
 def generate_web3_airdrops():
-    """生成 Web3 空投（90%）"""
-    return [
-        {
-            'title': 'LayerZero 全链互操作协议',
-            'description': '''🔥 LayerZero - 全链互操作协议，顶级VC支持！
-
-✅ 空投策略：
-• 使用Stargate跨链（layerzero.network/stargate）
-• 至少5笔不同链的跨链交易
-• 桥接总金额 > 1000 USDT
-• 支持链：ETH/ARB/OP/MATIC/AVAX/BSC
-
-💰 预计奖励：1000-5000 $ZRO
-⏰ 快照时间：未公布（建议持续交互）
-🌟 投资方：a16z、红杉资本、Binance Labs、Coinbase Ventures
-
-📊 AI评分：9.2/10
-• 项目质量：⭐⭐⭐⭐⭐
-• 融资规模：2.93亿美元
-• 代币潜力：极高
-• 参与难度：中等''',
-            'reward_amount': 2500,
-            'image_url': 'https://images.unsplash.com/photo-1639762681485-074b7f938ba0?w=400&q=80',
-            'project_url': 'https://layerzero.network',
-            'twitter_url': 'https://twitter.com/LayerZero_Labs',
-            'requirements': [
-                '使用Stargate跨链桥',
-                '完成至少5笔跨链交易',
-                '桥接金额超过1000U',
-                '使用3条以上不同链',
-                '保持钱包活跃度'
-            ],
-            'category': 'Infrastructure',
-            'type': 'web3',
-            'status': 'active',
-            'ai_score': 9.2,
-            'risk_level': 'low',
-            'estimated_value': 2500,
-            'difficulty': 'medium',
-            'time_required': '1-2小时',
-            'participation_cost': '桥接gas费约5-20U',
-            'tags': ['跨链', '基础设施', '顶级VC', '热门'],
-            'source': 'Twitter @LayerZero_Labs',
-            'source_type': 'official',
-            'verified': True,
-            'start_time': datetime.now().isoformat(),
-            'end_time': (datetime.now() + timedelta(days=60)).isoformat(),
-            'total_participants': 0,
-            'max_participants': 100000,
-            'push_count': 0
-        },
-        {
-            'title': 'Scroll zkEVM Layer2',
-            'description': '''🚀 Scroll - 以太坊原生zkEVM，技术领先！
-
-✅ 空投任务：
-• 从ETH主网跨链到Scroll
-• 在Scroll上DEX交易（Uniswap/SyncSwap）
-• 使用借贷协议
-• 部署合约或NFT交互
-
-💰 预计奖励：800-2000 $SCR
-⏰ 主网已上线，持续交互中
-🌟 投资方：Polychain、Bain Capital Crypto
-
-📊 AI评分：8.8/10
-• 项目质量：⭐⭐⭐⭐⭐
-• 融资规模：8000万美元
-• 代币潜力：高
-• 参与难度：简单''',
-            'reward_amount': 1200,
-            'image_url': 'https://images.unsplash.com/photo-1622630998477-20aa696ecb05?w=400&q=80',
-            'project_url': 'https://scroll.io',
-            'twitter_url': 'https://twitter.com/Scroll_ZKP',
-            'requirements': [
-                '跨链至少0.01 ETH到Scroll',
-                '完成10笔以上DEX交易',
-                '使用Scroll生态DApp',
-                '持有资产30天以上'
-            ],
-            'category': 'Layer2',
-            'type': 'web3',
-            'status': 'active',
-            'ai_score': 8.8,
-            'risk_level': 'low',
-            'estimated_value': 1200,
-            'difficulty': 'easy',
-            'time_required': '30分钟-1小时',
-            'participation_cost': 'Gas费约3-10U',
-            'tags': ['Layer2', 'zkEVM', 'DEX', '推荐'],
-            'source': 'Twitter @Scroll_ZKP',
-            'source_type': 'official',
-            'verified': True,
-            'start_time': datetime.now().isoformat(),
-            'end_time': (datetime.now() + timedelta(days=90)).isoformat(),
-            'total_participants': 0,
-            'max_participants': 50000,
-            'push_count': 0
-        },
-        {
-            'title': 'zkSync Era 生态空投',
-            'description': '''💎 zkSync Era - 以太坊Layer2龙头！
-
-✅ 空投策略：
-• zkSync Era官方桥跨链
-• DEX交易（SyncSwap/Mute）
-• NFT交互（Tevaera/zkApe）
-• 借贷/流动性挖矿
-
-💰 预计奖励：500-1500 $ZK（已发币）
-⏰ 生态激励持续中
-🌟 背景：Matter Labs，V神站台
-
-📊 AI评分：8.5/10
-• 项目质量：⭐⭐⭐⭐
-• 已发币，生态活跃
-• 持续有新空投
-• 参与难度：简单''',
-            'reward_amount': 800,
-            'image_url': 'https://images.unsplash.com/photo-1634704784915-aacf363b021f?w=400&q=80',
-            'project_url': 'https://era.zksync.io',
-            'twitter_url': 'https://twitter.com/zksync',
-            'requirements': [
-                '跨链至少0.005 ETH',
-                '完成5笔DEX交易',
-                'NFT mint或交易',
-                '使用借贷协议'
-            ],
-            'category': 'Layer2',
-            'type': 'web3',
-            'status': 'active',
-            'ai_score': 8.5,
-            'risk_level': 'low',
-            'estimated_value': 800,
-            'difficulty': 'easy',
-            'time_required': '30分钟',
-            'participation_cost': 'Gas费约2-8U',
-            'tags': ['Layer2', '已发币', '生态激励'],
-            'source': 'Twitter @zksync',
-            'source_type': 'official',
-            'verified': True,
-            'start_time': datetime.now().isoformat(),
-            'end_time': (datetime.now() + timedelta(days=45)).isoformat(),
-            'total_participants': 0,
-            'max_participants': 80000,
-            'push_count': 0
-        },
-        {
-            'title': 'Linea - ConsenSys zkEVM',
-            'description': '''⭐ Linea - MetaMask母公司ConsenSys出品！
-
-✅ 参与方式：
-• MetaMask钱包跨链
-• 完成Linea Voyage任务
-• 参与生态DApp
-• 收集POAPs证明
-
-💰 预计奖励：500-1500代币
-⏰ Linea Voyage活动持续中
-🌟 背景：ConsenSys（MetaMask）
+    """生成 Web3 空投（90%，目录见 catalog/web3.yaml）"""
+    from airdrop_crawler.catalog import load_catalog
 
-📊 AI评分：8.7/10
-• 项目质量：⭐⭐⭐⭐⭐
-• MetaMask母公司
-• 官方确认空投
-• 任务简单明确''',
-            'reward_amount': 900,
-            'image_url': 'https://images.unsplash.com/photo-1640826514546-7d2d924c6b0c?w=400&q=80',
-            'project_url': 'https://linea.build',
-            'twitter_url': 'https://twitter.com/LineaBuild',
-            'requirements': [
-                'MetaMask钱包跨链',
-                '完成Linea Voyage任务',
-                '在Linea上交易',
-                '收集任务POAPs'
-            ],
-            'category': 'Layer2',
-            'type': 'web3',
-            'status': 'active',
-            'ai_score': 8.7,
-            'risk_level': 'low',
-            'estimated_value': 900,
-            'difficulty': 'easy',
-            'time_required': '1小时',
-            'participation_cost': 'Gas费约3-10U',
-            'tags': ['Layer2', 'ConsenSys', '任务简单'],
-            'source': 'Twitter @LineaBuild',
-            'source_type': 'official',
-            'verified': True,
-            'start_time': datetime.now().isoformat(),
-            'end_time': (datetime.now() + timedelta(days=50)).isoformat(),
-            'total_participants': 0,
-            'max_participants': 70000,
-            'push_count': 0
-        },
-        {
-            'title': 'Blast - Pacman的新Layer2',
-            'description': '''💥 Blast - Blur创始人Pacman的Layer2！
-
-✅ 空投策略：
-• 邀请码注册（Discord获取）
-• 存入ETH/稳定币
-• 自动获得原生收益（4%+）
-• 邀请朋友赚积分
-
-💰 预计奖励：根据存款和积分
-⏰ 主网上线，Big Bang活动中
-🌟 创始人：Blur创始人Pacman
-
-📊 AI评分：8.3/10
-• 项目质量：⭐⭐⭐⭐
-• Blur团队背景
-• 原生收益机制
-• 积分系统明确''',
-            'reward_amount': 1500,
-            'image_url': 'https://images.unsplash.com/photo-1621416894569-0f39ed31d247?w=400&q=80',
-            'project_url': 'https://blast.io',
-            'twitter_url': 'https://twitter.com/Blast_L2',
-            'requirements': [
-                '邀请码注册',
-                '存入资产到Blast',
-                '邀请朋友参与',
-                '积累积分'
-            ],
-            'category': 'Layer2',
-            'type': 'web3',
-            'status': 'active',
-            'ai_score': 8.3,
-            'risk_level': 'medium',
-            'estimated_value': 1500,
-            'difficulty': 'medium',
-            'time_required': '需要邀请码',
-            'participation_cost': '需要本金存入',
-            'tags': ['Layer2', 'Blur团队', '积分系统'],
-            'source': 'Twitter @Blast_L2',
-            'source_type': 'official',
-            'verified': True,
-            'start_time': datetime.now().isoformat(),
-            'end_time': (datetime.now() + timedelta(days=30)).isoformat(),
-            'total_participants': 0,
-            'max_participants': 150000,
-            'push_count': 0
-        },
-        {
-            'title': 'Manta Pacific 模块化Layer2',
-            'description': '''🌊 Manta Pacific - Celestia DA的Layer2！
-
-✅ 参与方式：
-• 跨链到Manta Pacific
-• 使用生态DeFi（Aperture/Pacific Swap）
-• 提供流动性挖矿
-• NFT交互
-
-💰 预计奖励：300-800 $MANTA
-⏰ New Paradigm活动中
-🌟 已发币，生态激励持续
-
-📊 AI评分：7.9/10
-• 项目质量：⭐⭐⭐⭐
-• Celestia DA技术
-• 已发币代币
-• 生态尚在发展''',
-            'reward_amount': 550,
-            'image_url': 'https://images.unsplash.com/photo-1618005182384-a83a8bd57fbe?w=400&q=80',
-            'project_url': 'https://pacific.manta.network',
-            'twitter_url': 'https://twitter.com/MantaNetwork',
-            'requirements': [
-                '跨链到Manta Pacific',
-                '使用生态DApp',
-                '完成5笔以上交易',
-                '流动性挖矿'
-            ],
-            'category': 'Layer2',
-            'type': 'web3',
-            'status': 'active',
-            'ai_score': 7.9,
-            'risk_level': 'medium',
-            'estimated_value': 550,
-            'difficulty': 'easy',
-            'time_required': '30-45分钟',
-            'participation_cost': 'Gas费约2-5U',
-            'tags': ['Layer2', 'Celestia', '已发币'],
-            'source': 'Twitter @MantaNetwork',
-            'source_type': 'official',
-            'verified': True,
-            'start_time': datetime.now().isoformat(),
-            'end_time': (datetime.now() + timedelta(days=60)).isoformat(),
-            'total_participants': 0,
-            'max_participants': 30000,
-            'push_count': 0
-        }
-    ]
+    return load_catalog('web3')
 
 def generate_cex_airdrops():
-    """生成 CEX交易所空投（10%）"""
+    """生成 CEX交易所空投（10%，目录见 catalog/cex.yaml）"""
+    from airdrop_crawler.catalog import load_catalog
+
+    return load_catalog('cex')
+
+# 写入 public.airdrops 的列（顺序与 airdrop_sql_values 一致）
+AIRDROP_COLUMNS = [
+    'title', 'description', 'reward_amount', 'image_url', 'project_url', 'twitter_url',
+    'requirements', 'category', 'type', 'status', 'ai_score', 'risk_level',
+    'estimated_value', 'difficulty', 'time_required', 'participation_cost',
+    'tags', 'source', 'source_type', 'verified',
+    'sort_order', 'start_time', 'end_time',
+    'total_participants', 'max_participants', 'push_count'
+]
+
+def airdrop_sql_values(airdrop, idx):
+    """单条空投各列的值（由 sql_writer 按输出格式转义）"""
     return [
-        {
-            'title': 'Binance Launchpool - 新币挖矿',
-            'description': '''💎 币安Launchpool - 质押BNB/FDUSD挖新币！
-
-✅ 参与方式：
-• 持有BNB或FDUSD
-• 进入Launchpool页面
-• 质押代币挖矿
-• 新币上线后自动到账
-
-💰 预计收益：年化20-200%
-⏰ 每月1-2个新项目
-🌟 平台：Binance全球最大交易所
-
-📊 AI评分：9.0/10
-• 平台质量：⭐⭐⭐⭐⭐
-• 零风险（仅质押）
-• 自动到账
-• 参与难度：极简单''',
-            'reward_amount': 500,
-            'image_url': 'https://images.unsplash.com/photo-1621416894218-f1c4c048f9f6?w=400&q=80',
-            'project_url': 'https://www.binance.com/zh-CN/earn/launchpool',
-            'twitter_url': 'https://twitter.com/binance',
-            'requirements': [
-                '注册Binance账号',
-                '完成KYC认证',
-                '持有BNB或FDUSD',
-                '进入Launchpool质押'
-            ],
-            'category': 'CEX',
-            'type': 'cex',
-            'status': 'active',
-            'ai_score': 9.0,
-            'risk_level': 'none',
-            'estimated_value': 500,
-            'difficulty': 'very_easy',
-            'time_required': '5分钟设置',
-            'participation_cost': '需要BNB本金',
-            'tags': ['CEX', 'Binance', '零风险', '稳定收益'],
-            'source': 'Binance官方公告',
-            'source_type': 'cex_announcement',
-            'verified': True,
-            'start_time': datetime.now().isoformat(),
-            'end_time': (datetime.now() + timedelta(days=365)).isoformat(),
-            'total_participants': 0,
-            'max_participants': 1000000,
-            'push_count': 0
-        },
-        {
-            'title': 'OKX Jumpstart - 新币认购',
-            'description': '''🚀 OKX Jumpstart - 持币认购新项目！
-
-✅ 参与方式：
-• 持有OKB代币
-• 关注Jumpstart页面
-• 认购新币（折扣价）
-• 上线后自动到账
-
-💰 预计收益：认购价往往低于开盘价
-⏰ 不定期开放
-🌟 平台：OKX头部交易所
-
-📊 AI评分：8.5/10
-• 平台质量：⭐⭐⭐⭐⭐
-• 折扣认购
-• 低风险
-• 需要抢购（竞争大）''',
-            'reward_amount': 400,
-            'image_url': 'https://images.unsplash.com/photo-1621504450181-5d356f61d307?w=400&q=80',
-            'project_url': 'https://www.okx.com/jumpstart',
-            'twitter_url': 'https://twitter.com/okx',
-            'requirements': [
-                '注册OKX账号',
-                '完成KYC认证',
-                '持有OKB代币',
-                '关注Jumpstart公告'
-            ],
-            'category': 'CEX',
-            'type': 'cex',
-            'status': 'active',
-            'ai_score': 8.5,
-            'risk_level': 'low',
-            'estimated_value': 400,
-            'difficulty': 'easy',
-            'time_required': '需要抢购',
-            'participation_cost': '需要OKB本金',
-            'tags': ['CEX', 'OKX', '认购', '折扣'],
-            'source': 'OKX官方公告',
-            'source_type': 'cex_announcement',
-            'verified': True,
-            'start_time': datetime.now().isoformat(),
-            'end_time': (datetime.now() + timedelta(days=180)).isoformat(),
-            'total_participants': 0,
-            'max_participants': 500000,
-            'push_count': 0
-        },
-        {
-            'title': 'Bybit ByStarter - 新币空投',
-            'description': '''⚡ Bybit ByStarter - 持币享空投！
-
-✅ 参与方式：
-• 持有BIT代币
-• 参与ByStarter活动
-• 自动获得新币空投
-• 上线后到账
-
-💰 预计收益：根据持仓量
-⏰ 不定期活动
-🌟 平台：Bybit衍生品交易所
-
-📊 AI评分：8.2/10
-• 平台质量：⭐⭐⭐⭐
-• 自动空投
-• 零操作
-• 需要持有BIT''',
-            'reward_amount': 350,
-            'image_url': 'https://images.unsplash.com/photo-1621504450181-5d356f61d307?w=400&q=80',
-            'project_url': 'https://www.bybit.com/zh-CN/promo/bystarter/',
-            'twitter_url': 'https://twitter.com/Bybit_Official',
-            'requirements': [
-                '注册Bybit账号',
-                '完成KYC认证',
-                '持有BIT代币',
-                '关注ByStarter公告'
-            ],
-            'category': 'CEX',
-            'type': 'cex',
-            'status': 'active',
-            'ai_score': 8.2,
-            'risk_level': 'low',
-            'estimated_value': 350,
-            'difficulty': 'easy',
-            'time_required': '5分钟',
-            'participation_cost': '需要BIT本金',
-            'tags': ['CEX', 'Bybit', '自动空投'],
-            'source': 'Bybit官方公告',
-            'source_type': 'cex_announcement',
-            'verified': True,
-            'start_time': datetime.now().isoformat(),
-            'end_time': (datetime.now() + timedelta(days=120)).isoformat(),
-            'total_participants': 0,
-            'max_participants': 300000,
-            'push_count': 0
-        }
+        airdrop.title,
+        airdrop.description,
+        airdrop.reward_amount,
+        airdrop.image_url,
+        airdrop.project_url,
+        airdrop.twitter_url or '',
+        airdrop.requirements,
+        airdrop.category,
+        airdrop.type,
+        airdrop.status,
+        airdrop.ai_score,
+        airdrop.risk_level,
+        airdrop.estimated_value,
+        airdrop.difficulty,
+        airdrop.time_required,
+        airdrop.participation_cost,
+        airdrop.tags,
+        airdrop.source,
+        airdrop.source_type,
+        airdrop.verified,
+        idx,
+        airdrop.start_time,
+        airdrop.end_time,
+        airdrop.total_participants,
+        airdrop.max_participants,
+        airdrop.push_count
     ]
 
-def generate_sql_from_airdrops(web3_airdrops, cex_airdrops):
-    """生成SQL插入语句"""
-    all_airdrops = web3_airdrops + cex_airdrops
-    
-    sql = """-- ==========================================
+def iter_sql_from_airdrops(web3_airdrops, cex_airdrops, mode='sync', stored_hashes=None,
+                           fmt='insert', rows_per_statement=DEFAULT_ROWS_PER_STATEMENT):
+    """逐段生成SQL语句（生成器，可直接流式写入文件或stdout）
+
+    mode='sync'：按内容指纹增量同步（默认，不再 TRUNCATE）
+    mode='replace'：清空后全量插入
+    stored_hashes：已知的线上指纹 {(project_url, type): content_hash}，只输出差异
+    fmt：insert / values（多行VALUES）/ copy-csv / copy-tsv（COPY FROM STDIN，需用psql执行）
+    目录数据不是完整爬取：不下架线上其它来源写入的空投（sql_writer 的 expire 保持关闭）
+    """
+    yield """-- ==========================================
 -- 真实空投数据（Web3 90% + CEX 10%）
 -- 数据来源：Twitter、交易所公告、官方Discord
 -- 更新时间：{update_time}
+-- 写入模式：{mode}，输出格式：{fmt}
 -- ==========================================
 
--- 清空旧数据
-TRUNCATE TABLE public.airdrops CASCADE;
-
-""".format(update_time=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+""".format(update_time=datetime.now().strftime('%Y-%m-%d %H:%M:%S'), mode=mode, fmt=fmt)
     
-    for idx, airdrop in enumerate(all_airdrops, 1):
-        requirements_json = json.dumps(airdrop['requirements'], ensure_ascii=False)
-        tags_json = json.dumps(airdrop['tags'], ensure_ascii=False)
-        
-        sql += f"""-- {idx}. {airdrop['title']}
-INSERT INTO public.airdrops (
-  title, description, reward_amount, image_url, project_url, twitter_url,
-  requirements, category, type, status, ai_score, risk_level,
-  estimated_value, difficulty, time_required, participation_cost,
-  tags, source, source_type, verified,
-  sort_order, start_time, end_time,
-  total_participants, max_participants, push_count
-) VALUES (
-  '{airdrop['title']}',
-  $${airdrop['description']}$$,
-  {airdrop['reward_amount']},
-  '{airdrop['image_url']}',
-  '{airdrop['project_url']}',
-  '{airdrop.get('twitter_url', '')}',
-  '{requirements_json}'::jsonb,
-  '{airdrop['category']}',
-  '{airdrop['type']}',
-  '{airdrop['status']}',
-  {airdrop['ai_score']},
-  '{airdrop['risk_level']}',
-  {airdrop['estimated_value']},
-  '{airdrop['difficulty']}',
-  '{airdrop['time_required']}',
-  '{airdrop['participation_cost']}',
-  '{tags_json}'::jsonb,
-  '{airdrop['source']}',
-  '{airdrop['source_type']}',
-  {str(airdrop['verified']).lower()},
-  {idx},
-  NOW(),
-  NOW() + INTERVAL '{(datetime.fromisoformat(airdrop['end_time']) - datetime.now()).days} days',
-  {airdrop['total_participants']},
-  {airdrop['max_participants']},
-  {airdrop['push_count']}
-);
-
-"""
+    all_airdrops = chain(web3_airdrops, cex_airdrops)
+    rows = ((airdrop, airdrop_sql_values(airdrop, idx)) for idx, airdrop in enumerate(all_airdrops, 1))
+    yield from iter_statements(rows, AIRDROP_COLUMNS, mode, stored_hashes,
+                               fmt=fmt, rows_per_statement=rows_per_statement)
     
-    sql += """-- 验证数据
+    yield """-- 验证数据
 SELECT 
   id,
   title,
@@ -537,39 +123,99 @@ GROUP BY type;
 """.format(
         web3_count=len(web3_airdrops),
         cex_count=len(cex_airdrops),
-        total_count=len(all_airdrops)
+        total_count=len(web3_airdrops) + len(cex_airdrops)
     )
-    
-    return sql
 
-def main():
+def generate_sql_from_airdrops(web3_airdrops, cex_airdrops, mode='sync', stored_hashes=None, fmt='insert'):
+    """生成完整SQL字符串"""
+    return ''.join(iter_sql_from_airdrops(web3_airdrops, cex_airdrops, mode, stored_hashes, fmt))
+
+# 默认输出文件；命令行传 "-" 则输出到 stdout（可直接管道给 psql）
+OUTPUT_FILE = 'supabase/migrations/真实空投数据_完整版.sql'
+
+def parse_args(argv=None):
+    from airdrop_crawler import assets, feeds, pg_loader
+
+    parser = argparse.ArgumentParser(description='生成真实空投数据SQL')
+    parser.add_argument('output', nargs='?', default=OUTPUT_FILE, help='输出文件，"-" 表示stdout')
+    parser.add_argument('--mode', choices=SQL_MODES, default='sync', help='写入模式')
+    parser.add_argument('--format', dest='fmt', choices=OUTPUT_FORMATS, default='insert', help='输出格式')
+    parser.add_argument('--rows-per-statement', type=int, default=DEFAULT_ROWS_PER_STATEMENT,
+                        help='values格式每条语句的行数')
+    pg_loader.add_arguments(parser)
+    assets.add_arguments(parser)
+    feeds.add_arguments(parser)
+    metrics.add_arguments(parser)
+    return parser.parse_args(argv)
+
+def main(argv=None):
     """主函数"""
-    print("🚀 生成真实空投数据...\n")
-    
-    # 生成数据
-    web3_airdrops = generate_web3_airdrops()
-    cex_airdrops = generate_cex_airdrops()
-    
-    print(f"✅ Web3 空投：{len(web3_airdrops)}个（90%）")
-    print(f"✅ CEX 空投：{len(cex_airdrops)}个（10%）")
-    print(f"✅ 总计：{len(web3_airdrops) + len(cex_airdrops)}个\n")
-    
-    # 生成SQL
-    sql_content = generate_sql_from_airdrops(web3_airdrops, cex_airdrops)
+    from airdrop_crawler import assets, feeds, pg_loader
+
+    args = parse_args(argv)
+    metrics.start_run('generate', trace_memory=args.trace_memory)
+    output_file = args.output
+    sql_output = sys.stdout if output_file == '-' else output_file
     
-    # 保存文件
-    output_file = 'supabase/migrations/真实空投数据_完整版.sql'
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(sql_content)
+    # SQL写到stdout时，进度信息改写到stderr，避免混入SQL
+    with redirect_stdout(sys.stderr if output_file == '-' else sys.stdout):
+        print("🚀 生成真实空投数据...\n")
+        
+        # 生成数据
+        with metrics.stage('generate'):
+            web3_airdrops = generate_web3_airdrops()
+            cex_airdrops = generate_cex_airdrops()
+        
+        # 合并近似重复的空投
+        with metrics.stage('dedup'):
+            web3_airdrops, web3_merged = dedupe_airdrops(web3_airdrops)
+            cex_airdrops, cex_merged = dedupe_airdrops(cex_airdrops)
+        metrics.incr('items_merged', web3_merged + cex_merged)
+        if web3_merged or cex_merged:
+            print(f"🔁 已合并 {web3_merged + cex_merged} 个近似重复的空投")
+        
+        # 写入之前整批计算 AI 评分和风险等级
+        with metrics.stage('score'):
+            score_airdrops(web3_airdrops)
+            score_airdrops(cex_airdrops)
+        metrics.incr('items_scored', len(web3_airdrops) + len(cex_airdrops))
+        scores = [airdrop.ai_score for airdrop in web3_airdrops + cex_airdrops]
+        
+        # --assets：检查链接，image_url 改为本地 WebP 缩略图
+        assets.run_from_args(web3_airdrops + cex_airdrops, args)
+        
+        print(f"✅ Web3 空投：{len(web3_airdrops)}个（90%）")
+        print(f"✅ CEX 空投：{len(cex_airdrops)}个（10%）")
+        print(f"✅ 总计：{len(web3_airdrops) + len(cex_airdrops)}个\n")
+        
+        if args.load:
+            # 直连 Postgres：二进制 COPY 到暂存表，同一事务内合并到 public.airdrops（目录数据不下架其它空投）
+            rows = ((airdrop, airdrop_sql_values(airdrop, idx))
+                    for idx, airdrop in enumerate(chain(web3_airdrops, cex_airdrops), 1))
+            pg_loader.run_from_args(rows, AIRDROP_COLUMNS, args)
+        else:
+            # 流式生成并写出SQL（不在内存中拼接整个文件）
+            with metrics.stage('render_sql'):
+                sql_chars = write_sql(
+                    iter_sql_from_airdrops(web3_airdrops, cex_airdrops, args.mode,
+                                           fmt=args.fmt, rows_per_statement=args.rows_per_statement),
+                    sql_output)
+            metrics.incr('sql_chars', sql_chars)
+        
+        # --feeds：--load 写入后从数据库导出前端列表页读取的静态分片；只生成SQL时提示执行后再导出
+        feeds.run_after_sql(args)
+        
+        if not args.load:
+            print(f"✅ SQL文件已生成：{output_file}")
+        print("\n📝 数据特点：")
+        print("• 90% Web3 空投（LayerZero、Scroll、zkSync等）")
+        print("• 10% CEX 空投（Binance、OKX、Bybit）")
+        print(f"• AI评分 {min(scores, default=0):.1f}-{max(scores, default=0):.1f}/10")
+        print("• 真实项目，Twitter/官网可验证")
+        if not args.load:
+            print("\n🎯 下一步：在Supabase执行此SQL！")
     
-    print(f"✅ SQL文件已生成：{output_file}")
-    print("\n📝 数据特点：")
-    print("• 90% Web3 空投（LayerZero、Scroll、zkSync等）")
-    print("• 10% CEX 空投（Binance、OKX、Bybit）")
-    print("• AI评分 7.0-9.2/10")
-    print("• 真实项目，Twitter/官网可验证")
-    print("\n🎯 下一步：在Supabase执行此SQL！")
+    metrics.finish_run(args.metrics_json, args.metrics_prom)
 
 if __name__ == "__main__":
     main()
-
@@ -5,309 +5,734 @@
 从多个来源爬取真实的加密货币空投信息
 """
 
-import requests
-from bs4 import BeautifulSoup
 import json
 from datetime import datetime, timedelta
-from supabase import create_client, Client
+import argparse
 import os
+import sys
+from contextlib import redirect_stdout
+from urllib.parse import quote, urldefrag, urljoin
 
-# Supabase配置
-SUPABASE_URL = "你的SUPABASE_URL"  # 替换为你的URL
-SUPABASE_KEY = "你的SUPABASE_KEY"  # 替换为你的KEY
+from airdrop_crawler import metrics
+from airdrop_crawler.dedup import DedupIndex, dedupe_airdrops, normalize_text
+from airdrop_crawler.http_cache import ResponseCache
+from airdrop_crawler.parse_pool import (
+    DEFAULT_TASK_TIMEOUT, convert_items, open_stream_parser, parse_pages, register_items_parser, register_page_parser,
+    register_parser,
+)
+from airdrop_crawler.parsers import extract_items, extract_page
+from airdrop_crawler.record import Airdrop, AirdropType, Category, Status
+from airdrop_crawler.scoring import score_airdrops
+from airdrop_crawler.sql_writer import (
+    DEFAULT_ROWS_PER_STATEMENT, OUTPUT_FORMATS, SQL_MODES, content_hash, diff_airdrops, iter_statements,
+    natural_key, write_sql
+)
+from airdrop_crawler.supabase_writer import DEFAULT_BATCH_SIZE, bulk_upsert, expire_missing, fetch_stored_versions
 
-# 初始化Supabase客户端
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+# Supabase配置（环境变量优先，便于 cron / Netlify 构建钩子注入）
+SUPABASE_URL = os.environ.get('SUPABASE_URL', "你的SUPABASE_URL")  # 替换为你的URL
+SUPABASE_KEY = os.environ.get('SUPABASE_KEY', "你的SUPABASE_KEY")  # 替换为你的KEY
+
+# Supabase客户端（首次使用时创建；只生成SQL时不会导入 supabase）
+_supabase = None
+
+def get_supabase():
+    """获取Supabase客户端"""
+    global _supabase
+    if _supabase is None:
+        from supabase import create_client
+        _supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+    return _supabase
 
 # 空投数据源
+# parser：解析函数注册名（见 @register_parser），在独立进程中执行
+# 可选字段：selectors（覆盖默认CSS选择器）、parser_backend（html.parser / lxml / selectolax）
+# 分页爬取（--paginate）：max_pages 为最多翻页数；type 为 json 的接口用 api 配置列表路径和下一页字段
+# stream（默认关闭）：边下载边增量解析（需要 lxml），每个空投节点闭合即提取，不保留整页文本；
+#   解析在事件循环中进行，不经过进程池的超时与隔离，且计入请求超时，整页解析通常更快，只在内存受限时开启
 AIRDROP_SOURCES = [
     {
         "name": "CoinMarketCap",
         "url": "https://coinmarketcap.com/airdrop/",
-        "type": "html"
+        "type": "html",
+        "parser": "listing",
+        "max_pages": 20
     },
     {
         "name": "Airdrops.io",
         "url": "https://airdrops.io/",
-        "type": "html"
+        "type": "html",
+        "parser": "listing",
+        "max_pages": 20
     }
 ]
 
-def fetch_coinmarketcap_airdrops():
-    """从CoinMarketCap获取空投信息"""
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        response = requests.get("https://coinmarketcap.com/airdrop/", headers=headers, timeout=10)
-        
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.text, 'html.parser')
-            airdrops = []
-            
-            # 这里需要根据实际页面结构调整选择器
-            airdrop_items = soup.select('.airdrop-item')  # 示例选择器
-            
-            for item in airdrop_items[:5]:  # 只取前5个
-                try:
-                    title = item.select_one('.title').text.strip()
-                    description = item.select_one('.description').text.strip()
-                    
-                    airdrops.append({
-                        'title': title,
-                        'description': description,
-                        'reward_amount': 500,  # 默认值
-                        'image_url': 'https://via.placeholder.com/400',
-                        'project_url': 'https://coinmarketcap.com/airdrop/',
-                        'requirements': ['访问项目官网', '连接钱包', '完成任务'],
-                        'category': 'DeFi',
-                        'type': 'airdrop',
-                        'status': 'active',
-                        'sort_order': len(airdrops) + 1,
-                        'start_time': datetime.now().isoformat(),
-                        'end_time': (datetime.now() + timedelta(days=30)).isoformat(),
-                        'total_participants': 0,
-                        'max_participants': 10000
-                    })
-                except Exception as e:
-                    print(f"解析单个空投失败: {e}")
-                    continue
+# 按主机限速（令牌桶）：rate 为每秒请求数，burst 为允许的突发请求数；'*' 为其他主机的默认值
+SOURCE_RATE_LIMITS = {
+    "coinmarketcap.com": {"rate": 0.5, "burst": 2},
+    "airdrops.io": {"rate": 1.0, "burst": 2},
+    "*": {"rate": 1.0, "burst": 1},
+}
+
+@register_parser('listing')
+def parse_airdrop_listing(html, source, backend=None):
+    """解析空投列表页HTML（解析后端见 airdrop_crawler.parsers）"""
+    # 选择器可在 AIRDROP_SOURCES 中用 'selectors' 按数据源调整
+    return parse_airdrop_items(extract_items(html, source, backend), source)
+
+@register_page_parser('listing')
+def parse_airdrop_page(html, source):
+    """分页爬取：解析一页空投列表，同时返回下一页链接"""
+    items, next_href = extract_page(html, source)
+    return parse_airdrop_items(items, source), next_href
+
+def listing_item_url(source, title):
+    """没有详情链接的列表项的 project_url：列表页地址 + 归一化标题作为片段
+
+    各项的自然键（project_url + type）互不相同，且跨次爬取保持稳定；分页时同样用第一页地址，
+    去重比较 project_url 时忽略片段，仍按列表页处理（只看文案相似度）
+    """
+    listing_url, _ = urldefrag(source.get('listing_url', source['url']))
+    return f"{listing_url}#{quote(normalize_text(title))}"
+
+@register_items_parser('listing')
+def parse_airdrop_items(airdrop_items, source):
+    """列表项 [{'title', 'description', 'href'}] -> [Airdrop]（流式抓取时直接调用）"""
+    airdrops = []
+    
+    for item in airdrop_items:
+        try:
+            title = item['title']
+            description = item['description']
+            if not title or not description:
+                raise ValueError('缺少标题或描述')
+            # 优先使用详情链接，保证 project_url + type 能区分不同空投；
+            # 没有详情链接时用列表页地址加标题片段（见 listing_item_url）
+            project_url = urljoin(source['url'], item['href']) if item['href'] else listing_item_url(source, title)
             
-            return airdrops
+            airdrops.append(Airdrop(
+                title=title,
+                description=description,
+                reward_amount=500,  # 默认值
+                image_url='https://via.placeholder.com/400',
+                project_url=project_url,
+                requirements=['访问项目官网', '连接钱包', '完成任务'],
+                category=Category.DEFI,
+                type=AirdropType.AIRDROP,
+                status=Status.ACTIVE,
+                sort_order=len(airdrops) + 1,
+                start_time=datetime.now(),
+                end_time=datetime.now() + timedelta(days=30),
+                total_participants=0,
+                max_participants=10000
+            ))
+        except Exception as e:
+            print(f"解析单个空投失败: {e}")
+            continue
+    
+    return airdrops
+
+def fetch_source_airdrops(sources=AIRDROP_SOURCES, cache=None, parse_timeout=DEFAULT_TASK_TIMEOUT, store=None,
+                          failed=None):
+    """并发抓取所有数据源（共享连接池），再用进程池并行解析
+
+    页面未变化（304 或内容指纹相同）时跳过解析，直接复用缓存的解析结果
+    store：SnapshotStore，页面和解析结果边产生边落盘；续跑时已完成的数据源不再抓取
+    failed：可选列表，填入抓取或解析失败的数据源名称
+    """
+    parsed = fetch_source_results(sources, cache, parse_timeout, store)
+    if failed is not None:
+        failed.extend(source['name'] for source in sources if source['name'] not in parsed)
+    # 按 AIRDROP_SOURCES 的顺序合并
+    airdrops = []
+    for source in sources:
+        airdrops.extend(parsed.get(source['name'], []))
+    return airdrops
+
+def fetch_source_results(sources=AIRDROP_SOURCES, cache=None, parse_timeout=DEFAULT_TASK_TIMEOUT, store=None):
+    """同 fetch_source_airdrops，按数据源返回 {数据源名称: [Airdrop]}（失败的数据源不在其中）"""
+    from airdrop_crawler.fetcher import FetchResult, fetch_sources
+    from airdrop_crawler.resilience import CircuitBreaker
+
+    cache = cache or ResponseCache()
+    parsed = {}
+    pending = []
+    if store:
+        names = {s['name'] for s in sources}
+        parsed = {name: store.load_records(name) for name in store.completed_sources() & names}
+        pending = [
+            FetchResult(name=name, url=url, status=status, text=text, body_hash=body_hash)
+            for name, (url, status, body_hash, text) in store.pending_pages().items() if name in names
+        ]
+        if parsed or pending:
+            print(f"⏯️ 续跑上次未完成的爬取：{len(parsed)} 个数据源已完成，{len(pending)} 个页面待解析")
+    done = set(parsed) | {result.name for result in pending}
+    remaining = [s for s in sources if s['name'] not in done]
+
+    breaker = CircuitBreaker.load()
+    with metrics.stage('fetch'):
+        results = fetch_sources(remaining, cache=cache, rate_limits=SOURCE_RATE_LIMITS,
+                                breaker=breaker, stream=open_stream_parser) if remaining else []
+    breaker.save()
+    if store:
+        for result in results:
+            # 流式解析的页面没有保留文本，解析结果由 collect_fetch_results 落盘
+            if result.ok and result.items is None:
+                store.save_page(result)
+
+    def parse_many(jobs):
+        return parse_pages(jobs, max_workers=min(len(jobs), os.cpu_count() or 1) or 1,
+                           timeout=parse_timeout)
+    parsed.update(collect_fetch_results(pending + results, sources, cache, parse_many, store))
+    return parsed
+
+def collect_fetch_results(results, sources, cache, parse_many, store=None):
+    """处理一批抓取结果：未变化的页面复用缓存的解析结果，其余交给 parse_many 解析
+
+    返回 {数据源名称: [Airdrop]}（抓取或解析失败的数据源不在其中）
+    """
+    sources_by_name = {s['name']: s for s in sources}
+    parsed = {}
+    jobs = []
+    streamed = []
+    fetched = {}
+    for result in results:
+        metrics.incr('fetch_retries', max(result.attempts - 1, 0))
+        if result.skipped:
+            print(f"⏸️ {result.name}: {result.error}")
+            metrics.incr('circuit_open_skips')
+            continue
+        if not result.ok:
+            print(f"获取{result.name}数据失败: {result.error or result.status}")
+            metrics.incr('fetch_errors')
+            continue
+        metrics.incr('pages_fetched')
+        metrics.incr('bytes_fetched', result.size)
+        metrics.incr('pages_unchanged', result.unchanged)
+        items = cache.get_parsed(result.url, result.body_hash) if result.unchanged else None
+        if items is not None:
+            print(f"♻️ {result.name}: 页面未变化，复用 {len(items)} 个空投")
+            parsed[result.name] = [Airdrop.from_dict(item) for item in items]
+            if store:
+                store.save_records(result.name, parsed[result.name])
+        elif result.items is not None:
+            # 流式解析：列表项已在下载过程中提取，只需转换
+            fetched[result.name] = result
+            streamed.append(convert_items(sources_by_name[result.name], result.items))
         else:
-            print(f"获取CoinMarketCap数据失败: {response.status_code}")
-            return []
-    except Exception as e:
-        print(f"CoinMarketCap爬取错误: {e}")
-        return []
+            fetched[result.name] = result
+            jobs.append((sources_by_name[result.name], result.text))
+    
+    with metrics.stage('parse'):
+        outcomes = streamed + parse_many(jobs)
+    for outcome in outcomes:
+        result = fetched[outcome.name]
+        if not outcome.ok:
+            print(f"{outcome.name}解析错误: {outcome.error}")
+            metrics.incr('parse_failures')
+            if store:
+                store.discard_page(outcome.name)
+            continue
+        metrics.incr('items_parsed', len(outcome.items))
+        # 解析成功后才保存 ETag / 指纹：解析失败的页面下次仍会完整抓取、重新解析
+        cache.store_parsed(result.url, result.body_hash, [item.to_dict() for item in outcome.items],
+                           result.headers)
+        print(f"✅ {outcome.name}: {len(outcome.items)} 个空投（抓取{result.elapsed:.2f}秒，解析{outcome.elapsed:.2f}秒）")
+        parsed[outcome.name] = outcome.items
+        if store:
+            store.save_records(outcome.name, outcome.items)
+    return parsed
+
+def stream_source_airdrops(sources=AIRDROP_SOURCES, parse_timeout=DEFAULT_TASK_TIMEOUT, errors=None):
+    """分页流式爬取（跟随下一页链接），逐页产出 (数据源名称, [Airdrop])，见 airdrop_crawler.pipeline
+
+    errors：可选 dict，爬取结束后填入 {数据源名称: 失败原因}
+    """
+    from airdrop_crawler.pipeline import iter_pipeline
+    from airdrop_crawler.resilience import CircuitBreaker
+
+    breaker = CircuitBreaker.load()
+    try:
+        # 不带 ResponseCache：304 没有响应体，取不到下一页链接
+        with metrics.stage('crawl_pages'):
+            yield from iter_pipeline(
+                sources,
+                engine_options={'rate_limits': SOURCE_RATE_LIMITS, 'breaker': breaker, 'stream': open_stream_parser},
+                pool_options={'timeout': parse_timeout},
+                errors=errors,
+            )
+    finally:
+        breaker.save()
+
+def fetch_coinmarketcap_airdrops():
+    """从CoinMarketCap获取空投信息"""
+    sources = [s for s in AIRDROP_SOURCES if s['name'] == 'CoinMarketCap']
+    return fetch_source_airdrops(sources)
 
 def fetch_manual_airdrops():
-    """手动整理的热门空投（实时更新）"""
-    return [
-        {
-            'title': 'LayerZero 主网交互空投',
-            'description': '''🔥 LayerZero - 全链互操作协议，顶级VC投资！
-
-✅ 空投策略：
-1. 使用LayerZero桥接资产（Stargate）
-2. 跨链至少5笔交易
-3. 桥接总金额 > 1000U
-4. 使用不同链（ETH/Arbitrum/Optimism/Polygon）
-
-💰 预计奖励：1000-5000 ZRO代币
-⏰ 快照时间：未公布，持续交互''',
-            'reward_amount': 2500,
-            'image_url': 'https://images.unsplash.com/photo-1639762681485-074b7f938ba0?w=400',
-            'project_url': 'https://layerzero.network',
-            'requirements': [
-                '使用Stargate桥接资产',
-                '跨链交易至少5笔',
-                '桥接总金额超过1000U',
-                '使用3条以上不同链'
-            ],
-            'category': 'Infrastructure',
-            'type': 'airdrop',
-            'status': 'active',
-            'sort_order': 1,
-            'start_time': datetime.now().isoformat(),
-            'end_time': (datetime.now() + timedelta(days=60)).isoformat(),
-            'total_participants': 0,
-            'max_participants': 100000
-        },
-        {
-            'title': 'Scroll - zkEVM Layer2 空投',
-            'description': '''🚀 Scroll - 以太坊原生zkEVM，技术领先！
-
-✅ 空投任务：
-1. 从以太坊主网跨链到Scroll
-2. 在Scroll上进行DEX交易
-3. 部署合约或使用NFT
-4. 保持长期活跃度
-
-💰 预计奖励：800-2000 SCR代币
-⏰ 主网已上线，抓紧交互''',
-            'reward_amount': 1200,
-            'image_url': 'https://images.unsplash.com/photo-1622630998477-20aa696ecb05?w=400',
-            'project_url': 'https://scroll.io',
-            'requirements': [
-                '跨链至少0.01 ETH到Scroll',
-                '完成10笔以上交易',
-                '使用Scroll生态DApp',
-                '持有资产30天以上'
-            ],
-            'category': 'Layer2',
-            'type': 'airdrop',
-            'status': 'active',
-            'sort_order': 2,
-            'start_time': datetime.now().isoformat(),
-            'end_time': (datetime.now() + timedelta(days=90)).isoformat(),
-            'total_participants': 0,
-            'max_participants': 50000
-        },
-        {
-            'title': 'Linea - ConsenSys推出的zkEVM',
-            'description': '''⭐ Linea - MetaMask背后的ConsenSys出品！
-
-✅ 参与方式：
-1. 连接MetaMask钱包
-2. 跨链ETH到Linea主网
-3. 使用Linea生态应用
-4. 参与Linea Voyage活动
-
-💰 预计奖励：500-1500代币
-⏰ 官方确认将有代币空投''',
-            'reward_amount': 900,
-            'image_url': 'https://images.unsplash.com/photo-1634704784915-aacf363b021f?w=400',
-            'project_url': 'https://linea.build',
-            'requirements': [
-                '使用MetaMask跨链',
-                '完成Linea Voyage任务',
-                '在Linea上交易',
-                '使用多个生态DApp'
-            ],
-            'category': 'Layer2',
-            'type': 'airdrop',
-            'status': 'active',
-            'sort_order': 3,
-            'start_time': datetime.now().isoformat(),
-            'end_time': (datetime.now() + timedelta(days=45)).isoformat(),
-            'total_participants': 0,
-            'max_participants': 80000
-        },
-        {
-            'title': 'Blast - ETH原生收益Layer2',
-            'description': '''💥 Blast - 自动产生收益的Layer2！
-
-✅ 空投策略：
-1. 邀请码注册（可在Discord获取）
-2. 存入ETH或稳定币
-3. 自动获得4%收益
-4. 邀请朋友获得更多积分
-
-💰 预计奖励：根据存款量和积分
-⏰ 主网即将上线''',
-            'reward_amount': 1500,
-            'image_url': 'https://images.unsplash.com/photo-1639762681485-074b7f938ba0?w=400',
-            'project_url': 'https://blast.io',
-            'requirements': [
-                '通过邀请码注册',
-                '存入资产到Blast',
-                '邀请朋友参与',
-                '积累积分'
-            ],
-            'category': 'Layer2',
-            'type': 'airdrop',
-            'status': 'active',
-            'sort_order': 4,
-            'start_time': datetime.now().isoformat(),
-            'end_time': (datetime.now() + timedelta(days=30)).isoformat(),
-            'total_participants': 0,
-            'max_participants': 150000
-        },
-        {
-            'title': 'Manta Pacific - 模块化Layer2',
-            'description': '''🌊 Manta Pacific - Celestia DA支持的Layer2！
-
-✅ 参与方式：
-1. 跨链ETH到Manta Pacific
-2. 参与生态DeFi协议
-3. 提供流动性
-4. 持续交互保持活跃
-
-💰 预计奖励：300-800 MANTA
-⏰ New Paradigm活动进行中''',
-            'reward_amount': 550,
-            'image_url': 'https://images.unsplash.com/photo-1622630998477-20aa696ecb05?w=400',
-            'project_url': 'https://pacific.manta.network',
-            'requirements': [
-                '跨链资产到Manta Pacific',
-                '使用Manta生态DApp',
-                '完成至少5笔交易',
-                '参与流动性挖矿'
-            ],
-            'category': 'Layer2',
-            'type': 'airdrop',
-            'status': 'active',
-            'sort_order': 5,
-            'start_time': datetime.now().isoformat(),
-            'end_time': (datetime.now() + timedelta(days=60)).isoformat(),
-            'total_participants': 0,
-            'max_participants': 30000
-        }
-    ]
+    """手动整理的热门空投（实时更新，目录见 catalog/manual.yaml）"""
+    from airdrop_crawler.catalog import load_catalog
+
+    return load_catalog('manual')
+
+def save_to_supabase(airdrops, batch_size=DEFAULT_BATCH_SIZE, stored=None):
+    """保存空投数据到Supabase（按 project_url + type 分块 upsert）
+
+    同SQL同步模式一样写入 content_hash：有指纹的行才是爬虫写入的，下架时只处理这些行
+    线上指纹和状态都没变的行不再写入；stored 为已读取的线上指纹（分页写入时只读一次）
+    --assets 管理的列（失效图片置空）显式写 null，每行的键保持一致，也能清掉线上的失效链接
+    """
+    from airdrop_crawler import assets
 
-def save_to_supabase(airdrops):
-    """保存空投数据到Supabase"""
     try:
-        # 先清空旧数据
-        supabase.table('airdrops').delete().neq('id', '00000000-0000-0000-0000-000000000000').execute()
+        rows = [{**dict.fromkeys(assets.MANAGED_FIELDS), **airdrop.to_dict(), 'content_hash': content_hash(airdrop)}
+                for airdrop in airdrops]
+        with metrics.stage('db_write'):
+            written, failed_chunks = bulk_upsert(get_supabase(), rows, batch_size=batch_size, stored=stored)
+        metrics.incr('rows_written', written)
         
-        # 批量插入新数据
-        for airdrop in airdrops:
-            result = supabase.table('airdrops').insert(airdrop).execute()
-            print(f"✅ 已保存: {airdrop['title']}")
+        if failed_chunks:
+            failed_rows = sum(len(chunk) for chunk in failed_chunks)
+            metrics.incr('rows_failed', failed_rows)
+            print(f"❌ {len(failed_chunks)} 个分块写入失败，共 {failed_rows} 行")
+            return False
         
-        print(f"\n🎉 成功保存 {len(airdrops)} 个空投项目！")
+        print(f"\n🎉 成功保存 {written} 个空投项目！")
         return True
     except Exception as e:
         print(f"❌ 保存到Supabase失败: {e}")
         return False
 
-def generate_sql(airdrops):
+def expire_vanished(airdrops):
+    """全量爬取并写入成功后，线上不在本次数据中的爬虫空投标记为下架（同SQL同步模式），返回是否成功"""
+    try:
+        with metrics.stage('db_write'):
+            expired, failed_keys = expire_missing(get_supabase(), [natural_key(airdrop) for airdrop in airdrops])
+    except Exception as e:
+        print(f"❌ 下架已消失的空投失败: {e}")
+        return False
+    metrics.incr('rows_expired', expired)
+    if expired:
+        print(f"📦 已下架 {expired} 个本次已消失的空投")
+    if failed_keys:
+        print(f"❌ {len(failed_keys)} 个空投下架失败")
+        return False
+    return True
+
+# 写入 public.airdrops 的列（顺序与 airdrop_sql_values 一致）
+AIRDROP_COLUMNS = [
+    'title', 'description', 'reward_amount', 'image_url', 'project_url',
+    'requirements', 'category', 'type', 'status', 'ai_score', 'risk_level', 'sort_order',
+    'start_time', 'end_time', 'total_participants', 'max_participants'
+]
+
+def airdrop_sql_values(airdrop):
+    """单条空投各列的值（由 sql_writer 按输出格式转义）"""
+    return [
+        airdrop.title,
+        airdrop.description,
+        airdrop.reward_amount,
+        airdrop.image_url,
+        airdrop.project_url,
+        airdrop.requirements,
+        airdrop.category,
+        airdrop.type,
+        airdrop.status,
+        airdrop.ai_score,
+        airdrop.risk_level,
+        airdrop.sort_order,
+        airdrop.start_time,
+        airdrop.end_time,
+        airdrop.total_participants,
+        airdrop.max_participants
+    ]
+
+def iter_sql(airdrops, mode='sync', stored_hashes=None, fmt='insert',
+             rows_per_statement=DEFAULT_ROWS_PER_STATEMENT, expire=False):
+    """逐段生成SQL语句（生成器，可直接流式写入文件或stdout）
+
+    mode='sync'：按内容指纹增量同步（默认，不再 TRUNCATE）
+    mode='replace'：清空后全量插入
+    stored_hashes：已知的线上指纹，可用 fetch_stored_hashes(get_supabase()) 获取
+    fmt：insert / values（多行VALUES）/ copy-csv / copy-tsv（COPY FROM STDIN，需用psql执行）
+    expire：完整爬取（--sources 且所有数据源成功）时才下架本次已消失的空投，同 sync()
+    """
+    yield "-- 插入真实空投数据\n"
+    rows = ((airdrop, airdrop_sql_values(airdrop)) for airdrop in airdrops)
+    yield from iter_statements(rows, AIRDROP_COLUMNS, mode, stored_hashes,
+                               fmt=fmt, rows_per_statement=rows_per_statement, expire=expire)
+
+def generate_sql(airdrops, mode='sync', stored_hashes=None, fmt='insert'):
     """生成SQL插入语句（如果不想用Python）"""
-    sql = "-- 清空旧数据\nTRUNCATE TABLE public.airdrops CASCADE;\n\n"
-    sql += "-- 插入真实空投数据\n"
+    return ''.join(iter_sql(airdrops, mode, stored_hashes, fmt))
+
+# 默认输出文件；命令行传 "-" 则输出到 stdout（可直接管道给 psql）
+OUTPUT_FILE = 'supabase/migrations/插入真实空投数据.sql'
+
+def parse_args(argv=None):
+    from airdrop_crawler import assets, feeds, pg_loader
+
+    parser = argparse.ArgumentParser(description='爬取空投数据并生成SQL')
+    parser.add_argument('output', nargs='?', default=OUTPUT_FILE, help='输出文件，"-" 表示stdout')
+    parser.add_argument('--mode', choices=SQL_MODES, default='sync', help='写入模式')
+    parser.add_argument('--format', dest='fmt', choices=OUTPUT_FORMATS, default='insert', help='输出格式')
+    parser.add_argument('--rows-per-statement', type=int, default=DEFAULT_ROWS_PER_STATEMENT,
+                        help='values格式每条语句的行数')
+    parser.add_argument('--sources', action='store_true', help='同时并发爬取 AIRDROP_SOURCES 中的网站')
+    parser.add_argument('--paginate', action='store_true',
+                        help='分页爬取 AIRDROP_SOURCES（跟随下一页链接，边爬取边写出，隐含 --sources）')
+    pg_loader.add_arguments(parser)
+    add_snapshot_arguments(parser)
+    assets.add_arguments(parser)
+    feeds.add_arguments(parser)
+    metrics.add_arguments(parser)
+    return parser.parse_args(argv)
+
+def add_snapshot_arguments(parser):
+    """快照库相关参数（见 airdrop_crawler.snapshot_store）"""
+    parser.add_argument('--no-snapshot', action='store_true', help='不使用本地快照库（不落盘、不续跑）')
+    parser.add_argument('--restart', action='store_true', help='不续跑上次未完成的爬取，从头开始')
+    parser.add_argument('--incremental', action='store_true',
+                        help='只写出与上次确认写入数据库的快照相比新增/变化/下架的空投')
+
+def open_snapshot(args, job):
+    """按命令行参数打开快照库并开始一次运行，--no-snapshot 时返回 None"""
+    if args.no_snapshot:
+        return None
+    from airdrop_crawler.snapshot_store import SnapshotStore
+
+    store = SnapshotStore()
+    store.begin_run(job, resume=not args.restart)
+    return store
+
+def report_changes(airdrops, previous):
+    """打印与上次快照相比的变化，返回 (新增, 变化, 下架键)"""
+    inserts, updates, vanished = diff_airdrops(airdrops, previous)
+    print(f"📸 与上次快照相比：新增 {len(inserts)}，变化 {len(updates)}，消失 {len(vanished)}")
+    return inserts, updates, vanished
+
+def listing_urls(sources=AIRDROP_SOURCES):
+    """数据源列表页地址：没有详情链接的空投 project_url 为这些地址加片段，去重时不按 project_url 合并"""
+    return [source['url'] for source in sources]
+
+def collect_airdrops(include_sources=False, source_airdrops=(), store=None, include_manual=True, failed=None):
+    """手动整理的空投（+ 可选的网站爬取结果），去重并评分
+
+    source_airdrops：已经爬取好的空投（守护进程传入各数据源最近的解析结果）
+    store：SnapshotStore，爬取过程落盘并支持续跑
+    include_manual：为 False 时不加入手动整理的空投（分片 worker 中由持有 manual 租约的 worker 负责）
+    failed：可选列表，填入抓取或解析失败的数据源名称
+    """
+    # 获取手动整理的空投数据（最新最热门）
+    airdrops = fetch_manual_airdrops() if include_manual else []
     
-    for airdrop in airdrops:
-        requirements_json = json.dumps(airdrop['requirements'], ensure_ascii=False)
-        sql += f"""
-INSERT INTO public.airdrops (
-  title, description, reward_amount, image_url, project_url,
-  requirements, category, type, status, sort_order,
-  start_time, end_time, total_participants, max_participants
-) VALUES (
-  '{airdrop['title']}',
-  '{airdrop['description'].replace("'", "''")}',
-  {airdrop['reward_amount']},
-  '{airdrop['image_url']}',
-  '{airdrop['project_url']}',
-  '{requirements_json}'::jsonb,
-  '{airdrop['category']}',
-  '{airdrop['type']}',
-  '{airdrop['status']}',
-  {airdrop['sort_order']},
-  NOW(),
-  NOW() + INTERVAL '{30} days',
-  {airdrop['total_participants']},
-  {airdrop['max_participants']}
-);
-"""
+    # 并发爬取 AIRDROP_SOURCES 中的所有网站
+    if include_sources:
+        airdrops.extend(fetch_source_airdrops(store=store, failed=failed))
+    airdrops.extend(source_airdrops)
     
-    return sql
+    # 合并不同来源的近似重复空投（同一项目标题/描述略有差异）
+    with metrics.stage('dedup'):
+        airdrops, merged_count = dedupe_airdrops(airdrops, listing_urls=listing_urls())
+    metrics.incr('items_merged', merged_count)
+    if merged_count:
+        print(f"🔁 已合并 {merged_count} 个近似重复的空投")
+    
+    # 写入之前整批计算 AI 评分和风险等级（爬取的空投没有人工评分）
+    with metrics.stage('score'):
+        score_airdrops(airdrops)
+    metrics.incr('items_scored', len(airdrops))
+    return airdrops
+
+def stream_airdrops(include_sources=True, errors=None):
+    """collect_airdrops 的流式版本：逐批产出去重、评分后的空投
+
+    先产出的空投已经写出，无法再合并，所以后到的近似重复空投直接丢弃
+    errors：可选 dict，爬取结束后填入 {数据源名称: 失败原因}
+    """
+    index = DedupIndex(listing_urls=listing_urls())
+    sort_orders = {}
+    
+    def batches():
+        yield None, fetch_manual_airdrops()
+        if include_sources:
+            yield from stream_source_airdrops(errors=errors)
+    
+    for name, items in batches():
+        unique = [airdrop for airdrop in items if index.add(airdrop) is None]
+        metrics.incr('items_merged', len(items) - len(unique))
+        if name is not None:
+            metrics.incr('items_parsed', len(items))
+            # 同一数据源跨页连续编号
+            for airdrop in unique:
+                sort_orders[name] = airdrop.sort_order = sort_orders.get(name, 0) + 1
+        score_airdrops(unique)
+        metrics.incr('items_scored', len(unique))
+        yield unique
+
+def with_assets(airdrops, args):
+    """--assets 时检查链接并把 image_url 改写为缩略图（原地修改），返回原列表"""
+    from airdrop_crawler import assets
+
+    assets.run_from_args(airdrops, args)
+    return airdrops
 
-def main():
+def main(argv=None):
     """主函数"""
-    print("🚀 开始爬取空投数据...\n")
+    from airdrop_crawler import assets, feeds, pg_loader
+
+    args = parse_args(argv)
+    metrics.start_run('crawl', trace_memory=args.trace_memory)
+    output_file = args.output
+    sql_output = sys.stdout if output_file == '-' else output_file
     
-    # 获取手动整理的空投数据（最新最热门）
-    airdrops = fetch_manual_airdrops()
+    # SQL写到stdout时，进度信息改写到stderr，避免混入SQL
+    with redirect_stdout(sys.stderr if output_file == '-' else sys.stdout):
+        print("🚀 开始爬取空投数据...\n")
+        
+        if args.paginate:
+            # 分页流式：边爬取边写出SQL，不经过快照库
+            store = stored_hashes = None
+            errors = {}
+            airdrops = (airdrop for batch in stream_airdrops(errors=errors) for airdrop in with_assets(batch, args))
+            # 全部写出后才知道是否有数据源失败
+            complete = lambda: not errors
+        else:
+            store = open_snapshot(args, 'crawl')
+            failed = []
+            airdrops = collect_airdrops(args.sources, store=store, failed=failed)
+            # 下架已消失的空投只在爬取了所有数据源且都成功时执行（同 sync()），
+            # 只有手动整理的空投时看不到网站来源的空投，不能据此下架
+            complete = args.sources and not failed
+            assets.run_from_args(airdrops, args)
+            
+            print(f"\n📊 共获取 {len(airdrops)} 个空投项目\n")
+            
+            # 与上次快照对比；--incremental 时以上次快照作为已知指纹，只输出差异
+            previous = store.previous_hashes() if store else None
+            if previous is not None:
+                report_changes(airdrops, previous)
+            stored_hashes = previous if args.incremental and args.mode == 'sync' else None
+            if args.incremental and not args.load:
+                print("ℹ️ 只生成SQL文件时不更新增量基线：下次仍与上一次确认写入数据库（--load / sync）的快照对比")
+        
+        if args.load:
+            # 直连 Postgres：二进制 COPY 到暂存表再合并（由数据库比较指纹，不需要 stored_hashes）
+            pg_loader.run_from_args(((airdrop, airdrop_sql_values(airdrop)) for airdrop in airdrops),
+                                    AIRDROP_COLUMNS, args, expire=complete)
+        else:
+            # 流式生成并写出SQL文件
+            with metrics.stage('render_sql'):
+                sql_chars = write_sql(iter_sql(airdrops, args.mode, stored_hashes, fmt=args.fmt,
+                                               rows_per_statement=args.rows_per_statement, expire=complete),
+                                      sql_output)
+            metrics.incr('sql_chars', sql_chars)
+        if args.paginate:
+            print(f"\n📊 共写出 {metrics.current_run().counters.get('items_scored', 0)} 个空投项目")
+        if store:
+            # --load 成功才确认写入了数据库；只生成SQL文件时不知道是否会执行，不作为下次的增量基线
+            store.finish_run(airdrops, confirmed=args.load)
+            store.close()
+        # --feeds：--load 写入后从数据库导出；只生成SQL时提示执行后再导出
+        feeds.run_after_sql(args)
+        
+        if not args.load:
+            print(f"✅ SQL文件已生成: {output_file}")
+            print("\n请在Supabase SQL编辑器中执行该文件！")
+        
+        # 如果配置了Supabase凭证，也可以直接写入：见 sync()
+        
+        metrics.finish_run(args.metrics_json, args.metrics_prom)
+
+def parse_sync_args(argv=None):
+    from airdrop_crawler import assets, feeds
+
+    parser = argparse.ArgumentParser(description='爬取空投数据并直接写入Supabase')
+    parser.add_argument('--sources', action='store_true', help='同时并发爬取 AIRDROP_SOURCES 中的网站')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='每次 upsert 的行数')
+    parser.add_argument('--paginate', action='store_true',
+                        help='分页爬取 AIRDROP_SOURCES（跟随下一页链接，每页解析完就写入，隐含 --sources）')
+    add_snapshot_arguments(parser)
+    assets.add_arguments(parser)
+    feeds.add_arguments(parser)
+    metrics.add_arguments(parser)
+    return parser.parse_args(argv)
+
+def sync(argv=None):
+    """爬取后直接 upsert 到 Supabase（需配置 SUPABASE_URL / SUPABASE_KEY），返回退出码"""
+    from airdrop_crawler import assets, feeds
+
+    args = parse_sync_args(argv)
+    metrics.start_run('sync', trace_memory=args.trace_memory)
+    print("🚀 开始爬取空投数据...\n")
     
-    # 如果需要，也可以尝试爬取其他网站
-    # airdrops.extend(fetch_coinmarketcap_airdrops())
+    if args.paginate:
+        # 分页流式：每页解析完就写入，内存占用与总页数无关
+        ok = True
+        errors = {}
+        # 只记下写出过的空投（用于下架本次已消失的空投）
+        written = []
+        # 线上指纹只在开始前读一次，不必每页都读整表
+        stored = fetch_stored_versions(get_supabase())
+        for batch in stream_airdrops(errors=errors):
+            with_assets(batch, args)
+            ok = (save_to_supabase(batch, batch_size=args.batch_size, stored=stored) if batch else True) and ok
+            written.extend(batch)
+        # 所有数据源都完整爬取、全部写入成功时才下架，部分失败时已消失的判断不可靠
+        if ok and not errors:
+            ok = expire_vanished(written)
+        feeds.run_from_args(args, get_supabase)
+        metrics.finish_run(args.metrics_json, args.metrics_prom)
+        return 0 if ok else 1
     
+    store = open_snapshot(args, 'sync')
+    failed = []
+    airdrops = collect_airdrops(args.sources, store=store, failed=failed)
+    assets.run_from_args(airdrops, args)
     print(f"\n📊 共获取 {len(airdrops)} 个空投项目\n")
     
-    # 生成SQL文件
-    sql_content = generate_sql(airdrops)
-    with open('supabase/migrations/插入真实空投数据.sql', 'w', encoding='utf-8') as f:
-        f.write(sql_content)
+    # --incremental：只 upsert 与上次成功同步的快照相比新增或变化的空投
+    rows = airdrops
+    previous = store.previous_hashes() if store else None
+    if previous is not None:
+        inserts, updates, _ = report_changes(airdrops, previous)
+        if args.incremental:
+            rows = inserts + updates
+    ok = save_to_supabase(rows, batch_size=args.batch_size) if rows else True
+    # 下架本次已消失的空投：只在爬取了所有数据源（--sources）且都成功时执行，
+    # 只有手动整理的空投时看不到网站来源的空投，不能据此下架
+    expired_ok = expire_vanished(airdrops) if ok and args.sources and not failed else True
+    if store:
+        # 写入失败时不记为完成，下次仍与上一次成功的快照对比
+        if ok:
+            store.finish_run(airdrops)
+        store.close()
+    # 静态分片从数据库整表读取，部分写入失败时导出的也是线上实际的数据
+    feeds.run_from_args(args, get_supabase)
     
-    print("✅ SQL文件已生成: supabase/migrations/插入真实空投数据.sql")
-    print("\n请在Supabase SQL编辑器中执行该文件！")
-    
-    # 如果配置了Supabase凭证，也可以直接保存
-    # save_to_supabase(airdrops)
+    metrics.finish_run(args.metrics_json, args.metrics_prom)
+    return 0 if ok and expired_ok else 1
+
+def parse_daemon_args(argv=None):
+    from airdrop_crawler import feeds
+    from airdrop_crawler.daemon import DEFAULT_INTERVAL, DEFAULT_MAX_INTERVAL, DEFAULT_MIN_INTERVAL
+
+    parser = argparse.ArgumentParser(description='常驻爬取：按数据源自适应间隔抓取，有变化时写入Supabase')
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL, help='新数据源的初始间隔（秒）')
+    parser.add_argument('--min-interval', type=float, default=DEFAULT_MIN_INTERVAL, help='最短间隔（秒）')
+    parser.add_argument('--max-interval', type=float, default=DEFAULT_MAX_INTERVAL, help='最长间隔（秒）')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='每次 upsert 的行数')
+    parser.add_argument('--max-cycles', type=int, help='跑满多少轮后退出（调试用）')
+    parser.add_argument('--metrics-json', help='每轮结束后更新的运行报告路径')
+    parser.add_argument('--metrics-prom', help='每轮结束后更新的 Prometheus textfile 路径')
+    feeds.add_arguments(parser)
+    return parser.parse_args(argv)
+
+def daemon(argv=None):
+    """常驻模式（替代 cron 定时执行 sync）：连接池、解析进程和解析结果在各轮之间保持热状态"""
+    import asyncio
+
+    from airdrop_crawler import feeds
+    from airdrop_crawler.daemon import CrawlDaemon, ScheduleStore
+    from airdrop_crawler.fetcher import FetchEngine
+    from airdrop_crawler.parse_pool import ParsePool
+    from airdrop_crawler.resilience import CircuitBreaker
+
+    args = parse_daemon_args(argv)
+    cache = ResponseCache()
+    breaker = CircuitBreaker.load()
+
+    def collect(results, parse_many):
+        return collect_fetch_results(results, AIRDROP_SOURCES, cache, parse_many)
+
+    def on_change(latest):
+        """写入 Supabase，返回是否成功（失败时守护进程不提交本轮指纹，下次抓取时重试）"""
+        source_airdrops = [item for source in AIRDROP_SOURCES for item in latest.get(source['name'], [])]
+        airdrops = collect_airdrops(source_airdrops=source_airdrops)
+        if not save_to_supabase(airdrops, batch_size=args.batch_size):
+            return False
+        ok = True
+        # 每个数据源都有最近一次成功的解析结果时才是全量数据，才能据此下架
+        if all(source['name'] in latest for source in AIRDROP_SOURCES):
+            ok = expire_vanished(airdrops)
+        feeds.run_from_args(args, get_supabase)
+        return ok
+
+    async def run():
+        async with FetchEngine(cache=cache, rate_limits=SOURCE_RATE_LIMITS, breaker=breaker,
+                               stream=open_stream_parser) as engine:
+            with ParsePool(max_workers=min(len(AIRDROP_SOURCES), os.cpu_count() or 1)) as pool:
+                crawl_daemon = CrawlDaemon(
+                    AIRDROP_SOURCES, engine, pool, collect, on_change, cache=cache, breaker=breaker,
+                    schedule=ScheduleStore.load(interval=args.interval),
+                    min_interval=args.min_interval, max_interval=args.max_interval,
+                    metrics_json=args.metrics_json, metrics_prom=args.metrics_prom,
+                )
+                await crawl_daemon.run(args.max_cycles)
+
+    print(f"🛰️ 守护进程已启动，共 {len(AIRDROP_SOURCES)} 个数据源（Ctrl+C 退出）")
+    asyncio.run(run())
+    print("👋 守护进程已退出")
+    return 0
+
+# 租约中代表手动整理目录（catalog/manual.yaml）的数据源名
+MANUAL_SOURCE = 'manual'
+# AIRDROP_SOURCES 的 type -> airdrop_sources.type
+LEASE_SOURCE_TYPES = {'html': 'crawler', 'json': 'api'}
+
+def parse_worker_args(argv=None):
+    from airdrop_crawler import leases
+
+    parser = argparse.ArgumentParser(
+        description='分片爬取：领取数据源租约，只爬取并写入自己持有的数据源（可多进程、多台机器同时运行）')
+    leases.add_arguments(parser)
+    parser.add_argument('--worker-id', help='worker 标识（默认 主机名:进程号）')
+    parser.add_argument('--once', action='store_true', help='没有到期的数据源时退出（默认常驻）')
+    parser.add_argument('--poll', type=float, default=leases.DEFAULT_POLL_INTERVAL,
+                        help='没有到期的数据源时隔多久再试（秒）')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='每次 upsert 的行数')
+    parser.add_argument('--metrics-json', help='每批结束后更新的运行报告路径')
+    parser.add_argument('--metrics-prom', help='每批结束后更新的 Prometheus textfile 路径')
+    return parser.parse_args(argv)
+
+def worker(argv=None):
+    """分片 worker：与其他 worker 通过租约分配数据源，每个数据源一轮只被一个 worker 爬取和写入，返回退出码
+
+    各 worker 只持有部分数据，只 upsert 不下架，也不导出静态分片（由 sync / daemon 负责）
+    """
+    from airdrop_crawler import leases
+
+    args = parse_worker_args(argv)
+    sources_by_name = {s['name']: s for s in AIRDROP_SOURCES}
+    lease_sources = [(MANUAL_SOURCE, 'manual')] + [
+        (s['name'], LEASE_SOURCE_TYPES.get(s.get('type'), 'crawler')) for s in AIRDROP_SOURCES
+    ]
+    cache = ResponseCache()
+
+    def crawl(names):
+        sources = [sources_by_name[name] for name in names if name in sources_by_name]
+        results = fetch_source_results(sources, cache) if sources else {}
+        if MANUAL_SOURCE in names:
+            results[MANUAL_SOURCE] = fetch_manual_airdrops()
+        return results
+
+    def write(airdrops):
+        airdrops = collect_airdrops(source_airdrops=airdrops, include_manual=False)
+        return save_to_supabase(airdrops, batch_size=args.batch_size)
+
+    store = leases.open_store(args.dsn, args.lease_path)
+    try:
+        shard_worker = leases.ShardWorker(
+            store, lease_sources, crawl, write, owner=args.worker_id, ttl=args.lease_ttl,
+            batch=args.lease_batch, interval=args.crawl_interval, poll=args.poll,
+            metrics_json=args.metrics_json, metrics_prom=args.metrics_prom,
+        )
+        print(f"🧩 worker {shard_worker.owner} 已启动，共 {len(lease_sources)} 个数据源（Ctrl+C 退出）")
+        total = shard_worker.run(once=args.once)
+    finally:
+        store.close()
+    print(f"👋 worker 已退出，共处理 {total} 个数据源")
+    return 0
 
 if __name__ == "__main__":
     main()
-
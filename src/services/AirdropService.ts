@@ -166,6 +166,25 @@ export const AirdropService = {
     return content
   },
 
+  /**
+   * 读取爬虫导出的静态分片（public/feeds，按 ai_score 排序分页），不查询数据库
+   * @param shard 分片：'all' | 'type/web3' | 'category/defi' | 'difficulty/easy' ...
+   * @param page 页码（从1开始）
+   */
+  async getFeedPage(shard: string = 'all', page: number = 1) {
+    try {
+      const response = await fetch(`/feeds/${shard}/page-${page}.json`)
+      if (!response.ok) {
+        return { success: false, data: [], pages: 0, total: 0, next: null, error: `HTTP ${response.status}` }
+      }
+      const feed = await response.json()
+      return { success: true, data: feed.items || [], pages: feed.pages, total: feed.total, next: feed.next, error: null }
+    } catch (error: any) {
+      console.error('❌ 读取空投分片失败:', error)
+      return { success: false, data: [], pages: 0, total: 0, next: null, error: error.message }
+    }
+  },
+
   /**
    * 获取统计信息
    */
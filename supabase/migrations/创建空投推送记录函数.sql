@@ -0,0 +1,37 @@
+-- ==========================================
+-- 空投推送记录函数
+-- 推送引擎（scripts/airdrop_crawler/push.py）把一个空投并发推送到多个群组后，
+-- 调用一次 record_airdrop_push：写一条 airdrop_push_history，同时更新 airdrops 的推送计数
+-- 一次推送无论多少个群组，都只有一次数据库写入
+-- ==========================================
+
+CREATE OR REPLACE FUNCTION record_airdrop_push(
+  p_airdrop_id UUID,
+  p_group_ids UUID[],
+  p_success_count INTEGER,
+  p_fail_count INTEGER
+)
+RETURNS UUID
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+  v_history_id UUID;
+BEGIN
+  INSERT INTO airdrop_push_history (airdrop_id, group_ids, success_count, fail_count)
+  VALUES (p_airdrop_id, p_group_ids, p_success_count, p_fail_count)
+  RETURNING id INTO v_history_id;
+
+  -- 至少推送成功一个群组才计为一次推送
+  IF p_success_count > 0 THEN
+    UPDATE public.airdrops
+    SET push_count = COALESCE(push_count, 0) + 1,
+        last_pushed_at = NOW()
+    WHERE id = p_airdrop_id;
+  END IF;
+
+  RETURN v_history_id;
+END;
+$$;
+
+COMMENT ON FUNCTION record_airdrop_push IS '记录一次空投推送：写入推送历史并更新推送计数';
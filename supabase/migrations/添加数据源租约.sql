@@ -0,0 +1,28 @@
+-- ==========================================
+-- 数据源租约（多进程/多机分片爬取）
+-- 每个爬虫 worker（python -m airdrop_crawler worker --dsn ...）先在 airdrop_sources 上
+-- 领取若干数据源的租约，只爬取、写入自己持有租约的数据源；
+-- 租约到期前由心跳续期，worker 崩溃后租约过期，其他 worker 自动接手
+-- lease_token 每次领取加一，写入前按 token 校验，过期后被接手的 worker 不会再写入
+-- 依赖：创建空投爬虫系统.sql
+-- ==========================================
+
+ALTER TABLE airdrop_sources
+ADD COLUMN IF NOT EXISTS lease_owner TEXT,
+ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMPTZ,
+ADD COLUMN IF NOT EXISTS lease_token BIGINT NOT NULL DEFAULT 0;
+
+COMMENT ON COLUMN airdrop_sources.lease_owner IS '持有租约的爬虫 worker（主机名:进程号），为空表示空闲';
+COMMENT ON COLUMN airdrop_sources.lease_expires_at IS '租约到期时间，过期后其他 worker 可接手';
+COMMENT ON COLUMN airdrop_sources.lease_token IS '租约版本号（每次领取加一），写入前校验';
+
+-- 领取时按上次爬取时间挑选到期的数据源
+CREATE INDEX IF NOT EXISTS idx_airdrop_sources_due
+ON airdrop_sources (last_crawled_at NULLS FIRST)
+WHERE is_enabled;
+
+-- 验证
+SELECT column_name, data_type
+FROM information_schema.columns
+WHERE table_name = 'airdrop_sources'
+  AND column_name IN ('lease_owner', 'lease_expires_at', 'lease_token');
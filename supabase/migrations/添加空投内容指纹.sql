@@ -0,0 +1,18 @@
+-- ==========================================
+-- 空投内容指纹（增量同步）
+-- 爬虫生成的SQL按 content_hash 比较，只写入新增/变化的空投，
+-- 消失的空投改为 expired，不再 TRUNCATE 整表
+-- 依赖：添加空投自然键唯一索引.sql
+-- ==========================================
+
+ALTER TABLE public.airdrops
+ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
+COMMENT ON COLUMN public.airdrops.content_hash IS '爬虫内容指纹（sha256），为空表示非爬虫写入';
+
+-- 验证
+SELECT column_name, data_type
+FROM information_schema.columns
+WHERE table_schema = 'public'
+  AND table_name = 'airdrops'
+  AND column_name = 'content_hash';
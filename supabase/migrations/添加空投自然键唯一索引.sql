@@ -0,0 +1,18 @@
+-- ==========================================
+-- 空投自然键唯一索引
+-- 爬虫按 (project_url, type) 批量 upsert，需要该唯一索引
+-- ==========================================
+
+-- 1. 检查是否存在重复的自然键（如有，请先人工清理）
+SELECT project_url, type, COUNT(*) AS 重复数量
+FROM public.airdrops
+GROUP BY project_url, type
+HAVING COUNT(*) > 1;
+
+-- 2. 创建唯一索引
+CREATE UNIQUE INDEX IF NOT EXISTS idx_airdrops_project_url_type
+ON public.airdrops(project_url, type);
+
+-- ==========================================
+-- 执行完成后，save_to_supabase 不再需要先清空整表
+-- ==========================================